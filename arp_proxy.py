@@ -0,0 +1,104 @@
+# arp_proxy.py
+# Risponditore ARP nel controller. Gli switch di bordo mandano al controller
+# l'ARP che arriva dalle porte degli host invece di inondare la slice: il
+# controller impara le associazioni IP -> MAC dal mittente di ogni pacchetto
+# e risponde alle richieste con un packet-out sulla porta d'ingresso.
+# Una richiesta per un IP sconosciuto (o scaduto) riprende la strada di
+# prima, cioè le porte della regola ARP che il proxy ha sostituito; una
+# richiesta verso un host di un'altra slice viene scartata.
+# La cache è limitata: le voci scadono dopo max_age secondi e, quando è
+# piena, si elimina quella aggiornata meno di recente.
+import time
+from collections import OrderedDict
+
+from ryu.lib.packet import arp, ethernet, packet
+
+REPLY = 'reply'
+FORWARD = 'forward'
+DROP = 'drop'
+
+
+class ArpProxy(object):
+
+    def __init__(self, capacity=4096, max_age=300.0, clock=time.monotonic):
+        self.capacity = capacity
+        self.max_age = max_age
+        self.clock = clock
+        # IP -> (MAC, istante dell'ultimo aggiornamento), dal più vecchio
+        self.cache = OrderedDict()
+        # Contatori per il log e i benchmark
+        self.answered = 0
+        self.forwarded = 0
+        self.dropped = 0
+        self.evicted = 0
+
+    def learn(self, ip, mac):
+        # Le probe ARP (mittente 0.0.0.0) non dicono nulla
+        if ip == '0.0.0.0':
+            return
+        self.cache.pop(ip, None)
+        self.cache[ip] = (mac, self.clock())
+        if len(self.cache) > self.capacity:
+            self.cache.popitem(last=False)
+            self.evicted += 1
+
+    def lookup(self, ip):
+        entry = self.cache.get(ip)
+        if entry is None:
+            return None
+        mac, learned = entry
+        if self.clock() - learned > self.max_age:
+            del self.cache[ip]
+            return None
+        return mac
+
+    def forget(self, mac):
+        # Host sparito: via tutte le sue associazioni
+        for ip in [ip for ip, (known, _) in self.cache.items() if known == mac]:
+            del self.cache[ip]
+
+    def decide(self, opcode, src_mac, src_ip, dst_ip, allowed):
+        # Restituisce (REPLY, MAC cercato), (FORWARD, None) o (DROP, None).
+        # allowed(src_mac, dst_mac) dice se i due host stanno nella stessa slice
+        self.learn(src_ip, src_mac)
+        if opcode != arp.ARP_REQUEST:
+            # Risposte e annunci proseguono verso chi li aspetta
+            self.forwarded += 1
+            return FORWARD, None
+        dst_mac = self.lookup(dst_ip)
+        if dst_mac is None:
+            self.forwarded += 1
+            return FORWARD, None
+        if not allowed(src_mac, dst_mac):
+            self.dropped += 1
+            return DROP, None
+        self.answered += 1
+        return REPLY, dst_mac
+
+    def handle(self, datapath, in_port, msg, policy):
+        # Packet-in ARP da una porta host: il packet-out da spedire, o None
+        pkt = packet.Packet(msg.data)
+        req = pkt.get_protocol(arp.arp)
+        if req is None:
+            return None
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
+
+        action, dst_mac = self.decide(req.opcode, req.src_mac, req.src_ip, req.dst_ip, policy.arp_allowed)
+        if action == REPLY:
+            reply = packet.Packet()
+            reply.add_protocol(ethernet.ethernet(ethertype=pkt.get_protocol(ethernet.ethernet).ethertype,
+                                                 dst=req.src_mac, src=dst_mac))
+            reply.add_protocol(arp.arp(opcode=arp.ARP_REPLY, src_mac=dst_mac, src_ip=req.dst_ip,
+                                       dst_mac=req.src_mac, dst_ip=req.src_ip))
+            reply.serialize()
+            return parser.OFPPacketOut(datapath=datapath, buffer_id=ofproto.OFP_NO_BUFFER,
+                                       in_port=ofproto.OFPP_CONTROLLER,
+                                       actions=[parser.OFPActionOutput(in_port)], data=reply.data)
+
+        entry = policy.arp_fallback(datapath.id, in_port) if action == FORWARD else None
+        if entry is None:
+            return None
+        data = msg.data if msg.buffer_id == ofproto.OFP_NO_BUFFER else None
+        return parser.OFPPacketOut(datapath=datapath, buffer_id=msg.buffer_id, in_port=in_port,
+                                   actions=entry.ofp_actions(parser), data=data)
@@ -0,0 +1,251 @@
+# benchmark_controllers.py
+# Benchmark offline dei percorsi caldi del controller dinamico, senza
+# Mininet né OVS: un datapath finto registra i messaggi spediti e gli eventi
+# OpenFlow (EventOFPSwitchFeatures, EventOFPFlowStatsReply) sono sintetici.
+# Si misurano switch_features_handler, _flow_stats_reply_handler e
+# apply_slice_policy con tabelle da 10 a 100000 voci: tempo per chiamata
+# (minimo e mediana su più round, come pytest-benchmark), voci al secondo e
+# memoria allocata (picco e blocchi, con tracemalloc).
+# Le soglie di regressione stanno in un file JSON: --save scrive i valori
+# di riferimento della macchina attuale, --check li confronta con quelli
+# nuovi ed esce con codice 1 se un tempo o un picco di memoria supera il
+# riferimento oltre la tolleranza.
+# Gli stessi benchmark, sulle dimensioni piccole, sono anche una suite
+# pytest-benchmark: tests/test_benchmarks.py.
+#
+# Uso: python benchmark_controllers.py [--sizes 10,100,...] [--save FILE | --check FILE]
+#                                      [--tolerance 1.25]
+import argparse
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+
+from ryu.controller import ofp_event
+from ryu.ofproto import ofproto_v1_3_parser
+
+from benchmark_policy import FakeDatapath, diamond_chain, dynamic_controller
+import slice_policy
+
+SIZES = [10, 100, 1000, 10000, 100000]
+# Tempo massimo per benchmark e dimensione (secondi) e limiti sui round
+BUDGET = 2.0
+MIN_ROUNDS = 3
+MAX_ROUNDS = 200
+
+
+class RecordingDatapath(FakeDatapath):
+    # Come FakeDatapath, ma tiene il tipo di ogni messaggio spedito con
+    # send_msg e la dimensione di ogni scrittura a lotti (send)
+    def __init__(self, dpid):
+        super(RecordingDatapath, self).__init__(dpid)
+        self.msgs = []
+        self.writes_bytes = []
+
+    def send(self, buf):
+        self.writes_bytes.append(len(buf))
+        return super(RecordingDatapath, self).send(buf)
+
+    def send_msg(self, msg):
+        self.msgs.append(type(msg).__name__)
+        return super(RecordingDatapath, self).send_msg(msg)
+
+    def clear(self):
+        del self.msgs[:]
+        del self.writes_bytes[:]
+
+
+def table_size(hosts_per_side):
+    # Voci di s1 con tutte le coppie posizionate: tabella compilata più una
+    # regola per ogni coppia che parte da s1
+    H, PORT_MAP, slices, _ = diamond_chain(1, hosts_per_side)
+    compiler = slice_policy.SlicePolicyCompiler(H, PORT_MAP, dict(slice_policy.SERVICE_SPEC, slices=slices))
+    placement = {pair: slice_policy.SERVICE_SPEC['default'] for pair in compiler.host_pairs()}
+    return len(compiler.flow_table(1)) + len(compiler.compile_placement(placement).get(1, []))
+
+
+_hosts_for = {}
+
+
+def hosts_for(size):
+    # Il numero di host per lato più piccolo con almeno size voci su s1
+    # (ricerca binaria, in cache: ogni benchmark usa le stesse dimensioni)
+    if size in _hosts_for:
+        return _hosts_for[size]
+    low, high = 1, 1
+    while table_size(high) < size:
+        low, high = high, high * 2
+    while low < high:
+        mid = (low + high) // 2
+        if table_size(mid) < size:
+            low = mid + 1
+        else:
+            high = mid
+    _hosts_for[size] = low
+    return low
+
+
+def controller(size):
+    # Controller dinamico con s1 e s4 collegati a datapath che registrano
+    ctrl = dynamic_controller(hosts_for(size))
+    ctrl.clock = lambda: 0.0
+    for dpid in (1, 4):
+        ctrl.datapaths[dpid] = RecordingDatapath(dpid)
+        ctrl.metrics.add_datapath(dpid)
+    return ctrl
+
+
+def features_event(dp):
+    msg = ofproto_v1_3_parser.OFPSwitchFeatures(dp, datapath_id=dp.id, n_buffers=0, n_tables=254,
+                                                auxiliary_id=0, capabilities=0)
+    return ofp_event.EventOFPSwitchFeatures(msg)
+
+
+def flow_stats_event(dp, flows, duration, rate):
+    # Risposta con un OFPFlowStats per ogni regola monitorata, contatori
+    # coerenti con un rate costante (byte/s) dall'installazione
+    body = [ofproto_v1_3_parser.OFPFlowStats(
+        table_id=entry.table_id, duration_sec=int(duration), duration_nsec=int((duration % 1) * 1e9),
+        priority=entry.priority, idle_timeout=0, hard_timeout=0, flags=0, cookie=entry.cookie,
+        packet_count=0, byte_count=int(rate * duration), match=match, instructions=[])
+        for entry, match in flows]
+    msg = ofproto_v1_3_parser.OFPFlowStatsReply(dp)
+    msg.xid = dp.xid
+    msg.flags = 0
+    msg.body = body
+    return ofp_event.EventOFPFlowStatsReply(msg)
+
+
+def measure(fn, setup=None):
+    # Round ripetuti finché c'è budget: (tempi per chiamata, picco KiB,
+    # blocchi ancora allocati dopo la chiamata)
+    times = []
+    spent = 0.0
+    while len(times) < MIN_ROUNDS or (spent < BUDGET and len(times) < MAX_ROUNDS):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        fn(arg)
+        elapsed = time.perf_counter() - start
+        times.append(elapsed)
+        spent += elapsed
+    # Memoria in un round a parte: tracemalloc rallenta le chiamate
+    arg = setup() if setup else None
+    tracemalloc.start()
+    fn(arg)
+    snapshot = tracemalloc.take_snapshot()
+    peak = tracemalloc.get_traced_memory()[1] / 1024
+    tracemalloc.stop()
+    blocks = sum(stat.count for stat in snapshot.statistics('filename'))
+    return times, peak, blocks
+
+
+def bench_switch_features(size):
+    # Connessione di s1: meter, gruppi e tutta la tabella in un solo lotto
+    ctrl = controller(size)
+    dp = ctrl.datapaths[1]
+    entries = len(ctrl._datapath_table(1))
+
+    def setup():
+        dp.clear()
+        ctrl.programmer.barriers.clear()
+        return features_event(dp)
+
+    times, peak, blocks = measure(ctrl.switch_features_handler, setup)
+    return entries, times, peak, blocks
+
+
+def bench_flow_stats(size):
+    # Risposta alle flow stats di s1 con tutte le regole monitorate (video e
+    # coppie): stima dei rate, poi posizionamento delle coppie
+    ctrl = controller(size)
+    dp = ctrl.datapaths[1]
+    parser = dp.ofproto_parser
+    flows = [(entry, entry.ofp_match(parser)) for entry in ctrl._datapath_table(1)
+             if entry.cookie & slice_policy.COOKIE_MONITOR]
+    duration = [0.0]
+
+    def setup():
+        dp.clear()
+        ctrl.programmer.barriers.clear()
+        duration[0] += 2.0
+        return flow_stats_event(dp, flows, duration[0], 1000.0)
+
+    times, peak, blocks = measure(ctrl._flow_stats_reply_handler, setup)
+    return len(flows), times, peak, blocks
+
+
+def bench_apply_slice_policy(size):
+    # Transizione globale alternata UPPER <-> LOWER: regole a Priorità 250
+    # confrontate con la shadow table e spedite a lotti
+    ctrl = controller(size)
+    ctrl.steering = 'global'
+    for dpid in ctrl.datapaths:
+        ctrl.shadow.reset(dpid, ctrl.policy.flow_table(dpid))
+    targets = ['UPPER', 'LOWER']
+    entries = sum(len(rules) for rules in ctrl.policy.compile_override('UPPER').values())
+
+    def setup():
+        for dp in ctrl.datapaths.values():
+            dp.clear()
+        ctrl.programmer.barriers.clear()
+        targets.reverse()
+        return targets[0]
+
+    times, peak, blocks = measure(ctrl.apply_slice_policy, setup)
+    return entries, times, peak, blocks
+
+
+BENCHMARKS = [
+    ('switch_features_handler', bench_switch_features),
+    ('_flow_stats_reply_handler', bench_flow_stats),
+    ('apply_slice_policy', bench_apply_slice_policy),
+]
+
+
+def run(sizes):
+    results = {}
+    print(f"{'benchmark':<28}{'tabella':>9}{'voci':>8}{'round':>7}{'min ms':>10}{'mediana ms':>12}"
+          f"{'voci/s':>12}{'picco KiB':>11}{'blocchi':>10}")
+    for name, bench in BENCHMARKS:
+        for size in sizes:
+            entries, times, peak, blocks = bench(size)
+            best, median = min(times), statistics.median(times)
+            results[f"{name}/{size}"] = {'entries': entries, 'min_ms': best * 1000, 'median_ms': median * 1000,
+                                         'peak_kib': peak, 'blocks': blocks}
+            print(f"{name:<28}{size:>9}{entries:>8}{len(times):>7}{best * 1000:>10.3f}{median * 1000:>12.3f}"
+                  f"{entries / median if median else 0.0:>12.0f}{peak:>11.1f}{blocks:>10}")
+    return results
+
+
+def check(results, baseline, tolerance):
+    # Regressioni: mediana o picco di memoria oltre tolleranza x riferimento
+    failures = []
+    for key, ref in sorted(baseline.items()):
+        new = results.get(key)
+        if new is None:
+            continue
+        for metric in ('median_ms', 'peak_kib'):
+            if new[metric] > ref[metric] * tolerance:
+                failures.append(f"{key} {metric}: {new[metric]:.3f} > {ref[metric]:.3f} x {tolerance}")
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark offline dei controller')
+    parser.add_argument('--sizes', default=','.join(map(str, SIZES)))
+    parser.add_argument('--save', help='scrive i risultati come riferimento')
+    parser.add_argument('--check', help='confronta con un riferimento salvato')
+    parser.add_argument('--tolerance', type=float, default=1.25)
+    args = parser.parse_args()
+
+    results = run([int(size) for size in args.sizes.split(',')])
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+    if args.check:
+        with open(args.check) as f:
+            failures = check(results, json.load(f), args.tolerance)
+        for failure in failures:
+            print(f"REGRESSIONE {failure}")
+        sys.exit(1 if failures else 0)
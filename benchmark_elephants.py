@@ -0,0 +1,90 @@
+# benchmark_elephants.py
+# Flussi pesanti non video sul simulatore di rete (network_simulator.py),
+# catena a diamante di SliceTopo: senza rilevamento (come prima, tutto il
+# traffico non UDP 9999 resta sulla slice di default da 1 Mbps) contro con
+# il rilevamento a campioni del controller dinamico (regole per 5-tupla
+# verso la slice con spazio libero, scadenza per inattività).
+# Traffico: trasferimenti TCP di massa (--bulk flussi da --bulk-mbps) tra le
+# coppie di host, topi TCP piccoli e continui, una sessione video sopra la
+# soglia a metà simulazione. Per steering e modo:
+#   - traffico standard consegnato, quota consegnata dei trasferimenti e
+#     dei topi, quota del video
+#   - flussi spostati e riportati indietro, massimo di regole dei flussi
+#     pesanti installate, regole scadute
+#   - pacchetti copiati al controller al secondo
+#
+# Uso: python benchmark_elephants.py [secondi] [--bulk 2] [--bulk-mbps 4] [--mice 4] [--steering global,pair]
+import argparse
+
+import network_simulator
+from topology_gen import generate_topology
+
+
+def add_traffic(sim, seconds, bulk, bulk_mbps, mice):
+    # Trasferimenti di massa da sinistra a destra per ogni coppia (finiscono
+    # 15 s prima della fine: le loro regole scadono), topi nel verso opposto,
+    # il video da 3 Mbps nel terzo centrale della simulazione
+    pairs = [(src, dst) for src, dst, _ in sim.desc['pairs']]
+    flows = {'bulk': [], 'mice': [], 'video': []}
+    for i in range(bulk):
+        src, dst = pairs[i % len(pairs)]
+        flows['bulk'].append(sim.add_flow(src, dst, 'tcp', bulk_mbps, 5.0 + 2 * i, seconds - 15.0))
+    for i in range(mice):
+        src, dst = pairs[i % len(pairs)]
+        flows['mice'].append(sim.add_flow(dst, src, 'tcp', 0.05, 0.0, seconds))
+    src, dst = pairs[0]
+    flows['video'].append(sim.add_flow(src, dst, 'video', 3.0, seconds / 3, 2 * seconds / 3))
+    return flows
+
+
+def run(seconds, steering, elephants, bulk, bulk_mbps, mice):
+    desc = generate_topology('diamond', 4)
+    ctrl = network_simulator.make_controller(desc)
+    ctrl.steering = steering
+    if not elephants:
+        ctrl.spec = dict(ctrl.spec, elephants=False)
+        ctrl._compile_policy()
+    sim = network_simulator.NetworkSimulator(ctrl, desc)
+    flows = add_traffic(sim, seconds, bulk, bulk_mbps, mice)
+
+    # Regole dei flussi pesanti installate, dopo ogni round del controller
+    peak = [0]
+    detect = ctrl.elephants.detect
+
+    def wrapper():
+        detect()
+        peak[0] = max(peak[0], sum(len(entries) for entries in ctrl.elephants.rules.values()))
+    ctrl.elephants.detect = wrapper
+
+    sim.start()
+    sim.run(seconds)
+
+    def share(kind):
+        offered = sum(flow.rate * (flow.stop - flow.start) for flow in flows[kind])
+        return sum(flow.delivered for flow in flows[kind]) / offered if offered else 0.0
+    standard = sum(flow.delivered for flow in flows['bulk'] + flows['mice'])
+    return {
+        'standard_mbps': standard * 8 / seconds / 1e6,
+        'bulk': share('bulk'), 'mice': share('mice'), 'video': share('video'),
+        'promoted': ctrl.elephants.promoted, 'demoted': ctrl.elephants.demoted, 'peak': peak[0],
+        'expired': sim.flows_removed, 'packet_ins': sim.packet_ins / seconds,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Flussi pesanti non video: senza e con rilevamento a campioni')
+    parser.add_argument('seconds', type=float, nargs='?', default=120.0, help='tempo simulato')
+    parser.add_argument('--bulk', type=int, default=2, help='trasferimenti di massa')
+    parser.add_argument('--bulk-mbps', type=float, default=4.0, help='domanda di ogni trasferimento')
+    parser.add_argument('--mice', type=int, default=4, help='flussi TCP piccoli (50 kbps)')
+    parser.add_argument('--steering', default='global,pair')
+    args = parser.parse_args()
+
+    print(f"{'steering':<10}{'flussi pesanti':<16}{'std Mbps':>10}{'massa %':>9}{'topi %':>8}{'video %':>9}"
+          f"{'spostati':>10}{'indietro':>10}{'max regole':>12}{'scadute':>9}{'packet-in/s':>13}")
+    for steering in args.steering.split(','):
+        for elephants in (False, True):
+            r = run(args.seconds, steering, elephants, args.bulk, args.bulk_mbps, args.mice)
+            print(f"{steering:<10}{'sì' if elephants else 'no':<16}{r['standard_mbps']:>10.2f}{r['bulk'] * 100:>9.1f}"
+                  f"{r['mice'] * 100:>8.1f}{r['video'] * 100:>9.1f}{r['promoted']:>10}{r['demoted']:>10}"
+                  f"{r['peak']:>12}{r['expired']:>9}{r['packet_ins']:>13.1f}")
@@ -0,0 +1,254 @@
+# benchmark_monitor.py
+# Benchmark del monitor del controller dinamico: risposte flow stats
+# sintetiche con video a raffiche e risposte che arrivano con jitter.
+# Conta le chiamate ad apply_slice_policy con la stima del rate "vecchia"
+# (delta / monitor_interval, campione singolo) e con quella nuova
+# (durata dei flussi, EWMA e dwell time), poi confronta il polling fisso
+# con quello adattivo: richieste al secondo sul canale di controllo e
+# tempo di reazione alla congestione video. Misura poi il costo per
+# round del monitor delle porte (update + calcolo vettoriale) e infine
+# confronta il throughput aggregato del posizionamento per coppia di host
+# con quello della policy globale "tutto o niente".
+#
+# Uso: python benchmark_monitor.py [secondi_simulati]
+import argparse
+import random
+import time
+
+from ryu.controller import ofp_event
+from ryu.ofproto import ofproto_v1_3_parser
+
+from benchmark_policy import FakeDatapath, dynamic_controller
+import port_monitor
+import rate_estimator
+import slice_policy
+
+VIDEO_IN_PORTS = {1: [1, 2], 4: [3, 4]}
+
+
+def video_trace(seconds, seed=1, busy=0.5):
+    # Rate video (byte/s) secondo per secondo: sessioni video a raffiche
+    # attorno alla soglia di 1 Mbps, alternate a pause (busy = quota di sessioni)
+    rnd = random.Random(seed)
+    rates = []
+    while len(rates) < seconds:
+        session = rnd.random() < busy
+        for _ in range(rnd.randint(10, 40)):
+            mbps = max(0.0, rnd.gauss(1.1, 0.5)) if session else rnd.uniform(0.0, 0.3)
+            rates.append(mbps * 1e6 / 8)
+    return rates[:seconds]
+
+
+def flow_stats_event(dp, duration, byte_counts, pair_counts=None):
+    flows = []
+    for in_port, byte_count in zip(VIDEO_IN_PORTS[dp.id], byte_counts):
+        match = ofproto_v1_3_parser.OFPMatch(in_port=in_port, **slice_policy.VIDEO_MATCH)
+        flows.append(ofproto_v1_3_parser.OFPFlowStats(
+            table_id=0, duration_sec=int(duration), duration_nsec=int((duration % 1) * 1e9),
+            priority=slice_policy.PRIO_VIDEO, idle_timeout=0, hard_timeout=0, flags=0,
+            cookie=slice_policy.COOKIE_VIDEO, packet_count=0, byte_count=byte_count,
+            match=match, instructions=[]))
+    for (src_mac, dst_mac), byte_count in (pair_counts or {}).items():
+        match = ofproto_v1_3_parser.OFPMatch(eth_type=slice_policy.ETH_TYPE_IP, eth_src=src_mac, eth_dst=dst_mac)
+        flows.append(ofproto_v1_3_parser.OFPFlowStats(
+            table_id=0, duration_sec=int(duration), duration_nsec=int((duration % 1) * 1e9),
+            priority=slice_policy.PRIO_PAIR, idle_timeout=0, hard_timeout=0, flags=0,
+            cookie=slice_policy.COOKIE_PAIR, packet_count=0, byte_count=byte_count,
+            match=match, instructions=[]))
+    msg = ofproto_v1_3_parser.OFPFlowStatsReply(dp)
+    # Risposta all'ultima richiesta spedita al datapath
+    msg.xid = dp.xid
+    msg.flags = 0
+    msg.body = flows
+    return ofp_event.EventOFPFlowStatsReply(msg)
+
+
+def run(seconds, legacy=False, adaptive=True, seed=1, busy=0.5):
+    ctrl = dynamic_controller()
+    now = [0.0]
+    ctrl.clock = lambda: now[0]
+    ctrl.adaptive_polling = adaptive
+    # Qui si misurano le transizioni della policy globale
+    ctrl.steering = 'global'
+    if legacy:
+        # Come prima: solo l'ultimo intervallo, nessuno smussamento e nessun
+        # dwell time
+        ctrl.video_stats = rate_estimator.RateEstimator(size=2, alpha=1.0)
+        ctrl.dwell_time = {'LOWER': 0.0, 'UPPER': 0.0}
+
+    calls = []
+    apply_slice_policy = ctrl.apply_slice_policy
+    ctrl.apply_slice_policy = lambda target: (calls.append((now[0], target)), apply_slice_policy(target))
+
+    dps = {dpid: FakeDatapath(dpid) for dpid in (1, 4)}
+    ctrl.datapaths.update(dps)
+    for dpid in dps:
+        ctrl.metrics.add_datapath(dpid)
+
+    rates = video_trace(seconds, seed, busy)
+    rnd = random.Random(seed + 1)
+    counters = {1: [0, 0], 4: [0, 0]}
+    t, polls = 0.0, 0
+    while t < seconds:
+        for dp in dps.values():
+            ctrl._request_video_stats(dp)
+        # Le risposte arrivano dopo l'intervallo di polling, con jitter del 30%
+        interval = ctrl.poll_interval
+        step = interval * rnd.uniform(0.7, 1.3)
+        for second in range(int(t), min(int(t + step), seconds)):
+            for dpid in dps:
+                # Il video si divide tra i due host dello switch
+                counters[dpid][0] += int(rates[second] * 0.7)
+                counters[dpid][1] += int(rates[second] * 0.3)
+        t += step
+        polls += 1
+        now[0] = t
+        # Vecchio calcolo: il tempo trascorso è sempre monitor_interval
+        duration = polls * interval if legacy else t
+        for dpid, dp in dps.items():
+            ctrl._flow_stats_reply_handler(flow_stats_event(dp, duration, counters[dpid]))
+
+    # Tempo di reazione: dall'istante in cui il video supera la soglia
+    # alla decisione di spostare il traffico standard su LOWER
+    reactions = []
+    for when, target in calls:
+        if target != 'LOWER':
+            continue
+        onset = int(when)
+        while onset > 0 and rates[onset - 1] > ctrl.bandwidth_threshold:
+            onset -= 1
+        if rates[min(onset, seconds - 1)] > ctrl.bandwidth_threshold:
+            reactions.append(when - onset)
+    return calls, ctrl.stats_requests / seconds, reactions
+
+
+def run_ports(n_switches, n_ports=8, rounds=20):
+    monitor = port_monitor.PortMonitor()
+    for dpid in range(1, n_switches + 1):
+        for port in range(1, n_ports + 1):
+            monitor.set_capacity(dpid, port, 10e6)
+
+    update_s = compute_s = 0.0
+    for rnd in range(1, rounds + 1):
+        replies = {}
+        for dpid in range(1, n_switches + 1):
+            replies[dpid] = [ofproto_v1_3_parser.OFPPortStats(
+                port_no=port, rx_packets=0, tx_packets=0, rx_bytes=rnd * 100000, tx_bytes=rnd * 600000 * port,
+                rx_dropped=0, tx_dropped=0, rx_errors=0, tx_errors=0, rx_frame_err=0, rx_over_err=0,
+                rx_crc_err=0, collisions=0, duration_sec=rnd * 2, duration_nsec=0)
+                for port in range(1, n_ports + 1)]
+        start = time.perf_counter()
+        for dpid, body in replies.items():
+            monitor.update(dpid, body)
+        update_s += time.perf_counter() - start
+        start = time.perf_counter()
+        monitor.compute()
+        compute_s += time.perf_counter() - start
+    return update_s / rounds * 1000, compute_s / rounds * 1000
+
+
+def pair_trace(pairs, seconds, seed=1):
+    # Domanda standard (byte/s) di ogni coppia: sessioni on/off da 0.2-3 Mbps
+    rnd = random.Random(seed)
+    trace = {}
+    for pair in pairs:
+        rates = []
+        while len(rates) < seconds:
+            mbps = rnd.uniform(0.2, 3.0) if rnd.random() < 0.6 else 0.0
+            rates += [mbps * 1e6 / 8] * rnd.randint(10, 60)
+        trace[pair] = rates[:seconds]
+    return trace
+
+
+def deliver(video, demands, capacity):
+    # Un verso di un link: il video (UDP) passa per primo, il traffico
+    # standard si divide in proporzione quello che resta
+    video_out = min(video, capacity)
+    total = sum(demands.values())
+    share = min(1.0, (capacity - video_out) / total) if total else 0.0
+    return video_out, {pair: rate * share for pair, rate in demands.items()}
+
+
+def run_placement(seconds, steering, seed=1, busy=0.5):
+    ctrl = dynamic_controller()
+    now = [0.0]
+    ctrl.clock = lambda: now[0]
+    ctrl.steering = steering
+
+    dps = {dpid: FakeDatapath(dpid) for dpid in (1, 4)}
+    ctrl.datapaths.update(dps)
+    for dpid in dps:
+        ctrl.metrics.add_datapath(dpid)
+        ctrl.shadow.reset(dpid, ctrl.policy.flow_table(dpid))
+
+    capacity = {name: bps / 8 for name, bps in slice_policy.SLICE_CAPACITY.items()}
+    video = video_trace(seconds, seed, busy)
+    demand = pair_trace(ctrl.policy.host_pairs(), seconds, seed + 1)
+    counters = {1: [0, 0], 4: [0, 0]}
+    pair_counters = {pair: 0 for pair in demand}
+    wanted = delivered = video_wanted = video_delivered = 0.0
+    t, next_poll = 0, 0.0
+    while t < seconds:
+        if t >= next_poll:
+            for dpid, dp in dps.items():
+                ctrl._request_video_stats(dp)
+                pairs = {(ctrl.H[src], ctrl.H[dst]): pair_counters[(src, dst)]
+                         for src, dst in demand if ctrl.policy.host_dpid[src] == dpid}
+                ctrl._flow_stats_reply_handler(flow_stats_event(dp, t, counters[dpid], pairs))
+            next_poll = t + ctrl.poll_interval
+
+        # Un secondo di traffico, separatamente per i due versi (s1->s4, s4->s1)
+        for dpid in dps:
+            slices = {name: {} for name in capacity}
+            for pair, rates in demand.items():
+                if ctrl.policy.host_dpid[pair[0]] != dpid:
+                    continue
+                name = ctrl.pairs.pair_slice[pair] if steering == 'pair' else ctrl.global_slice_state
+                slices[name][pair] = rates[t]
+            for name, demands in slices.items():
+                video_rate = video[t] if name == slice_policy.SERVICE_SPEC['video'] else 0.0
+                video_out, out = deliver(video_rate, demands, capacity[name])
+                video_wanted += video_rate
+                video_delivered += video_out
+                for pair, rate in out.items():
+                    pair_counters[pair] += int(rate)
+                wanted += sum(demands.values())
+                delivered += sum(out.values())
+            counters[dpid][0] += int(video[t] * 0.7)
+            counters[dpid][1] += int(video[t] * 0.3)
+        t += 1
+        now[0] = t
+
+    flow_mods = ctrl.programmer.sent_msgs
+    return (delivered * 8 / seconds / 1e6, wanted * 8 / seconds / 1e6,
+            video_delivered / video_wanted if video_wanted else 1.0, flow_mods * 3600 / seconds)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark del monitoraggio delle statistiche')
+    parser.add_argument('seconds', type=int, nargs='?', default=3600, metavar='secondi_simulati')
+    seconds = parser.parse_args().seconds
+    for busy in (0.1, 0.5, 0.9):
+        print(f"{seconds} s di video a raffiche ({busy:.0%} in sessione), risposte con jitter del 30%")
+        print(f"{'':<24}{'apply/h':>9}{'richieste/s':>13}{'reazione max s':>16}{'media s':>9}")
+        for label, legacy, adaptive in (('prima (fisso 2 s)', True, False),
+                                        ('stima EWMA, fisso', False, False),
+                                        ('stima EWMA, adattivo', False, True)):
+            calls, load, reactions = run(seconds, legacy, adaptive, busy=busy)
+            worst = max(reactions) if reactions else 0.0
+            mean = sum(reactions) / len(reactions) if reactions else 0.0
+            print(f"  {label:<22}{len(calls) * 3600 / seconds:>9.0f}{load:>13.2f}{worst:>16.1f}{mean:>9.1f}")
+
+    print("\nMonitor delle porte (8 porte per switch), costo per round")
+    print(f"{'switch':>8}{'update ms':>12}{'calcolo ms':>12}")
+    for n in (4, 100, 500, 1000):
+        update_ms, compute_ms = run_ports(n)
+        print(f"{n:>8}{update_ms:>12.3f}{compute_ms:>12.3f}")
+
+    print(f"\nTraffico standard tra 8 coppie di host (0.2-3 Mbps on/off), {seconds} s")
+    print(f"{'':<24}{'standard Mbps':>15}{'domanda':>9}{'video %':>9}{'FlowMod/h':>11}")
+    for busy in (0.1, 0.5, 0.9):
+        for label, steering in (('globale', 'global'), ('per coppia', 'pair')):
+            delivered, wanted, video_share, flow_mods = run_placement(seconds, steering, busy=busy)
+            print(f"  {label + f' (video {busy:.0%})':<22}{delivered:>15.2f}{wanted:>9.2f}"
+                  f"{video_share:>9.1%}{flow_mods:>11.0f}")
@@ -0,0 +1,437 @@
+# benchmark_policy.py
+# Benchmark del compilatore di policy: tempo di compilazione e di
+# installazione (costruzione + serializzazione dei FlowMod) per catene di
+# "diamanti" come quello di SliceTopo, da 4 a 1000 switch, e FlowMod spediti
+# per transizione di slice nel controller dinamico (prima/dopo la shadow table).
+# Infine un test "alla iperf" del multipath: flussi TCP elastici da s1 a s4
+# su un solo percorso (policy globale) o divisi dal gruppo SELECT pesato.
+# La pipeline a due tabelle è confrontata con la tabella unica da 4 a 4096
+# host: numero di regole e tempo di installazione alla connessione.
+# Per la topologia scoperta a runtime si misurano caricamento e percorsi
+# ricalcolati quando un link di una slice cade e torna.
+# Il proxy ARP si misura contando le copie dei broadcast ARP che
+# attraversano link e porte host, seguendo le regole compilate.
+#
+# Uso: python benchmark_policy.py [numero_switch ...]
+import argparse
+import logging
+import random
+import time
+
+from ryu.ofproto import ofproto_v1_3, ofproto_v1_3_parser
+
+import arp_proxy
+import flow_programmer
+import slice_policy
+import topology_discovery
+
+
+class FakeDatapath(object):
+    # Datapath finto: serializza i messaggi come farebbe Ryu, senza socket
+    ofproto = ofproto_v1_3
+    ofproto_parser = ofproto_v1_3_parser
+
+    def __init__(self, dpid):
+        self.id = dpid
+        self.xid = 0
+        self.sent = 0
+        self.sent_bytes = 0
+        self.writes = 0
+
+    def set_xid(self, msg):
+        self.xid += 1
+        msg.set_xid(self.xid)
+        return self.xid
+
+    def send(self, buf):
+        self.writes += 1
+        self.sent_bytes += len(buf)
+        return True
+
+    def send_msg(self, msg):
+        if msg.xid is None:
+            self.set_xid(msg)
+        msg.serialize()
+        self.sent += 1
+        return self.send(msg.buf)
+
+
+def diamond_chain(n_diamonds, hosts_per_side=2):
+    # s1 -(s2|s3)- s4 -(s5|s6)- s7 ... con gli host agli estremi.
+    # Con n_diamonds=1 si ottiene esattamente la topologia di SliceTopo.
+    H = {}
+    PORT_MAP = {}
+    slices = {'UPPER': [], 'LOWER': []}
+
+    def link(a, b):
+        # Collegamento bidirezionale; b può essere un host (solo lato switch)
+        ports = PORT_MAP.setdefault(a, {})
+        if isinstance(b, int):
+            ports[f"s{b}"] = len(ports) + 1
+            other = PORT_MAP.setdefault(b, {})
+            other[f"s{a}"] = len(other) + 1
+        else:
+            ports[b] = len(ports) + 1
+
+    def add_host(dpid):
+        name = f"h{len(H) + 1}"
+        H[name] = '00:00:%02x:%02x:%02x:%02x' % tuple((len(H) + 1).to_bytes(4, 'big'))
+        link(dpid, name)
+        return name
+
+    left = [add_host(1) for _ in range(hosts_per_side)]
+    junction = 1
+    for _ in range(n_diamonds):
+        upper, lower, nxt = junction + 1, junction + 2, junction + 3
+        link(junction, upper)
+        link(junction, lower)
+        link(upper, nxt)
+        link(lower, nxt)
+        for name, hop in (('UPPER', upper), ('LOWER', lower)):
+            if not slices[name]:
+                slices[name].append(f"s{junction}")
+            slices[name] += [f"s{hop}", f"s{nxt}"]
+        junction = nxt
+    right = [add_host(junction) for _ in range(hosts_per_side)]
+
+    pairs = {}
+    for i, (a, b) in enumerate(zip(left, right)):
+        pairs[(a, b)] = 'UPPER' if i % 2 == 0 else 'LOWER'
+    return H, PORT_MAP, slices, pairs
+
+
+def dynamic_controller(hosts_per_side=2, discovered=True):
+    # Il controller dinamico vero, con SliceTopo (o più host per lato) già
+    # scoperta come se fossero arrivati gli eventi LLDP e degli host
+    # (discovered=False: appena avviato, senza eventi)
+    from controller_Dynamic_Slicing import DynamicSliceController
+
+    ctrl = DynamicSliceController()
+    if discovered:
+        H, PORT_MAP, _, _ = diamond_chain(1, hosts_per_side)
+        ctrl.discovery.load(H, PORT_MAP)
+        ctrl._compile_policy()
+    # I datapath finti non rispondono alle barrier né alle richieste di
+    # statistiche: transizioni in un passo e tabella spedita alla connessione
+    ctrl.updater.enabled = False
+    ctrl.reconciler.enabled = False
+    return ctrl
+
+
+def flow_mod(datapath, entry):
+    # Stessa costruzione del FlowMod dei controller
+    parser = datapath.ofproto_parser
+    return parser.OFPFlowMod(datapath=datapath, table_id=entry.table_id, cookie=entry.cookie,
+                             priority=entry.priority, match=entry.ofp_match(parser),
+                             instructions=entry.ofp_instructions(datapath.ofproto, parser))
+
+
+def run(n_switches):
+    H, PORT_MAP, slices, pairs = diamond_chain(max(1, (n_switches - 1) // 3))
+    results = []
+    for mode, spec in (('topology', {'slices': slices, 'pairs': pairs}),
+                       ('service', dict(slice_policy.SERVICE_SPEC, slices=slices))):
+        compiler = slice_policy.SlicePolicyCompiler(H, PORT_MAP, spec)
+
+        start = time.perf_counter()
+        compiler.compile()
+        compile_ms = (time.perf_counter() - start) * 1000
+
+        # Prima connessione di tutti gli switch: un send_msg per FlowMod...
+        datapaths = [FakeDatapath(dpid) for dpid in PORT_MAP]
+        start = time.perf_counter()
+        for dp in datapaths:
+            for entry in compiler.flow_table(dp.id):
+                dp.send_msg(flow_mod(dp, entry))
+        install_ms = (time.perf_counter() - start) * 1000
+
+        # ...oppure a lotti con una barrier per switch
+        programmer = flow_programmer.FlowProgrammer(logging.getLogger('benchmark'))
+        batched = [FakeDatapath(dpid) for dpid in PORT_MAP]
+        start = time.perf_counter()
+        for dp in batched:
+            for entry in compiler.flow_table(dp.id):
+                programmer.add(dp, flow_mod(dp, entry))
+            programmer.flush(dp)
+        batch_ms = (time.perf_counter() - start) * 1000
+        writes = sum(dp.writes for dp in datapaths), sum(dp.writes for dp in batched)
+
+        # Riconnessione: la tabella arriva dalla cache, senza ricompilare
+        start = time.perf_counter()
+        for dp in datapaths:
+            compiler.flow_table(dp.id)
+        lookup_us = (time.perf_counter() - start) * 1e6 / len(datapaths)
+
+        results.append((mode, len(PORT_MAP), compiler.rule_count(), compile_ms,
+                        install_ms, batch_ms, writes, lookup_us))
+    return results
+
+
+def run_pipeline(n_hosts):
+    # Una tabella sola contro la pipeline classificazione -> inoltro, con
+    # n_hosts host divisi tra i due switch di bordo di SliceTopo
+    H, PORT_MAP, slices, pairs = diamond_chain(1, max(1, n_hosts // 2))
+    results = []
+    for mode, spec in (('topology', dict(slice_policy.TOPOLOGY_SPEC, slices=slices, pairs=pairs)),
+                       ('service', dict(slice_policy.SERVICE_SPEC, slices=slices))):
+        for pipeline in (False, True):
+            compiler = slice_policy.SlicePolicyCompiler(H, PORT_MAP, dict(spec, pipeline=pipeline))
+            compiler.compile()
+            tables = compiler.flow_table_all()
+
+            # Connessione di tutti gli switch: FlowMod a lotti con una barrier
+            programmer = flow_programmer.FlowProgrammer(logging.getLogger('benchmark'))
+            datapaths = [FakeDatapath(dpid) for dpid in PORT_MAP]
+            start = time.perf_counter()
+            for dp in datapaths:
+                for entry in tables[dp.id]:
+                    programmer.add(dp, flow_mod(dp, entry))
+                programmer.flush(dp)
+            install_ms = (time.perf_counter() - start) * 1000
+
+            edge = max(len(entries) for entries in tables.values())
+            results.append((mode, 'pipeline' if pipeline else 'tabella 0', compiler.rule_count(), edge,
+                            install_ms, sum(dp.sent_bytes for dp in datapaths)))
+    return results
+
+
+def run_discovery(n_switches):
+    # Topologia scoperta: caricamento di tutta la catena come eventi LLDP e
+    # host, poi il link a metà della slice UPPER che cade e torna. Si contano i
+    # segmenti ricalcolati e si confronta con il ricalcolo di tutte le slice.
+    H, PORT_MAP, slices, _ = diamond_chain(max(1, (n_switches - 1) // 3))
+    discovery = topology_discovery.TopologyDiscovery(slices)
+    start = time.perf_counter()
+    discovery.load(H, PORT_MAP)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    compiler = slice_policy.SlicePolicyCompiler(discovery.host_map(), discovery.port_map(),
+                                                dict(slice_policy.SERVICE_SPEC, slices=discovery.slice_paths()))
+    compiler.compile()
+    compile_ms = (time.perf_counter() - start) * 1000
+
+    path = discovery.path('UPPER')
+    a, b = path[len(path) // 2 - 1:len(path) // 2 + 1]
+    port_a, port_b = PORT_MAP[a][f"s{b}"], PORT_MAP[b][f"s{a}"]
+    recomputed = discovery.recomputed
+    start = time.perf_counter()
+    discovery.remove_link(a, b)
+    discovery.add_link(a, port_a, b, port_b)
+    flap_ms = (time.perf_counter() - start) * 1000
+    flap_segments = discovery.recomputed - recomputed
+
+    # Confronto: tutte le slice da zero sullo stesso grafo
+    fresh = topology_discovery.TopologyDiscovery(slices)
+    fresh.links = discovery.links
+    start = time.perf_counter()
+    for name in fresh.waypoints:
+        fresh._recompute(name, 0)
+    full_ms = (time.perf_counter() - start) * 1000
+    return len(PORT_MAP), len(H), load_ms, compile_ms, flap_segments, flap_ms, full_ms
+
+
+def arp_copies(compiler, neighbors, dpid, in_port, entry=None):
+    # Un broadcast ARP entrato da in_port seguendo le regole compilate:
+    # (copie spedite su link e porte host, copie al controller)
+    copies = packet_ins = 0
+    queue, seen = [(dpid, in_port, entry)], set()
+    while queue:
+        dpid, in_port, entry = queue.pop()
+        if (dpid, in_port) in seen:
+            continue
+        seen.add((dpid, in_port))
+        if entry is None:
+            entry = slice_policy._arp_rule(slice_policy._arp_rules(compiler.flow_table(dpid)), in_port)
+        ports = list(entry.out_ports)
+        if entry.group is not None:
+            # FAST_FAILOVER con tutti i link attivi: il primo bucket
+            groups = {group.group_id: group for group in compiler.group_table(dpid)}
+            ports.append(groups[entry.group].buckets[0].port)
+        if ofproto_v1_3.OFPP_FLOOD in ports:
+            ports = list(neighbors[dpid])
+        for port in ports:
+            if port == ofproto_v1_3.OFPP_CONTROLLER:
+                packet_ins += 1
+            if port == in_port or port not in neighbors[dpid]:
+                continue
+            copies += 1
+            name = neighbors[dpid][port]
+            if name.startswith('s'):
+                nxt = int(name[1:])
+                queue.append((nxt, compiler.PORT_MAP[nxt][f"s{dpid}"], None))
+    return copies, packet_ins
+
+
+def run_arp(n_diamonds, hosts_per_side, mode, seconds=600, refresh=60, capacity=4096, seed=1):
+    # Ogni host chiede con un broadcast ARP il MAC dei suoi interlocutori
+    # (la coppia in Topology Slicing, tutti gli altri host in Service
+    # Slicing) ogni refresh secondi, con fasi casuali. Senza proxy ogni
+    # richiesta inonda la slice; con il proxy solo quelle che il controller
+    # non sa risolvere, a cui la risposta della destinazione insegna il MAC.
+    H, PORT_MAP, slices, pairs = diamond_chain(n_diamonds, hosts_per_side)
+    if mode == 'topology':
+        spec = dict(slice_policy.TOPOLOGY_SPEC, slices=slices, pairs=pairs)
+        peers = {h: [] for h in H}
+        for a, b in pairs:
+            peers[a].append(b)
+            peers[b].append(a)
+    else:
+        spec = dict(slice_policy.SERVICE_SPEC, slices=slices)
+        peers = {h: [other for other in H if other != h] for h in H}
+    ip = {h: '10.%d.%d.%d' % tuple(int(h[1:]).to_bytes(3, 'big')) for h in H}
+    neighbors = {dpid: {port: name for name, port in ports.items()} for dpid, ports in PORT_MAP.items()}
+
+    rnd = random.Random(seed)
+    requests = sorted((rnd.uniform(0, refresh) + k * refresh, h, peer)
+                      for h in H for peer in peers[h] for k in range(seconds // refresh))
+
+    results = []
+    for proxy in (False, True):
+        compiler = slice_policy.SlicePolicyCompiler(H, PORT_MAP, dict(spec, arp_proxy=proxy))
+        compiler.compile()
+        now = [0.0]
+        responder = arp_proxy.ArpProxy(capacity, clock=lambda: now[0])
+        flood = {}
+        copies = packet_ins = 0
+        for t, h, peer in requests:
+            now[0] = t
+            dpid = compiler.host_dpid[h]
+            port = compiler.PORT_MAP[dpid][h]
+            if proxy:
+                packet_ins += 1
+                action, _ = responder.decide(arp_proxy.arp.ARP_REQUEST, H[h], ip[h], ip[peer],
+                                             compiler.arp_allowed)
+                if action != arp_proxy.FORWARD:
+                    continue
+                # La risposta della destinazione passa anche lei dal proxy
+                packet_ins += 1
+                responder.decide(arp_proxy.arp.ARP_REPLY, H[peer], ip[peer], ip[h], compiler.arp_allowed)
+            if (dpid, port) not in flood:
+                entry = compiler.arp_fallback(dpid, port) if proxy else None
+                flood[(dpid, port)] = arp_copies(compiler, neighbors, dpid, port, entry)
+            copies += flood[(dpid, port)][0]
+            packet_ins += flood[(dpid, port)][1]
+        results.append((copies, packet_ins, responder.answered))
+    return len(PORT_MAP), len(H), len(requests), results
+
+
+def run_transitions(hosts_per_side):
+    # Il controller dinamico vero, con datapath finti al posto degli switch
+    ctrl = dynamic_controller(hosts_per_side)
+    for dpid in ctrl.PORT_MAP:
+        dp = FakeDatapath(dpid)
+        ctrl.datapaths[dpid] = dp
+        ctrl.metrics.add_datapath(dpid)
+        ctrl.shadow.reset(dpid, ctrl.policy.flow_table(dpid))
+
+    # Transizioni reali alternate a richieste ripetute (flapping del monitor)
+    sequence = ['UPPER', 'UPPER', 'LOWER', 'LOWER', 'UPPER', 'LOWER', 'LOWER', 'UPPER']
+    results = []
+    for target in sequence:
+        # Prima: ogni chiamata rispediva tutte le regole a Priorità 250 (ADD)
+        before = sum(len(entries) for entries in ctrl.policy.compile_override(target).values())
+        sent = ctrl.programmer.sent_msgs
+        ctrl.apply_slice_policy(target)
+        results.append((target, before, ctrl.programmer.sent_msgs - sent))
+    return results
+
+
+def run_multipath(n_flows, video_mbps, seed=1):
+    ctrl = dynamic_controller()
+    ctrl.steering = 'select'
+    dps = {dpid: FakeDatapath(dpid) for dpid in (1, 4)}
+    for dpid, dp in dps.items():
+        ctrl.datapaths[dpid] = dp
+        ctrl.metrics.add_datapath(dpid)
+        ctrl.install_groups(dp)
+        ctrl.programmer.flush(dp)
+
+    capacity = slice_policy.SLICE_CAPACITY
+    video_slice = slice_policy.SERVICE_SPEC['video']
+    rnd = random.Random(seed)
+    results = []
+    for mbps in video_mbps:
+        sent = ctrl.programmer.sent_msgs
+        for dpid in dps:
+            ctrl._update_video_speed(dpid, mbps * 1e6 / 8)
+        group_mods = ctrl.programmer.sent_msgs - sent
+
+        # Capacità rimasta al traffico standard su ogni percorso (s1 -> s4)
+        spare = {name: max(0.0, bps - (mbps * 1e6 if name == video_slice else 0.0))
+                 for name, bps in capacity.items()}
+
+        # Policy globale: tutti i flussi sulla slice scelta dalla soglia video
+        single = 'LOWER' if mbps * 1e6 / 8 > ctrl.bandwidth_threshold else 'UPPER'
+        single_total = spare[single]
+
+        # SELECT: ogni flusso finisce in un bucket secondo l'hash dei suoi
+        # campi, in proporzione al peso; i flussi di un percorso se lo dividono
+        names = sorted(ctrl.pairs.select_weights)
+        weights = [ctrl.pairs.select_weights[name] for name in names]
+        counts = dict.fromkeys(names, 0)
+        for _ in range(n_flows):
+            counts[rnd.choices(names, weights)[0]] += 1
+        select_total = sum(spare[name] for name in names if counts[name])
+        per_flow = min(spare[name] / counts[name] for name in names if counts[name])
+
+        # Senza gruppo bisognerebbe riscrivere le regole per destinazione
+        rewrites = sum(len(entries) for entries in ctrl.policy.compile_select().values())
+        results.append((mbps, dict(ctrl.pairs.select_weights), single, single_total / 1e6, single_total / n_flows / 1e6,
+                        select_total / 1e6, per_flow / 1e6, group_mods, rewrites))
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark della policy compilata e della sua installazione')
+    parser.add_argument('sizes', type=int, nargs='*', default=[4, 10, 100, 1000], metavar='numero_switch',
+                        help='numeri di switch della catena di diamanti')
+    sizes = parser.parse_args().sizes
+    print(f"{'modo':<10}{'switch':>8}{'regole':>9}{'compile ms':>12}{'install ms':>12}"
+          f"{'batch ms':>10}{'scritture':>14}{'cache us/dp':>13}")
+    for n in sizes:
+        for mode, switches, rules, compile_ms, install_ms, batch_ms, writes, lookup_us in run(n):
+            print(f"{mode:<10}{switches:>8}{rules:>9}{compile_ms:>12.2f}{install_ms:>12.2f}"
+                  f"{batch_ms:>10.2f}{'%d/%d' % writes:>14}{lookup_us:>13.2f}")
+
+    print("\nTopologia scoperta: caricamento, compilazione e link di UPPER che cade e torna")
+    print(f"{'switch':>8}{'host':>6}{'load ms':>10}{'compile ms':>12}{'segmenti':>10}{'flap ms':>10}{'tutti ms':>10}")
+    for n in sizes:
+        switches, hosts, load_ms, compile_ms, flap_segments, flap_ms, full_ms = run_discovery(n)
+        print(f"{switches:>8}{hosts:>6}{load_ms:>10.2f}{compile_ms:>12.2f}{flap_segments:>10}{flap_ms:>10.3f}"
+              f"{full_ms:>10.3f}")
+
+    print("\nPipeline a due tabelle: regole e installazione alla connessione")
+    print(f"{'host':>6}  {'modo':<10}{'tabelle':<11}{'regole':>9}{'max/switch':>12}{'install ms':>12}{'KiB':>10}")
+    for hosts in (4, 16, 64, 256, 1024, 4096):
+        for mode, layout, rules, edge, install_ms, sent_bytes in run_pipeline(hosts):
+            print(f"{hosts:>6}  {mode:<10}{layout:<11}{rules:>9}{edge:>12}{install_ms:>12.2f}"
+                  f"{sent_bytes / 1024:>10.1f}")
+
+    print("\nProxy ARP: copie dei broadcast ARP in 600 s (richieste ogni 60 s per interlocutore)")
+    print(f"{'modo':<10}{'switch':>8}{'host':>6}{'richieste':>11}{'copie prima':>13}{'dopo':>9}{'risparmio':>11}"
+          f"{'packet-in prima':>17}{'dopo':>8}{'risposte':>10}")
+    for mode in ('topology', 'service'):
+        for n_diamonds, hosts_per_side in ((1, 2), (10, 16), (100, 64)):
+            switches, hosts, requests, ((before, pi_before, _), (after, pi_after, answered)) = \
+                run_arp(n_diamonds, hosts_per_side, mode)
+            print(f"{mode:<10}{switches:>8}{hosts:>6}{requests:>11}{before:>13}{after:>9}"
+                  f"{1 - after / before:>11.1%}{pi_before:>17}{pi_after:>8}{answered:>10}")
+
+    for hosts in (2, 64):
+        print(f"\nTransizioni di slice ({2 * hosts} host): FlowMod prima -> dopo")
+        total_before = total_after = 0
+        for target, before, after in run_transitions(hosts):
+            print(f"  -> {target:<6}{before:>8}{after:>8}")
+            total_before += before
+            total_after += after
+        print(f"  totale{total_before:>10}{total_after:>8}")
+
+    print("\nMultipath s1 -> s4, 16 flussi TCP elastici: throughput aggregato (Mbps)")
+    print(f"{'video':>7}{'pesi U/L':>10}{'globale':>14}{'per flusso':>12}{'SELECT':>9}{'min flusso':>12}"
+          f"{'GroupMod':>10}{'FlowMod':>9}")
+    for mbps, weights, single, single_total, single_flow, select_total, per_flow, group_mods, rewrites \
+            in run_multipath(16, [0.0, 0.4, 2.0, 5.0, 8.0, 9.5, 0.0]):
+        print(f"{mbps:>7.1f}{'%d/%d' % (weights['UPPER'], weights['LOWER']):>10}"
+              f"{single_total:>8.2f} {single:<5}{single_flow:>12.3f}{select_total:>9.2f}{per_flow:>12.3f}"
+              f"{group_mods:>10}{rewrites:>9}")
@@ -0,0 +1,387 @@
+# benchmark_restart.py
+# Riavvio del controller dinamico con gli switch che restano accesi: a
+# freddo (nessuna istantanea, tabella rispedita per intero alla
+# riconnessione, come prima) contro a caldo (stato ripreso da
+# $SLICE_CONTROLLER_STATE, regole, gruppi e meter letti dallo switch e
+# corretti solo dove differiscono).
+# Gli switch finti tengono regole, gruppi e meter e applicano i messaggi
+# come uno switch vero: un ADD su una regola già presente ne riazzera la
+# durata (i contatori restano, niente OFPFF_RESET_COUNTS), la cancellazione
+# di un gruppo o di un meter porta via le regole che lo usano. Il video
+# sugli switch di bordo parte sopra la soglia e poi scende sotto la metà:
+# il primo controller (steering globale) sposta il traffico standard su
+# UPPER con le regole dinamiche, salva lo stato e si ferma; il
+# secondo si collega agli stessi switch --downtime secondi dopo, senza
+# topologia scoperta: a caldo la riprende dall'istantanea, altrimenti la
+# riportano dopo la connessione gli eventi di ryu.topology. Con la lettura
+# dello stato ma senza istantanea la riconciliazione aspetta la topologia.
+# Per modo:
+#   - messaggi spediti alla riconnessione, regole tolte (anche a cascata) e
+#     per quanti FlowMod restano assenti, regole riscritte
+#   - regole sullo switch diverse da quelle che il controller crede di avere
+#   - slice del traffico standard, primo rate video dopo il riavvio e
+#     secondi prima che il traffico standard torni sulla slice di prima
+# Poi la riconciliazione a caldo con qualche regola tolta o cambiata a mano,
+# e i tempi per switch al crescere della tabella.
+#
+# Uso: python benchmark_restart.py [--downtime 3] [--flowmod-us 500] [--sizes 100,1000,10000]
+import argparse
+import os
+import tempfile
+import time
+
+from ryu.controller import ofp_event
+from ryu.lib import hub
+
+from benchmark_controllers import hosts_for
+from benchmark_policy import FakeDatapath, diamond_chain, dynamic_controller
+import controller_state
+import slice_policy
+
+RUN_BEFORE = 60.0
+# Istante in cui il video scende sotto metà soglia
+VIDEO_STEP = 20.0
+
+
+class SwitchDatapath(FakeDatapath):
+    # Switch con stato. Le richieste di statistiche restano in coda finché
+    # il benchmark non risponde
+    def __init__(self, dpid):
+        super(SwitchDatapath, self).__init__(dpid)
+        # chiave -> [FlowEntry, istante di installazione, byte]
+        self.flows = {}
+        self.groups = {}
+        # meter_id -> (flag, bande)
+        self.meters = {}
+        self.meter_since = {}
+        self.requests = []
+        self.ops = 0
+        self.reset_counts()
+
+    def reset_counts(self):
+        self.removed = {}
+        self.stats = {'tolte': 0, 'riscritte': 0, 'nuove': 0, 'modificate': 0, 'assenza': 0}
+
+    def send_msg(self, msg):
+        if isinstance(msg, self.ofproto_parser.OFPMultipartRequest):
+            self.set_xid(msg)
+            self.requests.append(msg)
+            return True
+        return super(SwitchDatapath, self).send_msg(msg)
+
+    def apply(self, msg, now):
+        ofproto = self.ofproto
+        parser = self.ofproto_parser
+        self.ops += 1
+        if isinstance(msg, parser.OFPFlowMod):
+            entry = slice_policy.FlowEntry.from_stats(msg)
+            key = entry.key()
+            current = self.flows.get(key)
+            if msg.command == ofproto.OFPFC_ADD:
+                if current is not None:
+                    self.stats['riscritte'] += 1
+                    current[0], current[1] = entry, now
+                else:
+                    self.stats['nuove'] += 1
+                    self.flows[key] = [entry, now, 0]
+                    if key in self.removed:
+                        # FlowMod passati senza la regola
+                        self.stats['assenza'] = max(self.stats['assenza'], self.ops - self.removed.pop(key))
+            elif msg.command == ofproto.OFPFC_MODIFY_STRICT:
+                if current is not None:
+                    self.stats['modificate'] += 1
+                    current[0] = entry
+            elif msg.command == ofproto.OFPFC_DELETE_STRICT:
+                if self.flows.pop(key, None) is not None:
+                    self.stats['tolte'] += 1
+        elif isinstance(msg, parser.OFPGroupMod):
+            if msg.command == ofproto.OFPGC_DELETE:
+                ids = set(self.groups) if msg.group_id == ofproto.OFPG_ALL else {msg.group_id}
+                for group_id in ids:
+                    self.groups.pop(group_id, None)
+                self._cascade(lambda entry: entry.group in ids)
+            else:
+                self.groups[msg.group_id] = slice_policy.GroupEntry.from_stats(msg)
+        elif isinstance(msg, parser.OFPMeterMod):
+            if msg.command == ofproto.OFPMC_DELETE:
+                ids = set(self.meters) if msg.meter_id == ofproto.OFPM_ALL else {msg.meter_id}
+                for meter_id in ids:
+                    self.meters.pop(meter_id, None)
+                self._cascade(lambda entry: entry.meter in ids)
+            else:
+                if msg.command == ofproto.OFPMC_ADD or msg.meter_id not in self.meter_since:
+                    self.meter_since[msg.meter_id] = now
+                self.meters[msg.meter_id] = (msg.flags, msg.bands)
+
+    def _cascade(self, uses):
+        # Le regole che usano un gruppo o un meter cancellato spariscono
+        for key in [key for key, (entry, _, _) in self.flows.items() if uses(entry)]:
+            del self.flows[key]
+            self.removed[key] = self.ops
+            self.stats['tolte'] += 1
+
+    def mismatch(self, shadow):
+        # Regole diverse tra switch e shadow del controller (priorità della policy)
+        installed = {key: entry.action_key() for key, (entry, _, _) in self.flows.items()}
+        believed = {key: entry.action_key() for key, entry in shadow.items()}
+        return sum(1 for key in set(installed) | set(believed) if installed.get(key) != believed.get(key))
+
+
+class RestartHarness(object):
+
+    def __init__(self, hosts):
+        self.hosts = hosts
+        self.now = 0.0
+        self.switches = {}
+        self.timers = []
+        self.video = 0.0
+
+    def controller(self, reconcile, discovered=True):
+        ctrl = dynamic_controller(self.hosts, discovered)
+        # Il polling lo guida il benchmark, sul tempo simulato
+        hub.kill(ctrl.monitor_thread)
+        ctrl.steering = 'global'
+        ctrl.reconciler.enabled = reconcile
+        ctrl.clock = lambda: self.now
+        ctrl.call_later = lambda delay, fn, *args: self.timers.append((self.now + delay, fn, args))
+        if not self.switches:
+            self.switches = {dpid: SwitchDatapath(dpid) for dpid in ctrl.PORT_MAP}
+        add = ctrl.programmer.add
+
+        def apply(dp, msg):
+            self.switches[dp.id].apply(msg, self.now)
+            return add(dp, msg)
+        ctrl.programmer.add = apply
+        return ctrl
+
+    def connect(self, ctrl):
+        for dpid, dp in self.switches.items():
+            dp.reset_counts()
+            msg = dp.ofproto_parser.OFPSwitchFeatures(dp, datapath_id=dpid, n_buffers=0, n_tables=254,
+                                                      auxiliary_id=0, capabilities=0)
+            ctrl.switch_features_handler(ofp_event.EventOFPSwitchFeatures(msg))
+        self.answer(ctrl)
+
+    def discover(self, ctrl):
+        # Gli eventi di ryu.topology dopo la connessione (link da LLDP e
+        # host), poi la ricompilazione con gli switch già collegati
+        H, PORT_MAP, _, _ = diamond_chain(1, self.hosts)
+        ctrl.discovery.load(H, PORT_MAP)
+        if ctrl.discovery.version != ctrl._policy_version:
+            ctrl._resync()
+
+    def advance(self, until, ctrl=None, step=None):
+        # Contatori dei flussi video fino a until, con i round di polling
+        # di ctrl ogni poll_interval
+        while self.now < until:
+            at = min(until, self.now + step) if step else until
+            rate = self.video_rate(self.now)
+            for dp in self.switches.values():
+                video = [flow for flow in dp.flows.values()
+                         if flow[0].cookie & slice_policy.COOKIE_CLASS_MASK == slice_policy.COOKIE_VIDEO]
+                for flow in video:
+                    flow[2] += int(rate / len(video) * (at - self.now))
+            self.now = at
+            for timer in [timer for timer in self.timers if timer[0] <= self.now]:
+                self.timers.remove(timer)
+                timer[1](*timer[2])
+            if ctrl is not None and step:
+                self.poll(ctrl)
+
+    def video_rate(self, now):
+        # Video per switch di bordo: il triplo della soglia, poi un quarto
+        return self.video * (3.0 if now < VIDEO_STEP else 0.25)
+
+    def poll(self, ctrl):
+        # Un round di DynamicSliceController._monitor con risposte immediate
+        ctrl.collector.start_round()
+        for dp in self.switches.values():
+            if dp.id in ctrl.current_speeds:
+                ctrl._request_video_stats(dp)
+                ctrl._request_meter_stats(dp)
+        self.answer(ctrl)
+        ctrl._close_stats_round()
+
+    def answer(self, ctrl):
+        for dp in self.switches.values():
+            requests, dp.requests = dp.requests, []
+            for req in requests:
+                self.reply(ctrl, dp, req)
+
+    def reply(self, ctrl, dp, req):
+        ofproto = dp.ofproto
+        parser = dp.ofproto_parser
+        if isinstance(req, parser.OFPFlowStatsRequest):
+            msg = parser.OFPFlowStatsReply(dp)
+            msg.body = [self._flow_stats(dp, entry, since, byte_count)
+                        for entry, since, byte_count in dp.flows.values()
+                        if entry.cookie & req.cookie_mask == req.cookie & req.cookie_mask]
+            handler, event = ctrl._flow_stats_reply_handler, ofp_event.EventOFPFlowStatsReply
+        elif isinstance(req, parser.OFPGroupDescStatsRequest):
+            msg = parser.OFPGroupDescStatsReply(dp)
+            msg.body = [parser.OFPGroupDescStats(group.ofp_type(ofproto), group.group_id,
+                                                 group.ofp_buckets(ofproto, parser))
+                        for group in dp.groups.values()]
+            handler, event = ctrl._group_desc_reply_handler, ofp_event.EventOFPGroupDescStatsReply
+        elif isinstance(req, parser.OFPMeterConfigStatsRequest):
+            msg = parser.OFPMeterConfigStatsReply(dp)
+            msg.body = [parser.OFPMeterConfigStats(flags, meter_id, bands)
+                        for meter_id, (flags, bands) in dp.meters.items()]
+            handler, event = ctrl._meter_config_reply_handler, ofp_event.EventOFPMeterConfigStatsReply
+        elif isinstance(req, parser.OFPMeterStatsRequest):
+            msg = parser.OFPMeterStatsReply(dp)
+            msg.body = []
+            for meter_id in dp.meters:
+                duration = self.now - dp.meter_since[meter_id]
+                msg.body.append(parser.OFPMeterStats(
+                    meter_id=meter_id, flow_count=0, packet_in_count=0, byte_in_count=0,
+                    duration_sec=int(duration), duration_nsec=int((duration % 1) * 1e9),
+                    band_stats=[parser.OFPMeterBandStats(packet_band_count=0, byte_band_count=0)]))
+            handler, event = ctrl._meter_stats_reply_handler, ofp_event.EventOFPMeterStatsReply
+        else:
+            # Port stats e aggregate: non servono qui
+            return
+        msg.xid = req.xid
+        msg.flags = 0
+        handler(event(msg))
+
+    def _flow_stats(self, dp, entry, since, byte_count):
+        parser = dp.ofproto_parser
+        duration = self.now - since
+        return parser.OFPFlowStats(
+            table_id=entry.table_id, duration_sec=int(duration), duration_nsec=int((duration % 1) * 1e9),
+            priority=entry.priority, idle_timeout=0, hard_timeout=0, flags=0, cookie=entry.cookie,
+            packet_count=0, byte_count=byte_count, match=entry.ofp_match(parser),
+            instructions=entry.ofp_instructions(dp.ofproto, parser))
+
+
+def restart(reconcile, snapshot, downtime, tamper=False, settle=60.0):
+    fd, path = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    os.unlink(path)
+    previous = os.environ.get(controller_state.STATE_ENV)
+    os.environ[controller_state.STATE_ENV] = path
+    try:
+        harness = RestartHarness(2)
+        first = harness.controller(reconcile=False)
+        harness.video = first.bandwidth_threshold
+        harness.connect(first)
+        harness.advance(RUN_BEFORE, first, first.poll_interval)
+        before = first.global_slice_state
+
+        if not snapshot:
+            os.environ.pop(controller_state.STATE_ENV)
+        harness.advance(harness.now + downtime)
+        if tamper:
+            _tamper(harness, first)
+        # Il secondo controller parte senza topologia: quella dell'istantanea
+        # (se c'è) o nessuna finché ryu.topology non riporta link e host
+        second = harness.controller(reconcile=reconcile, discovered=False)
+        sent = second.programmer.sent_msgs
+        harness.connect(second)
+        harness.discover(second)
+        result = {
+            'before': before, 'after': second.global_slice_state,
+            'messages': second.programmer.sent_msgs - sent,
+            'mismatch': sum(dp.mismatch(second.shadow.tables.get(dpid, {}))
+                            for dpid, dp in harness.switches.items()),
+        }
+        for name in ('tolte', 'riscritte', 'nuove', 'modificate', 'assenza'):
+            result[name] = sum(dp.stats[name] for dp in harness.switches.values())
+
+        # Primo round dopo il riavvio: rate video stimato contro quello vero.
+        # Poi si va avanti finché il traffico standard non torna sulla slice
+        # di prima del riavvio
+        connected = harness.now
+        harness.advance(harness.now + second.poll_interval, second, second.poll_interval)
+        speeds = [speed for speed in second.current_speeds.values() if speed is not None]
+        result['video'] = max(speeds) if speeds else None
+        result['true_video'] = harness.video_rate(harness.now)
+        result['back'] = 0.0
+        if second.global_slice_state != before:
+            while second.global_slice_state != before and harness.now - connected < settle:
+                harness.advance(harness.now + second.poll_interval, second, second.poll_interval)
+            result['back'] = harness.now - connected
+        return result
+    finally:
+        if os.path.exists(path):
+            os.unlink(path)
+        if previous is None:
+            os.environ.pop(controller_state.STATE_ENV, None)
+        else:
+            os.environ[controller_state.STATE_ENV] = previous
+
+
+def _tamper(harness, ctrl):
+    # Mentre il controller è giù: su ogni switch di bordo una regola video
+    # sparisce e una regola di slice esce su un'altra porta
+    for dpid in ctrl.current_speeds:
+        dp = harness.switches[dpid]
+        video = [key for key, (entry, _, _) in dp.flows.items()
+                 if entry.cookie & slice_policy.COOKIE_CLASS_MASK == slice_policy.COOKIE_VIDEO]
+        del dp.flows[video[0]]
+        forward = [flow for flow in dp.flows.values()
+                   if flow[0].out_ports and flow[0].priority >= slice_policy.PRIO_SLICE]
+        entry = forward[0][0]
+        forward[0][0] = entry._replace(out_ports=(entry.out_ports[0] + 100,))
+
+
+def reconcile_time(size, repeat=3):
+    # Riconnessione a tabella già giusta: confronto con lo stato letto
+    # (FlowReconciler.reconcile) contro la tabella spedita per intero
+    # (_install_datapath), tempo del controller per switch
+    harness = RestartHarness(hosts_for(size))
+    ctrl = harness.controller(reconcile=False)
+    harness.connect(ctrl)
+    rules = len(harness.switches[1].flows)
+    timings = {}
+    for warm in (False, True):
+        best = None
+        for _ in range(repeat):
+            again = harness.controller(reconcile=warm)
+            owner = again.reconciler if warm else again
+            name = 'reconcile' if warm else '_install_datapath'
+            method = getattr(owner, name)
+            elapsed = [0.0]
+
+            def timed(*args):
+                start = time.perf_counter()
+                method(*args)
+                elapsed[0] += time.perf_counter() - start
+            setattr(owner, name, timed)
+            sent = again.programmer.sent_msgs
+            harness.connect(again)
+            per_switch = elapsed[0] / len(harness.switches)
+            best = per_switch if best is None else min(best, per_switch)
+        timings[warm] = (best, again.programmer.sent_msgs - sent)
+    return rules, timings
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Riavvio del controller dinamico: a freddo contro a caldo')
+    parser.add_argument('--downtime', type=float, default=3.0, help='secondi con il controller fermo')
+    parser.add_argument('--flowmod-us', type=float, default=500.0, help='tempo per FlowMod sullo switch (us)')
+    parser.add_argument('--sizes', default='100,1000,10000', help='regole su s1 per i tempi di riconnessione')
+    args = parser.parse_args()
+    flowmod_time = args.flowmod_us / 1e6
+
+    def rate(value):
+        return '-' if value is None else f"{value * 8 / 1e6:.2f}"
+
+    print(f"{'riavvio':<26}{'slice prima/dopo':>18}{'msg':>7}{'tolte':>7}{'assenza ms':>12}{'riscritte':>11}"
+          f"{'nuove':>7}{'modif.':>8}{'diverse':>9}{'video Mbps':>12}{'vero':>7}{'ritorno s':>11}")
+    for name, reconcile, snapshot, tamper in (('a freddo', False, False, False), ('a caldo', True, True, False),
+                                              ('lettura, senza istantanea', True, False, False),
+                                              ('a freddo, 2 modifiche', False, False, True),
+                                              ('a caldo, 2 modifiche', True, True, True)):
+        r = restart(reconcile, snapshot, args.downtime, tamper)
+        print(f"{name:<26}{r['before'] + '/' + r['after']:>18}{r['messages']:>7}{r['tolte']:>7}"
+              f"{r['assenza'] * flowmod_time * 1e3:>12.1f}{r['riscritte']:>11}{r['nuove']:>7}{r['modificate']:>8}"
+              f"{r['mismatch']:>9}{rate(r['video']):>12}{rate(r['true_video']):>7}{r['back']:>11.1f}")
+
+    print()
+    print(f"{'regole s1':>10}{'tabella intera ms':>19}{'msg':>7}{'riconciliazione ms':>20}{'msg':>7}")
+    for size in [int(value) for value in args.sizes.split(',')]:
+        rules, timings = reconcile_time(size)
+        (cold, cold_msgs), (warm, warm_msgs) = timings[False], timings[True]
+        print(f"{rules:>10}{cold * 1e3:>19.2f}{cold_msgs:>7}{warm * 1e3:>20.2f}{warm_msgs:>7}")
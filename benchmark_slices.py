@@ -0,0 +1,103 @@
+# benchmark_slices.py
+# Motore a N slice (slice_engine.py): un diamante con --paths da 2 a 32
+# percorsi paralleli, ognuno una slice, tutte descritte solo dalla
+# specifica. Oltre al video (UPPER) e alla slice di default (LOWER) ogni
+# slice in più ha la sua classe di traffico (TCP verso la porta 6000+i) e un
+# rate garantito per tenant (--tenant-mbps): i tenant passano dal controllo
+# di ammissione e chi non ci sta resta sulla slice di default. Per ogni
+# numero di slice:
+#   - tempo di compilazione della policy e regole per switch di bordo e di
+#     transito, bande di priorità usate
+#   - tenant ammessi e rifiutati
+#   - sul simulatore di rete (network_simulator.py), un flusso TCP per
+#     classe da ogni host di sinistra: quota consegnata e flussi che passano
+#     davvero dalla slice della loro classe (solo i tenant ammessi). I
+#     flussi dei tenant rifiutati passano dalle regole della slice di
+#     default, con il meter per host di quella slice: oltre la sua quota
+#     equa una parte si perde
+#
+# Uso: python benchmark_slices.py [secondi] [--paths 2,4,8,16,32] [--hosts 8] [--tenant-mbps 0.4] [--mbps 0.1]
+import argparse
+import time
+
+import network_simulator
+import slice_policy
+import topology_discovery
+from topology_gen import generate_topology
+
+# Porta TCP di destinazione della classe della slice i (0 = UPPER, 1 = LOWER)
+CLASS_PORT_BASE = 6000
+
+
+def describe(paths, hosts, tenant_mbps):
+    # Descrizione della topologia con le classi di traffico delle slice in più
+    desc = generate_topology('diamond', hosts, k_paths=paths)
+    names = list(desc['slices'])
+    desc['classifier'] = {names[0]: slice_policy.VIDEO_MATCH}
+    desc['tenant_rate'] = {}
+    for i, name in enumerate(names[2:], 2):
+        desc['classifier'][name] = {'ip_proto': 6, 'tcp_dst': CLASS_PORT_BASE + i}
+        desc['tenant_rate'][name] = tenant_mbps * 1e6
+    return desc
+
+
+def compile_stats(desc):
+    spec = dict(slice_policy.SERVICE_SPEC, slices=desc['slices'], capacity=desc['capacity'],
+                classifier=desc['classifier'], tenant_rate=desc['tenant_rate'])
+    H, PORT_MAP = topology_discovery.description_tables(desc)
+    compiler = slice_policy.SlicePolicyCompiler(H, PORT_MAP, spec)
+    start = time.perf_counter()
+    tables = compiler.compile()
+    elapsed = time.perf_counter() - start
+    edges = [len(tables[dpid]) for dpid, local in compiler.local_hosts.items() if local]
+    transit = [len(tables[dpid]) for dpid, local in compiler.local_hosts.items() if not local]
+    bands = [band for _, _, band, _ in compiler.classes]
+    return {'compile_ms': elapsed * 1000, 'edge': max(edges), 'transit': max(transit),
+            'bands': (min(bands), max(bands)), 'admitted': len(compiler.admitted),
+            'rejected': len(compiler.rejected)}
+
+
+def simulate(desc, seconds, mbps):
+    ctrl = network_simulator.make_controller(desc)
+    sim = network_simulator.NetworkSimulator(ctrl, desc)
+    hosts = sorted(desc['hosts'], key=lambda name: int(name[1:]))
+    left, right = hosts[:len(hosts) // 2], hosts[len(hosts) // 2:]
+    names = list(desc['slices'])
+    flows = []
+    for src, dst in zip(left, right):
+        for i, name in enumerate(names[2:], 2):
+            flow = sim.add_flow(src, dst, 'tcp', mbps, 0.0, seconds, dst_port=CLASS_PORT_BASE + i)
+            flows.append((flow, name, (name, src) in ctrl.policy.admitted))
+    sim.start()
+    sim.run(seconds)
+
+    # Switch di transito della slice: quelli del percorso tra i due estremi
+    transit = {name: {int(s[1:]) for s in path[1:-1]} for name, path in desc['slices'].items()}
+    offered = sum(flow.rate * seconds for flow, _, _ in flows)
+    delivered = sum(flow.delivered for flow, _, _ in flows)
+    # (le regole dell'ultimo percorso restano anche dopo la fine del flusso)
+    on_slice = sum(1 for flow, name, admitted in flows
+                   if admitted and transit[name] <= {dpid for dpid, _, _ in flow.rules})
+    return {'share': delivered / offered if offered else None, 'on_slice': on_slice,
+            'admitted_flows': sum(1 for _, _, admitted in flows if admitted), 'flows': len(flows)}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Motore a N slice con controllo di ammissione')
+    parser.add_argument('seconds', type=float, nargs='?', default=20.0, help='tempo simulato')
+    parser.add_argument('--paths', default='2,4,8,16,32', help='numeri di slice separati da virgola')
+    parser.add_argument('--hosts', type=int, default=8)
+    parser.add_argument('--tenant-mbps', type=float, default=0.4, help='rate garantito per tenant')
+    parser.add_argument('--mbps', type=float, default=0.1, help='domanda di ogni flusso di classe')
+    args = parser.parse_args()
+
+    print(f"{'slice':>6}{'compila ms':>12}{'regole bordo':>14}{'transito':>10}{'bande':>12}"
+          f"{'ammessi':>9}{'rifiutati':>11}{'consegnato %':>14}{'sulla slice':>13}")
+    for paths in [int(p) for p in args.paths.split(',')]:
+        desc = describe(paths, args.hosts, args.tenant_mbps)
+        c = compile_stats(desc)
+        s = simulate(desc, args.seconds, args.mbps)
+        share = '-' if s['share'] is None else f"{s['share'] * 100:.1f}"
+        print(f"{paths:>6}{c['compile_ms']:>12.2f}{c['edge']:>14}{c['transit']:>10}"
+              f"{'%d-%d' % c['bands']:>12}{c['admitted']:>9}{c['rejected']:>11}{share:>14}"
+              f"{'%d/%d' % (s['on_slice'], s['admitted_flows']):>13}")
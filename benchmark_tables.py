@@ -0,0 +1,91 @@
+# benchmark_tables.py
+# Occupazione delle tabelle dei flussi sul simulatore di rete
+# (network_simulator.py), catena a diamante con molti host e steering per
+# coppia: ogni switch di bordo ha una regola per coppia di host, più di
+# quante ne stiano nella tabella dello switch simulato (--capacity regole).
+# Senza gestione (come prima: nessun timeout, nessuna soglia) le regole che
+# non ci stanno sono rifiutate e le loro coppie restano sulla slice di
+# default; con table_manager le regole per coppia scadono senza traffico
+# (--idle secondi), sopra la soglia alta si tolgono quelle colpite meno di
+# recente e le coppie che tornano attive riprendono una regola propria.
+# Traffico: a fasi di --phase secondi, --active coppie a caso (sinistra ->
+# destra) con trasferimenti TCP da --mbps. Per modo:
+#   - traffico standard consegnato e quota della domanda
+#   - regole rifiutate dagli switch, regole tolte, coppie aggregate alla fine
+#   - occupazione massima e finale della tabella più piena
+#
+# Uso: python benchmark_tables.py [secondi] [--hosts 32] [--capacity 256] [--active 16] [--mbps 0.5]
+#                                 [--phase 60] [--idle 20]
+import argparse
+import random
+
+import network_simulator
+import slice_policy
+from topology_gen import generate_topology
+
+
+def add_traffic(sim, seconds, active, mbps, phase, seed):
+    rnd = random.Random(seed)
+    hosts = sorted(sim.desc['hosts'], key=lambda name: int(name[1:]))
+    left, right = hosts[:len(hosts) // 2], hosts[len(hosts) // 2:]
+    pairs = [(src, dst) for src in left for dst in right]
+    t = 0.0
+    while t < seconds:
+        for src, dst in rnd.sample(pairs, active):
+            sim.add_flow(src, dst, 'tcp', mbps, t, min(seconds, t + phase))
+        t += phase
+
+
+def run(seconds, managed, hosts, capacity, active, mbps, phase, idle, seed=1):
+    desc = generate_topology('diamond', hosts)
+    ctrl = network_simulator.make_controller(desc)
+    ctrl.steering = 'pair'
+    if managed:
+        ctrl.table_manager.timeouts[slice_policy.COOKIE_PAIR] = (idle, 0)
+    else:
+        ctrl.table_manager.timeouts = {}
+        ctrl.table_manager.high_watermark = ctrl.table_manager.low_watermark = float('inf')
+    sim = network_simulator.NetworkSimulator(ctrl, desc, table_capacity=capacity)
+    add_traffic(sim, seconds, active, mbps, phase, seed)
+
+    # Occupazione massima vista dal controller, dopo ogni lettura
+    peak = [0.0]
+    handler = ctrl._table_stats_reply_handler
+
+    def wrapper(ev):
+        handler(ev)
+        peak[0] = max([peak[0]] + list(ctrl.table_manager.occupancy(ev.msg.datapath.id).values()))
+    ctrl._table_stats_reply_handler = wrapper
+
+    sim.start()
+    sim.run(seconds)
+
+    offered = sum(flow.rate * (flow.stop - flow.start) for flow in sim.flows)
+    delivered = sum(flow.delivered for flow in sim.flows)
+    final = max(len(entries) for switch in sim.switches.values() for entries in switch.tables.values())
+    return {
+        'standard_mbps': delivered * 8 / seconds / 1e6, 'share': delivered / offered if offered else 0.0,
+        'rejected': sum(switch.rejected for switch in sim.switches.values()),
+        'evictions': ctrl.table_manager.evictions, 'expired': sim.flows_removed,
+        'aggregated': len(ctrl.pairs.aggregated), 'peak': peak[0], 'final': final / capacity,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Tabelle dei flussi piene: senza e con table_manager')
+    parser.add_argument('seconds', type=float, nargs='?', default=300.0, help='tempo simulato')
+    parser.add_argument('--hosts', type=int, default=32)
+    parser.add_argument('--capacity', type=int, default=256, help='regole per tabella degli switch')
+    parser.add_argument('--active', type=int, default=16, help='coppie attive per fase')
+    parser.add_argument('--mbps', type=float, default=0.5, help='domanda di ogni trasferimento')
+    parser.add_argument('--phase', type=float, default=60.0, help='durata di una fase')
+    parser.add_argument('--idle', type=int, default=20, help='idle_timeout delle regole per coppia')
+    args = parser.parse_args()
+
+    print(f"{'gestione':<10}{'std Mbps':>10}{'std %':>8}{'rifiutate':>11}{'tolte':>8}{'scadute':>9}"
+          f"{'aggregate':>11}{'max occ.':>10}{'occ. finale':>13}")
+    for managed in (False, True):
+        r = run(args.seconds, managed, args.hosts, args.capacity, args.active, args.mbps, args.phase, args.idle)
+        print(f"{'sì' if managed else 'no':<10}{r['standard_mbps']:>10.2f}{r['share'] * 100:>8.1f}{r['rejected']:>11}"
+              f"{r['evictions']:>8}{r['expired']:>9}{r['aggregated']:>11}{r['peak'] * 100:>9.0f}%"
+              f"{r['final'] * 100:>12.0f}%")
@@ -0,0 +1,352 @@
+# benchmark_transitions.py
+# Pacchetti persi e fuori ordine durante i cambi di slice del controller
+# dinamico: transizioni dirette (come prima, FlowMod spediti a s1 e s4 in
+# lotti indipendenti) contro transizioni in due fasi (bundle preparati su
+# tutti gli switch, commit solo dopo tutte le conferme).
+# Harness a pacchetti sulla catena a diamante, senza Mininet: ogni switch ha
+# la sua latenza verso il controller (s4 più lontano di --skew-ms) e applica
+# un FlowMod ogni --flowmod-us, un bundle confermato cambia tutte le regole
+# in un colpo. Il traffico standard tra tutte le coppie di host remoti, nei
+# due versi, attraversa gli switch hop per hop con code FIFO alla capacità
+# della slice (i meter non sono modellati). Per ogni transizione:
+#   - pacchetti persi (coda piena o nessuna regola) e arrivati fuori ordine
+#   - tempo medio per coppia con andata e ritorno su slice diverse
+#   - scarto tra il primo e l'ultimo cambio delle regole d'ingresso
+#
+# Uso: python benchmark_transitions.py [--hosts 8] [--transitions 10] [--period 2.0]
+#                                      [--skew-ms 5] [--latency-ms 1] [--flowmod-us 500]
+#                                      [--load 0.8] [--burst 8] [--seed 1]
+import argparse
+import heapq
+import random
+
+from ryu.controller import ofp_event
+from ryu.lib import hub
+
+from benchmark_policy import FakeDatapath, dynamic_controller
+from network_simulator import HOST_LINK_MBPS, QUEUE_BYTES, SimSwitch
+import slice_policy
+
+# Pacchetti piccoli: la slice lenta (1 Mbps) ne porta 1000 al secondo
+PACKET_BYTES = 125
+LINK_DELAY = 0.0001
+WARMUP = 1.0
+
+
+class HarnessDatapath(FakeDatapath):
+    # I lotti non si decodificano: le regole le registra l'harness
+    def send(self, buf):
+        self.writes += 1
+        self.sent_bytes += len(buf)
+        return True
+
+
+class Packet(object):
+    __slots__ = ('flow', 'seq', 'window')
+
+    def __init__(self, flow, seq, window):
+        self.flow = flow
+        self.seq = seq
+        self.window = window
+
+
+class TransitionHarness(object):
+
+    def __init__(self, ctrl, latency, flowmod_time, load, burst, seed):
+        self.ctrl = ctrl
+        self.now = 0.0
+        self._events = []
+        self._seq = 0
+        self.flowmod_time = flowmod_time
+        self.rnd = random.Random(seed)
+
+        policy = ctrl.policy
+        self.H = ctrl.H
+        self.PORT_MAP = ctrl.PORT_MAP
+        self.switches = {}
+        self.tables = {}
+        self.groups = {}
+        for dpid, ports in self.PORT_MAP.items():
+            self.switches[dpid] = SimSwitch(dpid, {port: name for name, port in ports.items()})
+            self.tables[dpid] = {entry.key(): entry for entry in policy.flow_table(dpid)}
+            self.groups[dpid] = list(policy.group_table(dpid))
+            self.switches[dpid].install(self.tables[dpid].values(), self.groups[dpid], 0.0)
+        self.host_at = {}
+        for dpid, ports in self.PORT_MAP.items():
+            for name, port in ports.items():
+                if name in self.H:
+                    self.host_at[name] = (dpid, port)
+        self.edges = sorted({dpid for dpid, _ in self.host_at.values()})
+
+        # Banda dei link: quella della slice che li usa, gli host a parte
+        self.capacity = {}
+        for name, path in policy.slices.items():
+            rate = policy.spec['capacity'][name] / 8
+            for a, b in zip(path, path[1:]):
+                self.capacity[(a, self.PORT_MAP[a][f"s{b}"])] = rate
+                self.capacity[(b, self.PORT_MAP[b][f"s{a}"])] = rate
+        self.free_at = {}
+
+        # Controller collegato a datapath che non rispondono da soli
+        self.latency = latency
+        self.busy = {dpid: 0.0 for dpid in self.switches}
+        self.bundles = {}
+        self.ops = {}
+        for dpid in self.switches:
+            ctrl.datapaths[dpid] = HarnessDatapath(dpid)
+            ctrl.metrics.add_datapath(dpid)
+            ctrl.shadow.reset(dpid, self.tables[dpid].values())
+        ctrl.clock = lambda: self.now
+        ctrl.call_later = lambda delay, fn, *args: self.schedule(self.now + delay, fn, *args)
+        self._capture()
+
+        # Flussi standard a raffiche di burst pacchetti (come le finestre
+        # TCP), in media load x la slice lenta in ogni verso
+        self.flows = policy.host_pairs()
+        slowest = min(policy.spec['capacity'].values()) / 8
+        per_edge = max(sum(1 for src, _ in self.flows if self.host_at[src][0] == dpid) for dpid in self.edges)
+        self.burst = burst
+        self.interval = per_edge * PACKET_BYTES * burst / (load * slowest)
+        self.next_seq = [0] * len(self.flows)
+        self.max_seq = [-1] * len(self.flows)
+        # Per finestra (una per transizione): spediti, persi, fuori ordine
+        self.windows = []
+        self.window = None
+        self.edge_changes = []
+        # Coppie con andata e ritorno su slice diverse, integrate nel tempo
+        self.pair_of = {}
+        for i, (src, dst) in enumerate(self.flows):
+            self.pair_of.setdefault(tuple(sorted((src, dst))), []).append(i)
+        self.asymmetric = 0
+        self._asym_since = 0.0
+
+    # --- EVENTI ---
+    def schedule(self, at, fn, *args):
+        self._seq += 1
+        heapq.heappush(self._events, (at, self._seq, fn, args))
+
+    def run(self, until):
+        while self._events and self._events[0][0] <= until:
+            at, _, fn, args = heapq.heappop(self._events)
+            self.now = at
+            fn(*args)
+        self._integrate(until)
+        self.now = until
+
+    # --- CANALE DI CONTROLLO ---
+    def _capture(self):
+        # Le regole accodate per ogni datapath, poi il tipo di invio
+        ctrl, programmer = self.ctrl, self.ctrl.programmer
+
+        def add_entry(dp, entry, command=None):
+            self.ops.setdefault(dp.id, []).append(('add', entry))
+            return add_entry.original(dp, entry, command)
+
+        def delete_entry(dp, entry):
+            self.ops.setdefault(dp.id, []).append(('delete', entry))
+            return delete_entry.original(dp, entry)
+        add_entry.original, delete_entry.original = ctrl.add_entry, ctrl.delete_entry
+        ctrl.add_entry, ctrl.delete_entry = add_entry, delete_entry
+
+        for name in ('flush', 'stage', 'commit', 'discard'):
+            original = getattr(programmer, name)
+
+            def wrapper(dp, name=name, original=original):
+                ops = self.ops.pop(dp.id, [])
+                xid = original(dp)
+                if xid is not None:
+                    getattr(self, '_' + name)(dp, ops, xid)
+                return xid
+            setattr(programmer, name, wrapper)
+
+    def _arrival(self, dpid, work):
+        # Lo switch elabora i messaggi uno alla volta, all'arrivo
+        start = max(self.now + self.latency[dpid], self.busy[dpid])
+        self.busy[dpid] = start + work
+        return start
+
+    def _flush(self, dp, ops, xid):
+        start = self._arrival(dp.id, len(ops) * self.flowmod_time)
+        for i, op in enumerate(ops):
+            self.schedule(start + (i + 1) * self.flowmod_time, self._apply, dp.id, [op])
+        self.schedule(self.busy[dp.id] + self.latency[dp.id], self._barrier, dp, xid)
+
+    def _stage(self, dp, ops, xid):
+        # Bundle validato ma non applicato
+        self._arrival(dp.id, len(ops) * self.flowmod_time)
+        self.bundles[dp.id] = ops
+        self.schedule(self.busy[dp.id] + self.latency[dp.id], self._barrier, dp, xid)
+
+    def _commit(self, dp, ops, xid):
+        start = self._arrival(dp.id, 0.0)
+        self.schedule(start, self._apply, dp.id, self.bundles.pop(dp.id, []))
+        self.schedule(start + self.latency[dp.id], self._barrier, dp, xid)
+
+    def _discard(self, dp, ops, xid):
+        self._arrival(dp.id, 0.0)
+        self.bundles.pop(dp.id, None)
+        self.schedule(self.busy[dp.id] + self.latency[dp.id], self._barrier, dp, xid)
+
+    def _barrier(self, dp, xid):
+        msg = dp.ofproto_parser.OFPBarrierReply(dp)
+        msg.xid = xid
+        self.ctrl._barrier_reply_handler(ofp_event.EventOFPBarrierReply(msg))
+
+    def _apply(self, dpid, ops):
+        table = self.tables[dpid]
+        for op, entry in ops:
+            if op == 'add':
+                table[entry.key()] = entry
+            else:
+                table.pop(entry.key(), None)
+        self.switches[dpid].install(table.values(), self.groups[dpid], self.now)
+        if dpid in self.edges and any(entry.priority >= slice_policy.PRIO_OVERRIDE for _, entry in ops):
+            self.edge_changes.append(self.now)
+            self._integrate(self.now)
+            self.asymmetric = sum(1 for flows in self.pair_of.values()
+                                  if len({self._ingress_slice(i) for i in flows}) > 1)
+
+    # --- TRAFFICO ---
+    def _fields(self, i):
+        src, dst = self.flows[i]
+        return {'eth_type': slice_policy.ETH_TYPE_IP, 'eth_src': self.H[src], 'eth_dst': self.H[dst],
+                'ip_proto': 6}
+
+    def _ingress_slice(self, i):
+        # Vicino scelto dallo switch d'ingresso del flusso
+        dpid, in_port = self.host_at[self.flows[i][0]]
+        switch = self.switches[dpid]
+        entries = switch.lookup(dict(self._fields(i), in_port=in_port))
+        return switch.ports.get(switch.output(entries[-1], in_port, i)) if entries else None
+
+    def _integrate(self, until):
+        if self.window is not None:
+            self.window['asymmetric'] += self.asymmetric * (until - self._asym_since)
+        self._asym_since = until
+
+    def start(self, stop):
+        self.stop = stop
+        for i in range(len(self.flows)):
+            self.schedule(self.rnd.uniform(0.0, self.interval), self._send, i)
+
+    def _send(self, i):
+        if self.now >= self.stop:
+            return
+        dpid, in_port = self.host_at[self.flows[i][0]]
+        for _ in range(self.burst):
+            packet = Packet(i, self.next_seq[i], self.window)
+            self.next_seq[i] += 1
+            if self.window is not None:
+                self.window['sent'] += 1
+            self._forward(packet, dpid, in_port)
+        self.schedule(self.now + self.interval, self._send, i)
+
+    def _forward(self, packet, dpid, in_port):
+        switch = self.switches[dpid]
+        entries = switch.lookup(dict(self._fields(packet.flow), in_port=in_port))
+        out_port = switch.output(entries[-1], in_port, packet.flow) if entries else None
+        neighbor = switch.ports.get(out_port)
+        link = (dpid, out_port)
+        rate = self.capacity.get(link, HOST_LINK_MBPS * 1e6 / 8)
+        start = max(self.now, self.free_at.get(link, 0.0))
+        if neighbor is None or (start - self.now) * rate > QUEUE_BYTES:
+            self._drop(packet)
+            return
+        self.free_at[link] = start + PACKET_BYTES / rate
+        at = self.free_at[link] + LINK_DELAY
+        if neighbor in self.H:
+            self.schedule(at, self._deliver, packet, neighbor)
+        else:
+            nxt = int(neighbor[1:])
+            self.schedule(at, self._forward, packet, nxt, self.PORT_MAP[nxt][f"s{dpid}"])
+
+    def _drop(self, packet):
+        if packet.window is not None:
+            packet.window['lost'] += 1
+
+    def _deliver(self, packet, host):
+        if host != self.flows[packet.flow][1]:
+            self._drop(packet)
+            return
+        # Il riordino è della transizione in corso all'arrivo: i pacchetti
+        # rimasti in coda sulla slice lenta vengono superati dopo il cambio
+        if packet.seq < self.max_seq[packet.flow] and self.window is not None:
+            self.window['reordered'] += 1
+        self.max_seq[packet.flow] = max(self.max_seq[packet.flow], packet.seq)
+
+    # --- TRANSIZIONI ---
+    def transition(self, target):
+        self._integrate(self.now)
+        self.window = {'target': target, 'at': self.now, 'sent': 0, 'lost': 0, 'reordered': 0,
+                       'asymmetric': 0.0, 'changes': len(self.edge_changes)}
+        self.windows.append(self.window)
+        self.ctrl.apply_slice_policy(target)
+
+
+def run(consistent, hosts, transitions, period, latency, skew, flowmod_time, load, burst, seed):
+    ctrl = dynamic_controller(hosts)
+    # Il polling resta fermo: le transizioni le decide l'harness
+    hub.kill(ctrl.monitor_thread)
+    ctrl.steering = 'global'
+    ctrl.updater.enabled = consistent
+    edges = sorted({dpid for dpid, ports in ctrl.PORT_MAP.items() if any(name in ctrl.H for name in ports)})
+    delays = {dpid: latency for dpid in ctrl.PORT_MAP}
+    delays[edges[-1]] += skew
+    harness = TransitionHarness(ctrl, delays, flowmod_time, load, burst, seed)
+
+    end = WARMUP + transitions * period
+    harness.start(end)
+    targets = ['UPPER', 'LOWER']
+    for k in range(transitions):
+        harness.schedule(WARMUP + k * period, harness.transition, targets[k % 2])
+    # Tempo per svuotare le code della slice lenta
+    harness.run(end + 1.0)
+
+    results = []
+    for k, window in enumerate(harness.windows):
+        last = harness.windows[k + 1]['changes'] if k + 1 < len(harness.windows) else len(harness.edge_changes)
+        moves = harness.edge_changes[window['changes']:last]
+        results.append({
+            'target': window['target'],
+            'lost': window['lost'],
+            'sent': window['sent'],
+            'reordered': window['reordered'],
+            'asymmetric_ms': window['asymmetric'] / len(harness.pair_of) * 1000,
+            'skew_ms': (max(moves) - min(moves)) * 1000 if moves else 0.0,
+            'switch_ms': (max(moves) - window['at']) * 1000 if moves else 0.0,
+        })
+    return results, ctrl
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Perdite e riordino nei cambi di slice')
+    parser.add_argument('--hosts', type=int, default=8, help='host per lato')
+    parser.add_argument('--transitions', type=int, default=10)
+    parser.add_argument('--period', type=float, default=2.0, help='secondi tra due transizioni')
+    parser.add_argument('--latency-ms', type=float, default=1.0, help='latenza controller -> switch')
+    parser.add_argument('--skew-ms', type=float, default=5.0, help='latenza in più verso s4')
+    parser.add_argument('--flowmod-us', type=float, default=500.0, help='tempo per applicare un FlowMod')
+    parser.add_argument('--load', type=float, default=0.8, help='traffico standard / capacità della slice lenta')
+    parser.add_argument('--burst', type=int, default=8, help='pacchetti per raffica di ogni flusso')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'modo':<10}{'verso':>7}{'spediti':>9}{'persi':>7}{'riordinati':>12}{'asimm. ms':>11}"
+          f"{'scarto ms':>11}{'attiva ms':>11}")
+    totals = {}
+    for mode, consistent in (('diretta', False), ('due fasi', True)):
+        results, ctrl = run(consistent, args.hosts, args.transitions, args.period, args.latency_ms / 1000,
+                            args.skew_ms / 1000, args.flowmod_us / 1e6, args.load, args.burst, args.seed)
+        for r in results:
+            print(f"{mode:<10}{r['target']:>7}{r['sent']:>9}{r['lost']:>7}{r['reordered']:>12}"
+                  f"{r['asymmetric_ms']:>11.2f}{r['skew_ms']:>11.2f}{r['switch_ms']:>11.2f}")
+        totals[mode] = {key: sum(r[key] for r in results) / len(results)
+                        for key in ('lost', 'reordered', 'asymmetric_ms', 'skew_ms', 'switch_ms')}
+        if consistent and not ctrl.updater.enabled:
+            print(f"{mode}: transizioni in due fasi disattivate durante la prova")
+    print()
+    print(f"{'media per transizione':<22}{'persi':>7}{'riordinati':>12}{'asimm. ms':>11}{'scarto ms':>11}"
+          f"{'attiva ms':>11}")
+    for mode, t in totals.items():
+        print(f"{mode:<22}{t['lost']:>7.1f}{t['reordered']:>12.1f}{t['asymmetric_ms']:>11.2f}"
+              f"{t['skew_ms']:>11.2f}{t['switch_ms']:>11.2f}")
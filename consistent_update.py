@@ -0,0 +1,221 @@
+# consistent_update.py
+# Transizioni in due fasi (make-before-break) del controller dinamico: le
+# regole che cambiano, con la versione nei bit bassi del cookie, vengono
+# preparate in un bundle su ogni switch; solo quando tutti lo hanno
+# confermato con la barrier partono i commit, allineati perché arrivino
+# insieme. Dopo drain_time si cancellano le regole rimaste delle versioni
+# precedenti. Se uno switch rifiuta il bundle si torna ai lotti diretti.
+# Il controller dà datapath, shadow table, programmer, timer e orologio.
+import slice_policy
+
+
+class ConsistentUpdater(object):
+
+    def __init__(self, ctrl, enabled=True, stage_timeout=2.0, drain_time=1.0):
+        self.ctrl = ctrl
+        self.enabled = enabled
+        self.stage_timeout = stage_timeout
+        self.drain_time = drain_time
+        # Ultima versione usata (sopravvive al riavvio con l'istantanea)
+        self.version = 0
+        self._transition = None
+        self._queued = []
+
+    def install(self, overrides):
+        # Regole dinamiche (dpid -> FlowEntry) da portare sugli switch;
+        # restituisce i messaggi spediti
+        ctrl = self.ctrl
+        if self.enabled and ctrl.datapaths:
+            return self._stage(overrides)
+        # Grazie alla shadow table si spediscono solo le regole che cambiano:
+        # ADD per quelle nuove, MODIFY_STRICT per quelle già installate.
+        sent_before = ctrl.programmer.sent_msgs
+        for dpid, dp in ctrl.datapaths.items():
+            ofproto = dp.ofproto
+            added, modified = ctrl.shadow.diff(dpid, overrides.get(dpid, []))
+            for entry in added:
+                ctrl.add_entry(dp, entry)
+            for entry in modified:
+                ctrl.add_entry(dp, entry, command=ofproto.OFPFC_MODIFY_STRICT)
+            ctrl.shadow.update(dpid, added + modified)
+            ctrl.programmer.flush(dp)
+        return ctrl.programmer.sent_msgs - sent_before
+
+    def observe(self, version):
+        # Versione trovata sugli switch (riconciliazione): si continua da lì
+        self.version = max(self.version, version)
+
+    def _stage(self, overrides):
+        # Prima fase: su ogni switch le regole che cambiano, con la versione
+        # nuova nel cookie, in un bundle preparato ma non ancora attivo
+        ctrl = self.ctrl
+        if self._transition is not None:
+            # Una transizione alla volta: quelle chieste nel frattempo partono
+            # insieme alla fine, per ogni regola vale l'ultima
+            self._queued.append(overrides)
+            return 0
+        self.version = self.version % slice_policy.COOKIE_VERSION_MASK + 1
+        version = self.version
+        transition = {'version': version, 'overrides': overrides, 'phase': 'stage', 'pending': set(),
+                      'restore': {}, 'rtt': {}, 'start': ctrl.clock(), 'staged': None}
+        sent_before = ctrl.programmer.sent_msgs
+        for dpid, dp in ctrl.datapaths.items():
+            added, modified = ctrl.shadow.diff(dpid, overrides.get(dpid, []))
+            if not added and not modified:
+                continue
+            # Per annullare: le regole sostituite e quelle solo aggiunte
+            table = ctrl.shadow.tables[dpid]
+            transition['restore'][dpid] = ([table[entry.key()] for entry in modified], added)
+            # ADD sostituisce anche il cookie, MODIFY_STRICT lo lascerebbe com'era
+            entries = [entry._replace(cookie=entry.cookie | version) for entry in added + modified]
+            for entry in entries:
+                ctrl.add_entry(dp, entry)
+            ctrl.shadow.update(dpid, entries)
+            transition['pending'].add((dpid, ctrl.programmer.stage(dp)))
+        if not transition['pending']:
+            return 0
+        self._transition = transition
+        ctrl.call_later(self.stage_timeout, self._timeout, version, 'stage')
+        return ctrl.programmer.sent_msgs - sent_before
+
+    def _advance(self):
+        ctrl = self.ctrl
+        transition = self._transition
+        if transition['phase'] == 'stage':
+            # Seconda fase: tutti i bundle sono pronti e ogni switch cambia
+            # tutte le sue regole in un colpo. I commit verso gli switch più
+            # vicini partono in ritardo di metà della differenza di RTT misurata
+            # sulla preparazione, così arrivano tutti insieme
+            transition['phase'] = 'commit'
+            transition['staged'] = ctrl.clock()
+            rtt = transition['rtt']
+            slowest = max(rtt.values(), default=0.0)
+            for dpid in transition['restore']:
+                delay = (slowest - rtt.get(dpid, slowest)) / 2
+                transition['pending'].add((dpid, None))
+                if delay > 0:
+                    ctrl.call_later(delay, self._commit, transition['version'], dpid)
+                else:
+                    self._commit(transition['version'], dpid)
+            if self._transition is not transition:
+                return
+            if transition['pending']:
+                ctrl.call_later(self.stage_timeout, self._timeout, transition['version'], 'commit')
+                return
+
+        self._finish()
+
+    def _finish(self):
+        ctrl = self.ctrl
+        transition, self._transition = self._transition, None
+        now = ctrl.clock()
+        ctrl.metrics.observe_transition('consistent_update', now - transition['start'])
+        ctrl.logger.info(f"*** Versione {transition['version']} attiva su {len(transition['restore'])} switch: "
+                         f"preparata in {(transition['staged'] - transition['start'])*1e3:.1f} ms, "
+                         f"commit in {(now - transition['staged'])*1e3:.1f} ms")
+        ctrl.call_later(self.drain_time, self._collect_garbage, transition['version'], transition['overrides'])
+        self._run_queued([])
+
+    def _commit(self, version, dpid):
+        ctrl = self.ctrl
+        transition = self._transition
+        if transition is None or transition['version'] != version or (dpid, None) not in transition['pending']:
+            return
+        transition['pending'].discard((dpid, None))
+        dp = ctrl.datapaths.get(dpid)
+        xid = ctrl.programmer.commit(dp) if dp is not None else None
+        if xid is not None:
+            transition['pending'].add((dpid, xid))
+        elif not transition['pending']:
+            self._finish()
+
+    def _run_queued(self, first):
+        queued, self._queued = first + self._queued, []
+        if queued:
+            self.install(merge_overrides(queued))
+
+    def _timeout(self, version, phase):
+        transition = self._transition
+        if transition is None or transition['version'] != version or transition['phase'] != phase:
+            return
+        self.ctrl.logger.warning(f"*** Versione {version}: {phase} non confermato entro {self.stage_timeout:.1f} s")
+        self._abort()
+
+    def _abort(self, failed=None):
+        # Gli switch con il bundle ancora da confermare (e quello che ha dato
+        # errore) tengono le regole di prima: si scartano i bundle, la shadow
+        # table torna indietro e si riparte con i lotti diretti
+        ctrl = self.ctrl
+        transition, self._transition = self._transition, None
+        for dpid, (replaced, added) in transition['restore'].items():
+            if dpid not in ctrl.programmer.staged and dpid != failed:
+                continue
+            ctrl.shadow.remove(dpid, added)
+            ctrl.shadow.update(dpid, replaced)
+            dp = ctrl.datapaths.get(dpid)
+            if dp is not None:
+                ctrl.programmer.discard(dp)
+        self.enabled = False
+        ctrl.logger.warning("*** Aggiornamenti in due fasi disattivati: regole spedite direttamente")
+        self._run_queued([transition['overrides']])
+
+    def _collect_garbage(self, version, overrides):
+        # Regole della stessa famiglia (override o coppie) installate prima di
+        # questa versione e che la versione non ha sostituito: il traffico in
+        # volo è passato, si possono cancellare
+        ctrl = self.ctrl
+        families = {entry.cookie & slice_policy.COOKIE_CLASS_MASK
+                    for entries in overrides.values() for entry in entries}
+        for dpid, dp in list(ctrl.datapaths.items()):
+            keys = {entry.key() for entry in overrides.get(dpid, [])}
+            stale = [entry for entry in ctrl.shadow.tables.get(dpid, {}).values()
+                     if entry.cookie & slice_policy.COOKIE_CLASS_MASK in families
+                     and entry.cookie & slice_policy.COOKIE_VERSION_MASK < version and entry.key() not in keys]
+            if not stale:
+                continue
+            for entry in stale:
+                ctrl.delete_entry(dp, entry)
+            ctrl.shadow.remove(dpid, stale)
+            ctrl.programmer.flush(dp)
+            ctrl.logger.debug(f"*** s{dpid}: {len(stale)} regole delle versioni precedenti cancellate")
+
+    # --- EVENTI DAL CONTROLLER ---
+    def barrier_reply(self, msg):
+        transition = self._transition
+        key = (msg.datapath.id, msg.xid)
+        if transition is not None and key in transition['pending']:
+            transition['pending'].discard(key)
+            if transition['phase'] == 'stage':
+                transition['rtt'][key[0]] = self.ctrl.clock() - transition['start']
+            if not transition['pending']:
+                self._advance()
+
+    def error(self, msg):
+        # Errore di uno switch: True se riguardava il bundle della transizione
+        dpid = msg.datapath.id
+        if self._transition is None or not self.ctrl.programmer.bundle_error(dpid, msg.xid):
+            return False
+        self.ctrl.logger.warning(f"*** s{dpid}: errore {msg.type}/{msg.code} sul bundle della versione "
+                                 f"{self._transition['version']}")
+        self._abort(failed=dpid)
+        return True
+
+    def forget(self, dpid):
+        transition = self._transition
+        if transition is not None:
+            # La transizione non aspetta uno switch che non c'è più
+            transition['restore'].pop(dpid, None)
+            transition['pending'] = {key for key in transition['pending'] if key[0] != dpid}
+            if not transition['pending']:
+                self._advance()
+
+
+def merge_overrides(queued):
+    # Più insiemi di regole dinamiche in uno solo: per ogni regola l'ultima
+    merged = {}
+    for overrides in queued:
+        for dpid, entries in overrides.items():
+            table = merged.setdefault(dpid, {})
+            for entry in entries:
+                table[entry.key()] = entry
+    return {dpid: list(table.values()) for dpid, table in merged.items()}
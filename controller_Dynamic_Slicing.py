@@ -1,343 +1,655 @@
-# controller_Dynamic_Slicing_Bidirectional_FlowStats.py
+# controller_Dynamic_Slicing.py
+# Dynamic Slicing: il Service Slicing del motore comune (slice_engine.py)
+# più il monitoraggio delle statistiche, che sposta il traffico standard tra
+# le slice secondo il rate del video. Le parti più grandi sono componenti a
+# sé: transizioni in due fasi (consistent_update.py), riavvio a caldo
+# (flow_reconciler.py), coppie di host e gruppo SELECT (pair_steering.py),
+# flussi pesanti (elephant_flows.py) e occupazione delle tabelle
+# (table_manager.py). I parametri sono nella 'tuning' della specifica.
+import math
+import os
+
+from ryu.app.wsgi import WSGIApplication
 from ryu.base import app_manager
 from ryu.controller import ofp_event
-from ryu.controller.handler import CONFIG_DISPATCHER, MAIN_DISPATCHER, DEAD_DISPATCHER, set_ev_cls
-from ryu.ofproto import ofproto_v1_3
+from ryu.controller.handler import CONFIG_DISPATCHER, MAIN_DISPATCHER, set_ev_cls
 from ryu.lib import hub
 
-class DynamicSliceController(app_manager.RyuApp):
-    OFP_VERSIONS = [ofproto_v1_3.OFP_VERSION]
+import consistent_update
+import controller_metrics
+import controller_state
+import elephant_flows
+import flow_reconciler
+import pair_steering
+import port_monitor
+import rate_estimator
+import slice_engine
+import slice_policy
+import stats_collector
+import stats_trace
+import table_manager
+
+# Link e host dagli eventi di ryu.topology (ryu-manager --observe-links)
+app_manager.require_app('ryu.topology.switches')
+
+# Modo di steering del traffico standard ('global', 'pair' o 'select'),
+# di default 'global'
+STEERING_ENV = 'SLICE_STEERING'
+
+class DynamicSliceController(slice_engine.SliceEngine):
+    SPEC = slice_policy.DYNAMIC_SPEC
+    _CONTEXTS = {'wsgi': WSGIApplication}
 
     def __init__(self, *args, **kwargs):
         super(DynamicSliceController, self).__init__(*args, **kwargs)
+        if 'wsgi' in kwargs:
+            kwargs['wsgi'].register(controller_metrics.MetricsController, {'metrics': self.metrics})
+
+    def setup(self):
+        tuning = self.spec['tuning']
+        # Metriche dei percorsi caldi, esposte su GET /metrics (REST di Ryu)
+        self.metrics = controller_metrics.ControllerMetrics()
+        self.metrics.register(type(self), transitions=('consistent_update',))
+
+        self.monitor_interval = tuning['monitor_interval']
+        self.bandwidth_threshold = tuning['video_threshold'] / 8
+
+        # Polling adattivo: si interroga più spesso vicino alla soglia o
+        # quando il rate cambia in fretta, più di rado quando è lontano e stabile
+        self.adaptive_polling = tuning['adaptive_polling']
+        self.min_interval = tuning['min_interval']
+        self.max_interval = tuning['max_interval']
+        self.poll_interval = self.monitor_interval
+        self._last_speeds = {}
+        # Richieste di statistiche spedite (carico sul canale di controllo)
+        self.stats_requests = 0
+        # Scadenza di ogni round di polling (secondi, al massimo poll_interval)
+        self.stats_deadline = tuning['stats_deadline']
+        # 'flow': OFPFlowStatsRequest filtrata per cookie (flussi video e coppie)
+        # 'aggregate': OFPAggregateStatsRequest, lo switch restituisce il totale
+        self.stats_mode = tuning['stats_mode']
         
-        self.datapaths = {}
-        
-        self.monitor_interval = 2
-        self.bandwidth_threshold = 1000000 / 8  # 1 Mbps
-        
-        # Dizionario per i byte dei flussi VIDEO precedenti
-        # Chiave: dpid -> Valore: byte totali video letti prima
-        self.video_stats = {
-            1: 0,
-            4: 0
-        }
-
-        self.global_slice_state = 'LOWER'
+        # Stima del rate dei flussi VIDEO: anello di campioni per flusso,
+        # istanti presi da duration_sec/duration_nsec, rate sugli ultimi due
+        # intervalli (3 campioni) e smussamento EWMA.
+        # Chiave: (dpid, cookie, match) oppure (dpid, 'aggregate')
+        self.video_stats = rate_estimator.RateEstimator(size=tuning['rate_samples'], alpha=tuning['rate_alpha'])
+        # Rate video corrente per switch di bordo (byte/s), None se lo switch
+        # non ha risposto entro la scadenza del round
+        self.current_speeds = {}
+
+        # Isteresi: la condizione deve restare vera per questi secondi prima
+        # di cambiare slice (default = video rilevato, slice del video =
+        # video terminato)
+        self.dwell_time = {self.spec[role]: tuning['dwell_time'][role] for role in ('default', 'video')}
+        self._pending_slice = None
+        self._pending_since = 0.0
+        # Timer del controller (sostituibile per replay e simulazioni)
+        self.call_later = hub.spawn_after
+
+        # Richieste tracciate per xid, latenze e risposte mancate/in ritardo
+        self.collector = stats_collector.StatsCollector(lambda: self.clock(), observe=self.metrics.observe_rtt)
+        # dpid -> parti di una risposta multipart non ancora completa
+        self._stats_parts = {}
+        # Traccia binaria delle risposte (per stats_trace.py), se richiesta
+        self.trace = stats_trace.open_trace(os.environ.get(stats_trace.TRACE_ENV))
+
+        self.global_slice_state = self.spec['default']
+        # 'global' (default): tutto il traffico standard si sposta insieme
+        # secondo la soglia video; 'pair': ogni coppia di host viene
+        # posizionata a parte in base allo spazio libero sulle slice;
+        # 'select': s1 e s4 dividono il traffico standard sulle due slice con
+        # un gruppo SELECT pesato sulla capacità libera di ogni percorso
+        self.steering = os.environ.get(STEERING_ENV, 'global')
+        if self.steering not in ('global', 'pair', 'select'):
+            raise ValueError(f"${STEERING_ENV}: steering sconosciuto {self.steering!r}")
         self.monitor_thread = hub.spawn(self._monitor)
 
-        self.H = {'h1':'00:00:00:00:00:01', 'h2':'00:00:00:00:00:02', 'h3':'00:00:00:00:00:03', 'h4':'00:00:00:00:00:04'}
-        self.PORT_MAP = {
-            1: {'h1': 1, 'h2': 2, 's2': 3, 's3': 4},
-            2: {'s1': 1, 's4': 2},
-            3: {'s1': 1, 's4': 2},
-            4: {'s2': 1, 's3': 2, 'h3': 3, 'h4': 4}
-        }
+        # Componenti: ognuno tiene il suo stato e usa quello del controller
+        self.updater = consistent_update.ConsistentUpdater(self, tuning['consistent_updates'],
+                                                           tuning['stage_timeout'], tuning['drain_time'])
+        self.reconciler = flow_reconciler.FlowReconciler(self, tuning['reconcile'], tuning['reconcile_timeout'],
+                                                         tuning['discovery_timeout'])
+        self.pairs = pair_steering.PairSteering(self, tuning['select_min_change'], tuning['rate_samples'],
+                                                tuning['rate_alpha'])
+        self.elephants = elephant_flows.ElephantFlows(
+            self, tuning['elephant_share'] * self.spec['capacity'][self.spec['default']] / 8,
+            tuning['max_elephants'], tuning['sample_rate'], tuning['sample_slots'], tuning['sample_decay'],
+            tuning['elephant_rate_samples'], tuning['elephant_rate_alpha'])
+        # Occupazione delle tabelle (OFPTableStatsRequest ogni
+        # table_manager.interval secondi) e timeout per classe di regola
+        self.table_manager = table_manager.TableManager(lambda: self.clock())
+        # MAC -> nome dell'host, per le coppie
+        self.mac_host = {}
+
+        # Byte scartati dai meter (byte/s) per (dpid, meter_id): il traffico
+        # che supera la capacità imposta nel datapath. Oltre questa quota
+        # della capacità la slice è considerata congestionata.
+        self.meter_stats = rate_estimator.RateEstimator(size=tuning['rate_samples'], alpha=tuning['rate_alpha'])
+        self.meter_drops = {}
+        self.congestion_threshold = tuning['congestion_threshold']
+
+        # Utilizzo dei link da OFPPortStatsRequest su tutti i datapath,
+        # calcolato una volta per round in forma vettoriale
+        self.port_monitor = port_monitor.PortMonitor()
+        self.link_utilization = {}
+        # (dpid, porta) dei link tra switch giù secondo gli OFPPortStatus:
+        # i gruppi FAST_FAILOVER hanno già deviato il traffico, il controller
+        # poi ridistribuisce le slice tenendone conto
+        self.ports_down = set()
+
+        # Riavvio a caldo: istantanea dello stato ogni state_interval secondi
+        # (se $SLICE_CONTROLLER_STATE indica il file); alla connessione degli
+        # switch il reconciler spedisce solo le differenze
+        self.state_path = os.environ.get(controller_state.STATE_ENV)
+        self.state_interval = tuning['state_interval']
+        self.state_max_age = tuning['state_max_age']
+        self._state_saved = None
+        state = controller_state.read(self.state_path, self.state_max_age)
+        if state is not None:
+            controller_state.restore(self, state)
+            self.logger.info(f"*** Stato ripreso da {self.state_path}: traffico standard su "
+                             f"{self.global_slice_state}, versione {self.updater.version}")
 
     # --- MONITORING LOOP (Flow Stats) ---
     def _monitor(self):
         while True:
-            for dp in self.datapaths.values():
-                if dp.id in [1, 4]:
-                    parser = dp.ofproto_parser
-                    # Statistiche sui FLUSSI
-                    req = parser.OFPFlowStatsRequest(dp)
-                    dp.send_msg(req)
-            hub.sleep(self.monitor_interval)
+            # Un round: richieste a tutti i datapath, poi attesa fino alla scadenza
+            self.collector.start_round()
+            for dp in list(self.datapaths.values()):
+                if dp.id in self.current_speeds:
+                    self._request_video_stats(dp)
+                    self._request_meter_stats(dp)
+                self._request_port_stats(dp)
+                self._request_table_stats(dp)
+
+            deadline = min(self.stats_deadline, self.poll_interval)
+            hub.sleep(deadline)
+            self._close_stats_round()
+            hub.sleep(max(0.0, self.poll_interval - deadline))
+
+    def _close_stats_round(self):
+        # Utilizzo di tutti i link in un solo passaggio
+        self.port_monitor.compute()
+        self.link_utilization = self.port_monitor.link_utilization(self.PORT_MAP)
+        self._sample_metrics()
+        self.elephants.detect()
+        self.pairs.restore()
+        self._save_state()
+
+        # I datapath senza risposta non devono lasciare un valore vecchio
+        # in current_speeds a falsare il massimo
+        for dpid in self.collector.close_round():
+            self._stats_parts.pop(dpid, None)
+            if dpid in self.current_speeds:
+                self.current_speeds[dpid] = None
+            last = self.collector.latency_summary().get(dpid)
+            self.logger.warning(f"*** s{dpid}: nessuna risposta alle statistiche entro {self.stats_deadline:.1f} s"
+                                + (f" (ultima latenza {last[0]*1e3:.0f} ms)" if last else ""))
+
+    def _sample_metrics(self):
+        # Una volta per round: FlowMod al secondo e traffico standard degli
+        # switch di bordo (spedito sulle slice meno il video)
+        self.metrics.sample_flowmods(self.programmer.sent_msgs, self.clock())
+        for dpid, video_speed in self.current_speeds.items():
+            rates = [self.port_monitor.tx_rate_of(dpid, port) for name, port in self.PORT_MAP.get(dpid, {}).items()
+                     if name.startswith('s')]
+            rates = [rate for rate in rates if not math.isnan(rate)]
+            if rates:
+                self.metrics.standard_rate[dpid] = max(0.0, sum(rates) / 8 - (video_speed or 0.0))
+
+    def _save_state(self):
+        now = self.clock()
+        if not self.state_path or (self._state_saved is not None and now - self._state_saved < self.state_interval):
+            return
+        self._state_saved = now
+        try:
+            controller_state.write(self.state_path, controller_state.snapshot(self))
+        except OSError as e:
+            self.logger.warning(f"*** Stato non salvato in {self.state_path}: {e}")
+
+    def _request_video_stats(self, dp):
+        ofproto = dp.ofproto
+        parser = dp.ofproto_parser
+        # Solo i flussi con il cookie delle classi monitorate (video e coppie
+        # di host): la risposta non cresce con il resto della tabella
+        args = (dp, 0, ofproto.OFPTT_ALL, ofproto.OFPP_ANY, ofproto.OFPG_ANY)
+        if self.stats_mode == 'aggregate':
+            reqs = [parser.OFPAggregateStatsRequest(*args, slice_policy.COOKIE_VIDEO,
+                                                    slice_policy.COOKIE_CLASS_MASK, parser.OFPMatch())]
+            if self.steering == 'pair':
+                # L'aggregato non distingue le coppie: servono i singoli flussi
+                reqs.append(parser.OFPFlowStatsRequest(*args, slice_policy.COOKIE_PAIR,
+                                                       slice_policy.COOKIE_CLASS_MASK, parser.OFPMatch()))
+        else:
+            reqs = [parser.OFPFlowStatsRequest(*args, slice_policy.COOKIE_MONITOR,
+                                               slice_policy.COOKIE_MONITOR, parser.OFPMatch())]
+        for req in reqs:
+            dp.send_msg(req)
+            self.collector.sent(dp.id, req.xid)
+            self.stats_requests += 1
+
+    def _request_port_stats(self, dp):
+        ofproto = dp.ofproto
+        parser = dp.ofproto_parser
+        dp.send_msg(parser.OFPPortStatsRequest(dp, 0, ofproto.OFPP_ANY))
+        self.stats_requests += 1
+
+    def _request_table_stats(self, dp):
+        if not self.table_manager.due(dp.id):
+            return
+        dp.send_msg(dp.ofproto_parser.OFPTableStatsRequest(dp, 0))
+        self.stats_requests += 1
+
+    def _request_meter_stats(self, dp):
+        if not self.policy.meter_table(dp.id):
+            return
+        ofproto = dp.ofproto
+        parser = dp.ofproto_parser
+        dp.send_msg(parser.OFPMeterStatsRequest(dp, 0, ofproto.OFPM_ALL))
+        self.stats_requests += 1
+
+    @set_ev_cls(ofp_event.EventOFPMeterStatsReply, MAIN_DISPATCHER)
+    @controller_metrics.handler
+    def _meter_stats_reply_handler(self, ev):
+        dpid = ev.msg.datapath.id
+        if self.trace is not None:
+            self.trace.meter_reply(dpid, self.clock(), ev.msg.body)
+        for stat in ev.msg.body:
+            # Le bande DROP contano i byte scartati; l'istante è la durata del meter
+            dropped = sum(band.byte_band_count for band in stat.band_stats)
+            duration = stat.duration_sec + stat.duration_nsec / 1e9
+            self.meter_drops[(dpid, stat.meter_id)] = self.meter_stats.update(
+                (dpid, stat.meter_id), duration, dropped)
+
+    def slice_drops(self, target_slice):
+        # Byte/s scartati da tutti i meter (slice e tenant) della slice
+        total = 0.0
+        for (dpid, meter_id), rate in self.meter_drops.items():
+            meter = self.policy.meter_entry(dpid, meter_id)
+            if meter is not None and meter.slice == target_slice:
+                total += rate
+        return total
+
+    def slice_up(self, target_slice):
+        return not any(port in self.ports_down for port in self.policy.slice_ports(target_slice))
+
+    def slice_congested(self, target_slice):
+        capacity = self.spec['capacity'][target_slice]
+        return self.slice_drops(target_slice) * 8 > capacity * self.congestion_threshold
+
+    @set_ev_cls(ofp_event.EventOFPPortStatsReply, MAIN_DISPATCHER)
+    @controller_metrics.handler
+    def _port_stats_reply_handler(self, ev):
+        self.port_monitor.update(ev.msg.datapath.id, ev.msg.body)
+
+    def slice_utilization(self, target_slice):
+        # Utilizzo del link più carico della slice (collo di bottiglia)
+        values = [self.port_monitor.utilization(dpid, port)
+                  for dpid, port in self.policy.slice_ports(target_slice)]
+        values = [value for value in values if not math.isnan(value)]
+        return max(values) if values else 0.0
 
     # --- GESTIONE RISPOSTE FLOW STATS ---
     @set_ev_cls(ofp_event.EventOFPFlowStatsReply, MAIN_DISPATCHER)
+    @controller_metrics.handler
     def _flow_stats_reply_handler(self, ev):
-        body = ev.msg.body
-        dpid = ev.msg.datapath.id
-
-        if dpid not in [1, 4]:
+        msg = ev.msg
+        dpid = msg.datapath.id
+        if self.reconciler.reply(msg):
+            return
+        if dpid not in self.current_speeds:
             return
 
-        current_video_bytes = 0
-        
+        # Risposta multipart: si aspetta l'ultima parte
+        if msg.flags & msg.datapath.ofproto.OFPMPF_REPLY_MORE:
+            self._stats_parts.setdefault(dpid, []).extend(msg.body)
+            return
+        body = self._stats_parts.pop(dpid, []) + msg.body
+        if self.trace is not None:
+            self.trace.flow_reply(dpid, self.clock(), body)
+        if self.collector.received(dpid, msg.xid) == stats_collector.STATUS_LATE:
+            self.logger.debug(f"*** s{dpid}: statistiche arrivate dopo la scadenza")
+
+        # La richiesta è già filtrata per cookie: flussi video e coppie di host.
+        # Il rate di ogni flusso usa la sua durata, non l'intervallo di polling,
+        # quindi anche una risposta in ritardo dà un valore corretto.
+        video_speed = None
         for flow in body:
-            # 1. Filtriamo per Priorità 300 (la slice Video)
-            if flow.priority == 300:
-                
-                if 'udp_dst' in flow.match and flow.match['udp_dst'] == 9999:
-                    current_video_bytes += flow.byte_count
-        
-        # Recuperiamo il valore precedente
-        prev_bytes = self.video_stats[dpid]
-        
-        if prev_bytes == 0:
-            delta_bytes = 0
-        else:
-            delta_bytes = current_video_bytes - prev_bytes
-            if delta_bytes < 0: delta_bytes = 0 # Gestione reset contatori
+            # Senza la versione: il rate continua quando la regola viene sostituita
+            key = (dpid, flow.cookie & ~slice_policy.COOKIE_VERSION_MASK, tuple(flow.match.items()))
+            duration = flow.duration_sec + flow.duration_nsec / 1e9
+            cookie_class = flow.cookie & slice_policy.COOKIE_CLASS_MASK
+            if cookie_class in table_manager.EVICTABLE:
+                # Ultimo traffico visto sulle regole che si possono togliere
+                self.table_manager.hit(dpid, (flow.table_id, flow.priority, tuple(sorted(flow.match.items()))),
+                                       flow.byte_count)
+            if cookie_class == slice_policy.COOKIE_VIDEO:
+                video_speed = (video_speed or 0.0) + self.video_stats.update(key, duration, flow.byte_count)
+            elif cookie_class == slice_policy.COOKIE_PAIR:
+                pair = (self.mac_host.get(flow.match.get('eth_src')), self.mac_host.get(flow.match.get('eth_dst')))
+                self.pairs.observe(key, pair, duration, flow.byte_count)
+            elif cookie_class == slice_policy.COOKIE_ELEPHANT:
+                self.elephants.observe(dpid, cookie_class, tuple(sorted(flow.match.items())), duration,
+                                       flow.byte_count)
+
+        # Una risposta con le sole coppie (modo 'aggregate') non tocca il video
+        if video_speed is not None:
+            self._update_video_speed(dpid, video_speed)
+
+    @set_ev_cls(ofp_event.EventOFPAggregateStatsReply, MAIN_DISPATCHER)
+    @controller_metrics.handler
+    def _aggregate_stats_reply_handler(self, ev):
+        dpid = ev.msg.datapath.id
+        if dpid not in self.current_speeds:
+            return
 
-        self.video_stats[dpid] = current_video_bytes
+        if self.collector.received(dpid, ev.msg.xid) == stats_collector.STATUS_LATE:
+            self.logger.debug(f"*** s{dpid}: statistiche arrivate dopo la scadenza")
+        if self.trace is not None:
+            self.trace.aggregate_reply(dpid, self.clock(), ev.msg.body)
 
-        # Calcolo velocità
-        video_speed = delta_bytes / self.monitor_interval
-        
+        # Totale dei byte video calcolato direttamente dallo switch; senza
+        # durata si usa l'istante di arrivo della risposta, e la prima
+        # risposta fa solo da riferimento
+        video_speed = self.video_stats.update((dpid, 'aggregate'), self.clock(), ev.msg.body.byte_count,
+                                              since_install=False)
+        if video_speed is not None:
+            self._update_video_speed(dpid, video_speed)
+
+    def _update_video_speed(self, dpid, video_speed):
         # Aggiorniamo le velocità correnti per il confronto globale
-        if not hasattr(self, 'current_speeds'):
-            self.current_speeds = {1: 0.0, 4: 0.0}
         self.current_speeds[dpid] = video_speed
+        self.metrics.video_rate[dpid] = video_speed
 
-        # Prendiamo il massimo tra i due switch
-        max_video_speed = max(self.current_speeds[1], self.current_speeds[4])
-        
-        # Soglia (1 Mbps)
-        is_congested = max_video_speed > self.bandwidth_threshold
+        # Prendiamo il massimo tra gli switch che hanno risposto
+        speeds = [speed for speed in self.current_speeds.values() if speed is not None]
+        max_video_speed = max(speeds)
+        if self.adaptive_polling:
+            self._adapt_poll_interval(dpid, video_speed, max_video_speed)
 
-        if is_congested and self.global_slice_state == 'UPPER':
-            self.logger.info(f"*** VIDEO RILEVATO ({max_video_speed*8/1e6:.2f} Mbps). Traffico Standard -> LOWER.")
-            self.apply_slice_policy('LOWER')
-        
-        elif not is_congested and self.global_slice_state == 'LOWER':
-            if max_video_speed < (self.bandwidth_threshold / 2):
-                self.logger.info(f"*** VIDEO TERMINATO ({max_video_speed*8/1e6:.2f} Mbps). Traffico Standard -> UPPER.")
-                self.apply_slice_policy('UPPER')
+        if self.steering == 'pair':
+            self.pairs.place(max_video_speed)
+            return
+        if self.steering == 'select':
+            self.pairs.balance(max_video_speed)
+            return
+
+        # Soglia (1 Mbps) con isteresi: sopra la soglia il video è rilevato,
+        # sotto metà soglia è terminato, in mezzo si resta dove si è.
+        # Anche i meter che scartano sulla slice video indicano congestione.
+        video_slice, default_slice = self.spec['video'], self.spec['default']
+        if max_video_speed > self.bandwidth_threshold or self.slice_congested(video_slice):
+            target_slice = default_slice
+        elif max_video_speed < (self.bandwidth_threshold / 2):
+            target_slice = video_slice
+        else:
+            target_slice = self.global_slice_state
+        if not self.slice_up(target_slice):
+            target_slice = self.global_slice_state
+
+        if target_slice == self.global_slice_state:
+            self._pending_slice = None
+            return
+
+        # La condizione deve persistere per il dwell time della slice
+        now = self.clock()
+        if self._pending_slice != target_slice:
+            self._pending_slice = target_slice
+            self._pending_since = now
+        if now - self._pending_since < self.dwell_time[target_slice]:
+            return
+        self._pending_slice = None
 
+        if target_slice == default_slice:
+            self.logger.info(f"*** VIDEO RILEVATO ({max_video_speed*8/1e6:.2f} Mbps). "
+                             f"Traffico Standard -> {target_slice}.")
+        else:
+            self.logger.info(f"*** VIDEO TERMINATO ({max_video_speed*8/1e6:.2f} Mbps). "
+                             f"Traffico Standard -> {target_slice}.")
+        self.apply_slice_policy(target_slice)
+
+    def _adapt_poll_interval(self, dpid, video_speed, max_video_speed):
+        now = self.clock()
+
+        # Velocità di variazione del rate sullo switch (byte/s al secondo)
+        trend = 0.0
+        last = self._last_speeds.get(dpid)
+        if last is not None and now > last[0]:
+            trend = abs(video_speed - last[1]) / (now - last[0])
+        self._last_speeds[dpid] = (now, video_speed)
+
+        # Distanza dalla soglia: lontano e stabile -> max_interval
+        gap = abs(max_video_speed - self.bandwidth_threshold)
+        interval = self.max_interval * min(1.0, gap / self.bandwidth_threshold)
+        # Al ritmo attuale la soglia non deve essere raggiunta prima di due poll
+        if trend > 0:
+            interval = min(interval, gap / trend / 2)
+        # Decisione in attesa del dwell time: almeno al ritmo di base
+        if self._pending_slice is not None:
+            interval = min(interval, self.monitor_interval)
+
+        self.poll_interval = max(self.min_interval, min(self.max_interval, interval))
+
+    @controller_metrics.timed
+    def apply_select_weights(self, weights):
+        # Un solo OFPGroupMod per switch di bordo, nessun FlowMod
+        self.pairs.select_weights = dict(weights)
+        for dpid, dp in self.datapaths.items():
+            if dpid in self.policy.compile_select():
+                self.add_group(dp, self.policy.select_group(dpid, weights), dp.ofproto.OFPGC_MODIFY)
+        self.programmer.flush_all()
+
+    @controller_metrics.timed
+    def apply_placement(self, placement):
+        self.pairs.pair_slice = dict(placement)
+        rules = self.pairs.rules(placement)
+        for dpid, entries in rules.items():
+            for entry in entries:
+                self.table_manager.installed(dpid, entry)
+        sent = self.updater.install(rules)
+        self.logger.debug(f"*** Posizionamento per coppia: {sent} FlowMod")
+
+    @controller_metrics.timed
     def apply_slice_policy(self, target_slice):
         self.global_slice_state = target_slice
-        for dpid, dp in self.datapaths.items():
-            parser = dp.ofproto_parser
-            if dpid == 1:
-                out_port = self.PORT_MAP[1]['s3'] if target_slice == 'LOWER' else self.PORT_MAP[1]['s2']
-                for dst in ['h3', 'h4']:
-                    match = parser.OFPMatch(eth_type=0x0800, eth_dst=self.H[dst])
-                    self.add_flow(dp, 250, match, [parser.OFPActionOutput(out_port)])
-            elif dpid == 4:
-                out_port = self.PORT_MAP[4]['s3'] if target_slice == 'LOWER' else self.PORT_MAP[4]['s2']
-                for dst in ['h1', 'h2']:
-                    match = parser.OFPMatch(eth_type=0x0800, eth_dst=self.H[dst])
-                    self.add_flow(dp, 250, match, [parser.OFPActionOutput(out_port)])
-
-    def add_flow(self, datapath, priority, match, actions):
-        ofproto = datapath.ofproto
-        parser = datapath.ofproto_parser
-        inst = [parser.OFPInstructionActions(ofproto.OFPIT_APPLY_ACTIONS, actions)]
-        mod = parser.OFPFlowMod(datapath=datapath, priority=priority,
-                                match=match, instructions=inst)
-        datapath.send_msg(mod)
-
-    @set_ev_cls(ofp_event.EventOFPStateChange, [MAIN_DISPATCHER, DEAD_DISPATCHER])
-    def _state_change_handler(self, ev):
-        datapath = ev.datapath
-        if ev.state == MAIN_DISPATCHER:
-            if datapath.id not in self.datapaths:
-                self.datapaths[datapath.id] = datapath
-        elif ev.state == DEAD_DISPATCHER:
-            if datapath.id in self.datapaths:
-                del self.datapaths[datapath.id]
-                if datapath.id in self.video_stats:
-                    self.video_stats[datapath.id] = 0
+        # Regole a Priorità 250 precompilate per la slice di destinazione.
+        sent = self.updater.install(self.policy.compile_override(target_slice))
+        self.logger.debug(f"*** Transizione -> {target_slice}: {sent} FlowMod")
+
+    @set_ev_cls(ofp_event.EventOFPErrorMsg, [CONFIG_DISPATCHER, MAIN_DISPATCHER])
+    @controller_metrics.handler
+    def _error_msg_handler(self, ev):
+        # Letture del reconciler o bundle della transizione in corso
+        if not self.reconciler.error(ev.msg):
+            self.updater.error(ev.msg)
+
+    @set_ev_cls(ofp_event.EventOFPBarrierReply, [CONFIG_DISPATCHER, MAIN_DISPATCHER])
+    @controller_metrics.handler
+    def _barrier_reply_handler(self, ev):
+        self.programmer.barrier_reply_handler(ev.msg)
+        self.updater.barrier_reply(ev.msg)
+
+    def _datapath_groups(self, dpid, policy=None):
+        # Gruppi FAST_FAILOVER (e SELECT) dello switch, in ordine di installazione
+        policy = policy or self.policy
+        groups = list(policy.group_table(dpid))
+        if self.steering == 'select' and dpid in policy.compile_select():
+            if not self.pairs.select_weights:
+                self.pairs.select_weights = self.pairs.weights_for(dict(self.spec['capacity']))
+            # Il SELECT punta ai gruppi FAST_FAILOVER: va aggiunto dopo
+            groups.append(policy.select_group(dpid, self.pairs.select_weights))
+        return groups
+
+    def install_meters(self, datapath):
+        # Dopo quelli della policy, il meter dei campioni per i flussi pesanti
+        super(DynamicSliceController, self).install_meters(datapath)
+        self.elephants.install_meter(datapath)
+
+    def forget_datapath(self, dpid):
+        super(DynamicSliceController, self).forget_datapath(dpid)
+        self.reconciler.forget(dpid)
+        self.collector.forget(dpid)
+        self.video_stats.forget(lambda key: key[0] == dpid)
+        self.pairs.stats.forget(lambda key: key[0] == dpid)
+        self.meter_stats.forget(lambda key: key[0] == dpid)
+        self.elephants.forget(dpid)
+        self.table_manager.forget(dpid)
+        for key in [key for key in self.meter_drops if key[0] == dpid]:
+            del self.meter_drops[key]
+        if dpid in self.current_speeds:
+            self.current_speeds[dpid] = None
+        self.updater.forget(dpid)
+
+    @set_ev_cls(ofp_event.EventOFPPortStatus, MAIN_DISPATCHER)
+    @controller_metrics.handler
+    def _port_status_handler(self, ev):
+        msg = ev.msg
+        dpid = msg.datapath.id
+        ofproto = msg.datapath.ofproto
+        port_no = msg.desc.port_no
+        # Solo i link tra switch cambiano le slice
+        neighbor = next((name for name, port in self.PORT_MAP.get(dpid, {}).items() if port == port_no), None)
+        if neighbor is None or not neighbor.startswith('s'):
+            return
 
+        down = msg.reason == ofproto.OFPPR_DELETE or bool(msg.desc.state & ofproto.OFPPS_LINK_DOWN)
+        if down == ((dpid, port_no) in self.ports_down):
+            return
+        if down:
+            self.ports_down.add((dpid, port_no))
+            self.logger.warning(f"*** LINK s{dpid}-{neighbor} GIÙ: failover nel datapath, ridistribuzione delle slice")
+        else:
+            self.ports_down.discard((dpid, port_no))
+            self.logger.info(f"*** LINK s{dpid}-{neighbor} DI NUOVO ATTIVO")
+        self._rebalance()
+
+    def _rebalance(self):
+        # Dopo un cambio di stato di un link: si rifà subito la scelta delle
+        # slice con l'ultimo rate video noto, senza attendere il dwell time
+        speeds = [speed for speed in self.current_speeds.values() if speed is not None]
+        max_video_speed = max(speeds) if speeds else 0.0
+        if self.steering == 'pair':
+            self.pairs.place(max_video_speed)
+        elif self.steering == 'select':
+            self.pairs.balance(max_video_speed)
+        elif not self.slice_up(self.global_slice_state):
+            for name in self.spec['capacity']:
+                if self.slice_up(name):
+                    self.apply_slice_policy(name)
+                    break
 
     @set_ev_cls(ofp_event.EventOFPSwitchFeatures, CONFIG_DISPATCHER)
+    @controller_metrics.handler
     def switch_features_handler(self, ev):
         dp = ev.msg.datapath
-        dpid = dp.id
-        parser = dp.ofproto_parser
-        
+
         # Salviamo il datapath per il monitor thread
-        self.datapaths[dpid] = dp
+        self.datapaths[dp.id] = dp
+        self.metrics.add_datapath(dp.id)
+        # Capacità delle tabelle (max_entries), per l'occupazione
+        dp.send_msg(dp.ofproto_parser.OFPTableFeaturesStatsRequest(dp, 0, []))
+        # Lo switch può avere ancora le regole di prima (riavvio del
+        # controller): il reconciler legge cosa c'è installato
+        self.reconciler.connect(dp)
+
+    @set_ev_cls(ofp_event.EventOFPGroupDescStatsReply, MAIN_DISPATCHER)
+    @controller_metrics.handler
+    def _group_desc_reply_handler(self, ev):
+        self.reconciler.reply(ev.msg)
+
+    @set_ev_cls(ofp_event.EventOFPMeterConfigStatsReply, MAIN_DISPATCHER)
+    @controller_metrics.handler
+    def _meter_config_reply_handler(self, ev):
+        self.reconciler.reply(ev.msg)
+
+    def _datapath_table(self, dpid):
+        table = list(self.policy.flow_table(dpid))
+        if self.steering == 'pair':
+            # Regole per coppia (Priorità 260) secondo il posizionamento attuale
+            table += self.pairs.rules(self.pairs.pair_slice).get(dpid, [])
+        elif self.steering == 'select':
+            # Traffico standard verso il gruppo SELECT (Priorità 250)
+            table += self.policy.compile_select().get(dpid, [])
+        elif self.global_slice_state != self.spec['default']:
+            # Regole a Priorità 250 dell'ultima transizione
+            table += self.policy.compile_override(self.global_slice_state).get(dpid, [])
+        return table
+
+    # --- PROXY ARP ---
+    @set_ev_cls(ofp_event.EventOFPPacketIn, MAIN_DISPATCHER)
+    @controller_metrics.handler
+    def _packet_in_handler(self, ev):
+        msg = ev.msg
+        # L'ARP delle porte host (Priorità 110) e le copie del traffico
+        # standard per i flussi pesanti: il resto è per ryu.topology
+        if msg.cookie != slice_policy.COOKIE_ARP:
+            if self.spec.get('elephants') and msg.reason == msg.datapath.ofproto.OFPR_ACTION:
+                self.elephants.sample(msg)
+            return
+        dp = msg.datapath
+        out = self.arp_proxy.handle(dp, msg.match['in_port'], msg, self.policy)
+        if out is not None:
+            dp.send_msg(out)
+
+    @set_ev_cls(ofp_event.EventOFPFlowRemoved, MAIN_DISPATCHER)
+    @controller_metrics.handler
+    def _flow_removed_handler(self, ev):
+        # Regola scaduta (idle_timeout o hard_timeout): per un flusso pesante
+        # il flusso è finito, una coppia di host torna sulle regole aggregate
+        # della slice di default finché il suo traffico non ricompare
+        msg = ev.msg
+        dpid = msg.datapath.id
+        ofproto = msg.datapath.ofproto
+        cookie_class = msg.cookie & slice_policy.COOKIE_CLASS_MASK
+        match = tuple(sorted(msg.match.items()))
+        if cookie_class == slice_policy.COOKIE_ELEPHANT:
+            self.elephants.removed(dpid, match)
+            return
+        if msg.reason not in (ofproto.OFPRR_IDLE_TIMEOUT, ofproto.OFPRR_HARD_TIMEOUT):
+            return
+        entry = self.shadow.tables.get(dpid, {}).get((msg.table_id, msg.priority, match))
+        if cookie_class != slice_policy.COOKIE_PAIR or entry is None or entry.cookie != msg.cookie:
+            return
+        self.pairs.removed(dpid, entry)
 
+    # --- OCCUPAZIONE DELLE TABELLE ---
+    @set_ev_cls(ofp_event.EventOFPTableFeaturesStatsReply, MAIN_DISPATCHER)
+    @controller_metrics.handler
+    def _table_features_reply_handler(self, ev):
+        self.table_manager.set_features(ev.msg.datapath.id, ev.msg.body)
 
-        # --- 0. REGOLA DI DEFAULT (DROP) ---
-        match = parser.OFPMatch()
-        self.add_flow(dp, 0, match, [])
-        
-# --- 1. GESTIONE ARP (Priorità 100) ---
-        # Soluzione "Flood Controllato": Quando arriva un ARP, lo inoltriamo
-        # a tutte le porte della Lower Slice (Host locali + S3).
-        # Lo switch eviterà automaticamente di rimandarlo indietro alla porta di ingresso.
-        
-        # === SWITCH S1 ===
-        if dpid == 1:
-            # Porte coinvolte in ARP: h1(1), h2(2), s3(4). 
-            # ESCLUDIAMO s2(3) che è la slice video.
-            match = parser.OFPMatch(eth_type=0x0806)
-            actions = [
-                parser.OFPActionOutput(self.PORT_MAP[1]['h1']), # Porta 1
-                parser.OFPActionOutput(self.PORT_MAP[1]['h2']), # Porta 2
-                parser.OFPActionOutput(self.PORT_MAP[1]['s3'])  # Porta 4
-            ]
-            self.add_flow(dp, 100, match, actions)
-
-        # === SWITCH S2 (Upper) ===
-        elif dpid == 2:
-            # S2 non dovrebbe mai ricevere ARP se S1/S4 lavorano bene.
-            # Ma se capita, lo scartiamo (Drop implicito) o facciamo pass-through.
-            # Qui non mettiamo nulla (Drop Default) per sicurezza e isolamento.
-            pass
-
-        # === SWITCH S3 (Lower Transit) ===
-        elif dpid == 3:
-            # S3 deve fare flood su tutte le porte attive (1 e 2)
-            match = parser.OFPMatch(eth_type=0x0806)
-            actions = [parser.OFPActionOutput(ofproto_v1_3.OFPP_FLOOD)]
-            self.add_flow(dp, 100, match, actions)
-
-        # === SWITCH S4 ===
-        elif dpid == 4:
-            # Porte coinvolte in ARP: h3(3), h4(4), s3(2).
-            # ESCLUDIAMO s2(1) che è la slice video.
-            match = parser.OFPMatch(eth_type=0x0806)
-            actions = [
-                parser.OFPActionOutput(self.PORT_MAP[4]['h3']), # Porta 3
-                parser.OFPActionOutput(self.PORT_MAP[4]['h4']), # Porta 4
-                parser.OFPActionOutput(self.PORT_MAP[4]['s3'])  # Porta 2
-            ]
-            self.add_flow(dp, 100, match, actions)
-
-
-        # --- 2. SERVICE SLICING (Priorità 200 e 300) ---
-        # Obiettivo: Traffico UDP porta 9999 -> Upper Slice (S2)
-        #            Altro traffico IP -> Lower Slice (S3)
-
-        # === SWITCH S1 (Ingresso traffico) ===
-        if dpid == 1:
-            # SLICE VIDEO (Priorità 300): UDP dst port 9999 -> Vai a S2
-            # eth_type=0x0800 (IP), ip_proto=17 (UDP)
-            match_video = parser.OFPMatch(eth_type=0x0800, ip_proto=17, udp_dst=9999, in_port=1)
-            actions_video = [parser.OFPActionOutput(self.PORT_MAP[1]['s2'])]
-            self.add_flow(dp, 300, match_video, actions_video)
-
-            match_video = parser.OFPMatch(eth_type=0x0800, ip_proto=17, udp_dst=9999, in_port=2)
-            actions_video = [parser.OFPActionOutput(self.PORT_MAP[1]['s2'])]
-            self.add_flow(dp, 300, match_video, actions_video)
-
-
-            # Video h2 -> h1
-            match_video = parser.OFPMatch(eth_type=0x0800, ip_proto=17, udp_dst=9999, eth_src=self.H['h2'], eth_dst=self.H['h1'])
-            actions_video = [parser.OFPActionOutput(self.PORT_MAP[1]['h1'])]
-            self.add_flow(dp, 310, match_video, actions_video)
-
-            # Video h1 -> h2
-            match_video = parser.OFPMatch(eth_type=0x0800, ip_proto=17, udp_dst=9999, eth_src=self.H['h1'], eth_dst=self.H['h2'])
-            actions_video = [parser.OFPActionOutput(self.PORT_MAP[1]['h2'])]
-            self.add_flow(dp, 310, match_video, actions_video)
-
-            # Standard H1 -> H2
-            match_std_local = parser.OFPMatch(eth_type=0x0800, eth_dst=self.H['h2'])
-            actions_std_local = [parser.OFPActionOutput(self.PORT_MAP[1]['h2'])]
-            self.add_flow(dp, 210, match_std_local, actions_std_local)
-
-            # Standard H2 -> H1
-            match_std_local = parser.OFPMatch(eth_type=0x0800, eth_dst=self.H['h1'])
-            actions_std_local = [parser.OFPActionOutput(self.PORT_MAP[1]['h1'])]
-            self.add_flow(dp, 210, match_std_local, actions_std_local)
-
-            # SLICE NON-VIDEO (Priorità 200): Tutto il resto IP verso H3 o H4 -> Vai a S3
-            for dest_host in ['h3', 'h4']:
-                match_std = parser.OFPMatch(eth_type=0x0800, eth_dst=self.H[dest_host])
-                actions_std = [parser.OFPActionOutput(self.PORT_MAP[1]['s3'])]
-                self.add_flow(dp, 200, match_std, actions_std)
-
-            # RITORNO (H3/H4 -> H1/H2): Gestiamo il traffico di ritorno che arriva da S2 o S3
-            # Se arriva da S2 (Video Return) destinato a H1
-            match = parser.OFPMatch(in_port=3, eth_dst=self.H['h1'], eth_type=0x0800)
-            actions = [parser.OFPActionOutput(self.PORT_MAP[1]['h1'])]
-            self.add_flow(dp, 300, match, actions)
-            
-            # Se arriva da S2 (Video Return) destinato a H2
-            match = parser.OFPMatch(in_port=3, eth_dst=self.H['h2'], eth_type=0x0800)
-            actions = [parser.OFPActionOutput(self.PORT_MAP[1]['h2'])]
-            self.add_flow(dp, 300, match, actions)
-
-            # Se arriva da S3 (Non-Video Return) destinato a H1
-            match = parser.OFPMatch(in_port=4, eth_dst=self.H['h1'], eth_type=0x0800)
-            actions = [parser.OFPActionOutput(self.PORT_MAP[1]['h1'])]
-            self.add_flow(dp, 200, match, actions)
-
-            # Se arriva da S3 (Non-Video Return) destinato a H2
-            match = parser.OFPMatch(in_port=4, eth_dst=self.H['h2'], eth_type=0x0800)
-            actions = [parser.OFPActionOutput(self.PORT_MAP[1]['h2'])]
-            self.add_flow(dp, 200, match, actions)
-
-        # === SWITCH S2 (Transit Upper - Video) ===
-        elif dpid == 2:
-            # Avanti (verso S4)
-            match = parser.OFPMatch(in_port=1, eth_type=0x0800)
-            actions = [parser.OFPActionOutput(2)]
-            self.add_flow(dp, 300, match, actions)
-
-            # Indietro (verso S1)
-            match = parser.OFPMatch(in_port=2, eth_type=0x0800)
-            actions = [parser.OFPActionOutput(1)]
-            self.add_flow(dp, 300, match, actions)
-
-        # === SWITCH S3 (Transit Lower - Non-Video) ===
-        elif dpid == 3:
-            # Avanti (verso S4)
-            match = parser.OFPMatch(in_port=1, eth_type=0x0800)
-            actions = [parser.OFPActionOutput(2)]
-            self.add_flow(dp, 200, match, actions)
-
-            # Indietro (verso S1)
-            match = parser.OFPMatch(in_port=2, eth_type=0x0800)
-            actions = [parser.OFPActionOutput(1)]
-            self.add_flow(dp, 200, match, actions)
-
-        # === SWITCH S4 (Egress / Merge) ===
-        elif dpid == 4:
-            # SLICE VIDEO (Priorità 300): UDP dst port 9999 -> Vai a S2
-            # eth_type=0x0800 (IP), ip_proto=17 (UDP)
-            
-            # Da H3 (Porta 3) -> S2
-            match = parser.OFPMatch(eth_type=0x0800, ip_proto=17, udp_dst=9999, in_port=3)
-            actions = [parser.OFPActionOutput(self.PORT_MAP[4]['s2'])]
-            self.add_flow(dp, 300, match, actions)
-
-            # Da H4 (Porta 4) -> S2
-            match = parser.OFPMatch(eth_type=0x0800, ip_proto=17, udp_dst=9999, in_port=4)
-            actions = [parser.OFPActionOutput(self.PORT_MAP[4]['s2'])]
-            self.add_flow(dp, 300, match, actions)
-
-            # Video h3 -> h4
-            match_video = parser.OFPMatch(eth_type=0x0800, ip_proto=17, udp_dst=9999, eth_src=self.H['h3'], eth_dst=self.H['h4'])
-            actions_video = [parser.OFPActionOutput(self.PORT_MAP[4]['h4'])]
-            self.add_flow(dp, 310, match_video, actions_video)
-
-            # Video h4 -> h3
-            match_video = parser.OFPMatch(eth_type=0x0800, ip_proto=17, udp_dst=9999, eth_src=self.H['h4'], eth_dst=self.H['h3'])
-            actions_video = [parser.OFPActionOutput(self.PORT_MAP[4]['h3'])]
-            self.add_flow(dp, 310, match_video, actions_video)
-
-            # Standard H3 -> H4
-            match_std_local = parser.OFPMatch(eth_type=0x0800, eth_dst=self.H['h4'])
-            actions_std_local = [parser.OFPActionOutput(self.PORT_MAP[4]['h4'])]
-            self.add_flow(dp, 210, match_std_local, actions_std_local)
-
-            # Standard H4 -> H3
-            match_std_local = parser.OFPMatch(eth_type=0x0800, eth_dst=self.H['h3'])
-            actions_std_local = [parser.OFPActionOutput(self.PORT_MAP[4]['h3'])]
-            self.add_flow(dp, 210, match_std_local, actions_std_local)
-
-            # SLICE NON-VIDEO (Priorità 200): Tutto il resto IP verso H1 o H2 -> Vai a S3
-            for dest_host in ['h1', 'h2']:
-                match_std = parser.OFPMatch(eth_type=0x0800, eth_dst=self.H[dest_host])
-                actions_std = [parser.OFPActionOutput(self.PORT_MAP[4]['s3'])]
-                self.add_flow(dp, 200, match_std, actions_std)
-
-            # RITORNO (H1/H2 -> H3/H4): Gestiamo il traffico di ritorno che arriva da S2 o S3
-            # Se arriva da S2 (Video Return) destinato a H3
-            match = parser.OFPMatch(in_port=1, eth_dst=self.H['h3'], eth_type=0x0800)
-            actions = [parser.OFPActionOutput(self.PORT_MAP[4]['h3'])]
-            self.add_flow(dp, 300, match, actions)
-            
-            # Se arriva da S2 (Video Return) destinato a H4
-            match = parser.OFPMatch(in_port=1, eth_dst=self.H['h4'], eth_type=0x0800)
-            actions = [parser.OFPActionOutput(self.PORT_MAP[4]['h4'])]
-            self.add_flow(dp, 300, match, actions)
-
-            # Se arriva da S3 (Non-Video Return) destinato a H3
-            match = parser.OFPMatch(in_port=2, eth_dst=self.H['h3'], eth_type=0x0800)
-            actions = [parser.OFPActionOutput(self.PORT_MAP[4]['h3'])]
-            self.add_flow(dp, 200, match, actions)
-
-            # Se arriva da S3 (Non-Video Return) destinato a H4
-            match = parser.OFPMatch(in_port=2, eth_dst=self.H['h4'], eth_type=0x0800)
-            actions = [parser.OFPActionOutput(self.PORT_MAP[4]['h4'])]
-            self.add_flow(dp, 200, match, actions)
-        
\ No newline at end of file
+    @set_ev_cls(ofp_event.EventOFPTableStatsReply, MAIN_DISPATCHER)
+    @controller_metrics.handler
+    def _table_stats_reply_handler(self, ev):
+        dp = ev.msg.datapath
+        dpid = dp.id
+        self.table_manager.update(dpid, ev.msg.body)
+        if self.table_manager.pressured(dpid):
+            self.pairs.relieve(dp)
+        for table_id, value in self.table_manager.occupancy(dpid).items():
+            self.metrics.table_occupancy[(dpid, table_id)] = value
+            self.metrics.table_entries[(dpid, table_id)] = self.table_manager.active[(dpid, table_id)]
+        self.metrics.table_evictions = self.table_manager.evictions
+        self.metrics.aggregated_pairs = len(self.pairs.aggregated)
+
+    # --- TOPOLOGIA SCOPERTA A RUNTIME ---
+    def _compile_policy(self):
+        super(DynamicSliceController, self)._compile_policy()
+        policy, H = self.policy, self.H
+
+        # Stato che dipende da host e switch
+        self.pairs.compile(policy, self.global_slice_state)
+        self.mac_host = {mac: h for h, mac in H.items()}
+        self.current_speeds = {dpid: self.current_speeds.get(dpid, 0.0) for dpid in policy.edge_switches()}
+        for (dpid, port), bps in policy.link_capacities().items():
+            self.port_monitor.set_capacity(dpid, port, bps)
+
+    def sync_datapath(self, datapath, old):
+        # Riconciliazione in attesa della topologia: ci pensa il reconciler
+        if self.reconciler.sync(datapath):
+            return
+        # Le regole dei flussi pesanti si cancellano dallo switch: tolte
+        # dalla shadow table, stale() non le vedrebbe più
+        self.elephants.forget(datapath.id, delete=True)
+        super(DynamicSliceController, self).sync_datapath(datapath, old)
@@ -0,0 +1,212 @@
+# controller_metrics.py
+# Metriche del controller dinamico, servite in formato testo Prometheus
+# dall'applicazione WSGI di Ryu (GET /metrics, porta di --wsapi-port):
+#   - rate video e standard per switch di bordo (byte/s)
+#   - istogrammi della latenza richiesta -> risposta delle statistiche
+#   - FlowMod spediti in totale e al secondo (per round di polling)
+#   - durata di apply_slice_policy (e degli altri cambi di slice)
+#   - regole dei flussi pesanti installate per switch di bordo
+#   - profondità della coda eventi di Ryu e tempo passato in ogni handler
+# Gli istogrammi hanno bucket fissi e contatori in liste preallocate, e sono
+# creati tutti prima del primo evento (handler e cambi di slice all'avvio,
+# latenze alla connessione dello switch): un'osservazione è una ricerca
+# binaria e un incremento, senza allocare strutture nuove, così la raccolta
+# resta attiva anche a pieno carico.
+#
+# Uso: ryu-manager --observe-links controller_Dynamic_Slicing.py
+#      curl http://127.0.0.1:8080/metrics
+import bisect
+import functools
+import time
+
+from ryu.app.wsgi import ControllerBase, route
+from webob import Response
+
+# Bucket delle durate (secondi): da 50 us a 10 s
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Bucket della coda eventi (la coda di un'app Ryu ha 128 posti)
+DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class Histogram(object):
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        # Un contatore per bucket più quello oltre l'ultimo limite
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        # (limite, osservazioni <= limite), l'ultimo con limite +Inf
+        total = 0
+        for bound, count in zip(self.bounds + (float('inf'),), self.counts):
+            total += count
+            yield bound, total
+
+
+class ControllerMetrics(object):
+
+    def __init__(self):
+        # dpid -> rate video e standard dell'ultimo campione (byte/s)
+        self.video_rate = {}
+        self.standard_rate = {}
+        # dpid -> regole dei flussi pesanti installate
+        self.elephant_flows = {}
+        # (dpid, table_id) -> quota occupata e regole attive della tabella
+        self.table_occupancy = {}
+        self.table_entries = {}
+        # Regole dinamiche tolte sotto pressione e coppie rimaste aggregate
+        self.table_evictions = 0
+        self.aggregated_pairs = 0
+        # dpid -> latenza delle richieste di statistiche
+        self.stats_rtt = {}
+        # FlowMod spediti e rate misurato tra due campioni
+        self.flowmods_total = 0
+        self.flowmods_per_second = 0.0
+        self._flowmods_sample = None
+        # nome -> durata (handler degli eventi e cambi di slice)
+        self.handlers = {}
+        self.transitions = {}
+        self.queue_depth = Histogram(DEPTH_BUCKETS)
+
+    def register(self, cls, transitions=()):
+        # Un istogramma per ogni handler (@handler) e cambio di slice (@timed)
+        # della classe del controller, più i cambi osservati a mano: tutti
+        # creati subito, l'osservazione non alloca mai
+        for attr in dir(cls):
+            kind, name = getattr(getattr(cls, attr), 'metrics_histogram', (None, None))
+            if kind == 'handler':
+                self.handlers[name] = Histogram(LATENCY_BUCKETS)
+            elif kind == 'transition':
+                self.transitions[name] = Histogram(LATENCY_BUCKETS)
+        for name in transitions:
+            self.transitions[name] = Histogram(LATENCY_BUCKETS)
+
+    def add_datapath(self, dpid):
+        # Alla connessione dello switch: istogramma delle latenze delle sue
+        # statistiche (tenuto se lo switch si riconnette)
+        if dpid not in self.stats_rtt:
+            self.stats_rtt[dpid] = Histogram(LATENCY_BUCKETS)
+
+    def observe_rtt(self, dpid, seconds):
+        self.stats_rtt[dpid].observe(seconds)
+
+    def observe_handler(self, name, seconds, depth):
+        self.handlers[name].observe(seconds)
+        self.queue_depth.observe(depth)
+
+    def observe_transition(self, name, seconds):
+        self.transitions[name].observe(seconds)
+
+    def sample_flowmods(self, total, now):
+        # Chiamata una volta per round: rate dal campione precedente
+        if self._flowmods_sample is not None and now > self._flowmods_sample[1]:
+            self.flowmods_per_second = (total - self._flowmods_sample[0]) / (now - self._flowmods_sample[1])
+        self._flowmods_sample = (total, now)
+        self.flowmods_total = total
+
+    def render(self):
+        lines = []
+
+        def header(name, kind, text):
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def histogram(name, label, hists):
+            for key, hist in sorted(hists.items()):
+                labels = f'{label}="{key}",' if label else ''
+                for bound, count in hist.cumulative():
+                    le = '+Inf' if bound == float('inf') else bound
+                    lines.append(f'{name}_bucket{{{labels}le="{le}"}} {count}')
+                suffix = f'{{{labels[:-1]}}}' if labels else ''
+                lines.append(f"{name}_sum{suffix} {hist.sum}")
+                lines.append(f"{name}_count{suffix} {hist.count}")
+
+        header('slice_video_rate_bytes', 'gauge', 'Rate video per switch di bordo (byte/s)')
+        for dpid, rate in sorted(self.video_rate.items()):
+            lines.append(f'slice_video_rate_bytes{{dpid="{dpid}"}} {rate}')
+        header('slice_standard_rate_bytes', 'gauge',
+               'Traffico standard spedito sulle slice per switch di bordo (byte/s)')
+        for dpid, rate in sorted(self.standard_rate.items()):
+            lines.append(f'slice_standard_rate_bytes{{dpid="{dpid}"}} {rate}')
+        header('slice_elephant_flows', 'gauge', 'Regole dei flussi pesanti installate per switch di bordo')
+        for dpid, count in sorted(self.elephant_flows.items()):
+            lines.append(f'slice_elephant_flows{{dpid="{dpid}"}} {count}')
+        header('slice_table_occupancy_ratio', 'gauge', 'Regole attive / capacità per tabella')
+        for (dpid, table_id), value in sorted(self.table_occupancy.items()):
+            lines.append(f'slice_table_occupancy_ratio{{dpid="{dpid}",table="{table_id}"}} {value}')
+        header('slice_table_entries', 'gauge', 'Regole attive per tabella (OFPTableStats)')
+        for (dpid, table_id), count in sorted(self.table_entries.items()):
+            lines.append(f'slice_table_entries{{dpid="{dpid}",table="{table_id}"}} {count}')
+        header('slice_table_evictions_total', 'counter', 'Regole dinamiche tolte con la tabella sopra la soglia')
+        lines.append(f"slice_table_evictions_total {self.table_evictions}")
+        header('slice_aggregated_pairs', 'gauge', 'Coppie di host rimaste sulle regole aggregate')
+        lines.append(f"slice_aggregated_pairs {self.aggregated_pairs}")
+        header('slice_stats_rtt_seconds', 'histogram', 'Latenza richiesta -> risposta delle statistiche')
+        histogram('slice_stats_rtt_seconds', 'dpid', self.stats_rtt)
+        header('slice_flowmods_total', 'counter', 'FlowMod e messaggi di programmazione spediti')
+        lines.append(f"slice_flowmods_total {self.flowmods_total}")
+        header('slice_flowmods_per_second', 'gauge', "FlowMod al secondo nell'ultimo round")
+        lines.append(f"slice_flowmods_per_second {self.flowmods_per_second}")
+        header('slice_transition_seconds', 'histogram', 'Durata dei cambi di slice (apply_slice_policy, ...)')
+        histogram('slice_transition_seconds', 'function', self.transitions)
+        header('slice_handler_seconds', 'histogram', 'Tempo passato in ogni handler di eventi')
+        histogram('slice_handler_seconds', 'handler', self.handlers)
+        header('slice_event_queue_depth', 'histogram', "Eventi in coda all'ingresso di un handler")
+        histogram('slice_event_queue_depth', None, {None: self.queue_depth})
+        return '\n'.join(lines) + '\n'
+
+
+def handler(method):
+    # Per gli handler @set_ev_cls (da mettere sotto il decoratore di Ryu):
+    # tempo nell'handler e eventi ancora in coda in quel momento. Senza
+    # metriche (self.metrics None) l'handler è chiamato e basta
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, ev):
+        if self.metrics is None:
+            return method(self, ev)
+        start = time.perf_counter()
+        try:
+            return method(self, ev)
+        finally:
+            self.metrics.observe_handler(name, time.perf_counter() - start, self.events.qsize())
+    wrapper.metrics_histogram = ('handler', name)
+    return wrapper
+
+
+def timed(method):
+    # Per i cambi di slice: durata della chiamata
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, arg):
+        if self.metrics is None:
+            return method(self, arg)
+        start = time.perf_counter()
+        try:
+            return method(self, arg)
+        finally:
+            self.metrics.observe_transition(name, time.perf_counter() - start)
+    wrapper.metrics_histogram = ('transition', name)
+    return wrapper
+
+
+class MetricsController(ControllerBase):
+    # Registrata sull'applicazione WSGI con {'metrics': ControllerMetrics}
+
+    def __init__(self, req, link, data, **config):
+        super(MetricsController, self).__init__(req, link, data, **config)
+        self.metrics = data['metrics']
+
+    @route('metrics', '/metrics', methods=['GET'])
+    def get_metrics(self, req, **kwargs):
+        return Response(content_type='text/plain', charset='utf-8', text=self.metrics.render())
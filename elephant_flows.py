@@ -0,0 +1,201 @@
+# elephant_flows.py
+# Flussi pesanti del controller dinamico (spec 'elephants'): i pacchetti
+# standard copiati al controller dalla slice di default (al massimo
+# sample_rate pkt/s per switch, meter OFPM_CONTROLLER) vanno in uno
+# Space-Saving per switch di bordo. A ogni round la quota di byte campionati
+# di un flusso per il rate in uscita sulla slice di default ne stima il
+# rate: sopra threshold il flusso riceve una regola sua (Priorità 270) verso
+# la slice con più spazio, se il controllo di ammissione ce lo fa stare
+# sotto l'headroom. La regola scade senza traffico (idle_timeout della sua
+# classe); il rate misurato dai suoi contatori sotto metà soglia la fa
+# cancellare.
+# Il controller dà policy, datapath, shadow table, monitor delle porte,
+# gestore delle tabelle e le coppie di host (PairSteering).
+import math
+
+from ryu.lib.packet import ethernet, ipv4, packet, tcp, udp
+
+import heavy_hitters
+import rate_estimator
+import slice_admission
+
+
+class ElephantFlows(object):
+
+    def __init__(self, ctrl, threshold, max_flows=64, sample_rate=100, sample_slots=32, sample_decay=0.5,
+                 rate_samples=4, rate_alpha=0.5):
+        self.ctrl = ctrl
+        # Rate (byte/s) oltre cui un flusso campionato riceve la sua regola
+        self.threshold = threshold
+        self.max_flows = max_flows
+        self.sample_rate = sample_rate
+        self.sample_slots = sample_slots
+        self.sample_decay = sample_decay
+        # dpid -> Space-Saving dei campioni (5-tupla -> byte)
+        self.samples = {}
+        # dpid -> {match della regola: (FlowEntry, slice)}, e rate misurati
+        self.rules = {}
+        self.stats = rate_estimator.RateEstimator(size=rate_samples, alpha=rate_alpha)
+        self.rates = {}
+        self.promoted = 0
+        self.demoted = 0
+
+    def enabled(self, dpid):
+        # Gli switch di bordo copiano al controller il traffico standard
+        ctrl = self.ctrl
+        return bool(ctrl.spec.get('elephants')) and dpid in ctrl.policy.edge_switches()
+
+    # --- METER DEI CAMPIONI ---
+    def install_meter(self, datapath):
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
+        if self.enabled(datapath.id):
+            # Il meter virtuale del controller può sopravvivere a OFPM_ALL
+            self.ctrl.programmer.add(datapath, parser.OFPMeterMod(datapath, command=ofproto.OFPMC_DELETE,
+                                                                  meter_id=ofproto.OFPM_CONTROLLER))
+            self.add_meter(datapath, ofproto.OFPMC_ADD)
+
+    def add_meter(self, datapath, command):
+        # Meter OFPM_CONTROLLER: al massimo sample_rate pacchetti al secondo
+        # copiati al controller per il rilevamento dei flussi pesanti
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
+        self.ctrl.programmer.add(datapath, parser.OFPMeterMod(datapath, command=command,
+                                                              flags=meter_flags(ofproto),
+                                                              meter_id=ofproto.OFPM_CONTROLLER,
+                                                              bands=self.meter_bands(parser)))
+
+    def meter_bands(self, parser):
+        return [parser.OFPMeterBandDrop(rate=self.sample_rate, burst_size=max(1, self.sample_rate // 10))]
+
+    # --- CAMPIONI E CONTATORI ---
+    def sample(self, msg):
+        # Copia di un pacchetto standard: i suoi byte vanno alla 5-tupla
+        # (con la porta dell'host) nello Space-Saving dello switch
+        ctrl = self.ctrl
+        dpid = msg.datapath.id
+        if dpid not in ctrl.current_speeds:
+            return
+        pkt = packet.Packet(msg.data)
+        eth = pkt.get_protocol(ethernet.ethernet)
+        ip = pkt.get_protocol(ipv4.ipv4)
+        l4 = pkt.get_protocol(tcp.tcp) or pkt.get_protocol(udp.udp)
+        if eth is None or ip is None or l4 is None:
+            return
+        ctrl.pairs.sampled_pair((ctrl.mac_host.get(eth.src), ctrl.mac_host.get(eth.dst)))
+        sketch = self.samples.get(dpid)
+        if sketch is None:
+            sketch = self.samples[dpid] = heavy_hitters.SpaceSaving(self.sample_slots)
+        sketch.update((msg.match['in_port'], ip.src, ip.dst, ip.proto, l4.src_port, l4.dst_port), msg.total_len)
+
+    def observe(self, dpid, cookie_class, match, duration, byte_count):
+        # Contatori della regola di un flusso pesante (flow stats)
+        if match in self.rules.get(dpid, {}):
+            self.rates[(dpid, match)] = self.stats.update((dpid, cookie_class, match), duration, byte_count)
+
+    # --- UNA VOLTA PER ROUND ---
+    def detect(self):
+        # Con l'utilizzo dei link appena calcolato
+        ctrl = self.ctrl
+        if not ctrl.spec.get('elephants'):
+            return
+        spec, policy = ctrl.spec, ctrl.policy
+        default = spec['default']
+        # Slice dove spostare i flussi: ognuno prenota la sua stima sullo
+        # spazio che resta sotto l'headroom oltre al traffico già misurato
+        targets = [name for name in spec['capacity']
+                   if name != default and name in policy.slices and ctrl.slice_up(name)]
+        headroom = ctrl.pairs.placement.headroom
+        admission = slice_admission.AdmissionControl({name: spec['capacity'][name] for name in targets}, headroom)
+        for name in targets:
+            admission.measured[(name, None)] = spec['capacity'][name] * ctrl.slice_utilization(name)
+        touched = set()
+
+        # Prima si tolgono le regole dei flussi tornati piccoli, quelle delle
+        # slice giù e, se i meter di una slice scartano (il video non ci sta
+        # più), quella del flusso più pesante della slice
+        ranked = sorted(((self.rates.get((dpid, match)), dpid, match, name)
+                         for dpid, rules in self.rules.items()
+                         for match, (entry, name) in rules.items()),
+                        key=lambda item: -(item[0] or 0.0))
+        congested = {name for name in targets if ctrl.slice_congested(name)}
+        for rate, dpid, match, name in ranked:
+            if name in congested:
+                congested.discard(name)
+            elif name in targets and (rate is None or rate >= self.threshold / 2):
+                continue
+            self.drop(dpid, match, delete=True)
+            self.demoted += 1
+            touched.add(dpid)
+
+        # Poi i flussi campionati: rate stimato dalla quota dei byte visti
+        # e dal rate in uscita sulla slice di default dello switch. Con la
+        # slice satura i flussi TCP se la dividono: basta metà soglia
+        for dpid, sketch in self.samples.items():
+            dp = ctrl.datapaths.get(dpid)
+            port = policy.select_ports(dpid).get(default)
+            rate = ctrl.port_monitor.tx_rate_of(dpid, port) / 8 if port is not None else float('nan')
+            threshold = self.threshold
+            if port is not None and ctrl.port_monitor.utilization(dpid, port) >= headroom:
+                threshold /= 2
+            rules = self.rules.setdefault(dpid, {})
+            # Con la tabella piena non si aggiungono regole per flusso
+            crowded = dp is None or math.isnan(rate) or ctrl.table_manager.crowded(dpid)
+            for flow, _, _ in ([] if crowded else sketch.top()):
+                estimate = sketch.share(flow) * rate
+                if estimate < threshold:
+                    continue
+                name = admission.best(targets)
+                if name is None or len(rules) >= self.max_flows:
+                    break
+                entry = policy.compile_elephant(dpid, flow, name)
+                if entry is None or entry.match in rules:
+                    continue
+                if not admission.admit(name, None, (dpid, flow), estimate * 8):
+                    break
+                entry = ctrl.table_manager.assign(entry)
+                ctrl.add_entry(dp, entry)
+                ctrl.shadow.update(dpid, [entry])
+                ctrl.table_manager.installed(dpid, entry)
+                rules[entry.match] = (entry, name)
+                # Da qui il flusso non passa più dalla slice di default
+                sketch.forget(flow)
+                self.promoted += 1
+                touched.add(dpid)
+                ctrl.logger.info(f"*** s{dpid}: flusso pesante {flow[1]}:{flow[4]} -> {flow[2]}:{flow[5]} "
+                                 f"({estimate*8/1e6:.2f} Mbps) su {name}")
+            sketch.decay(self.sample_decay)
+
+        for dpid in touched:
+            if dpid in ctrl.datapaths:
+                ctrl.programmer.flush(ctrl.datapaths[dpid])
+        for dpid, rules in self.rules.items():
+            ctrl.metrics.elephant_flows[dpid] = len(rules)
+
+    # --- REGOLE TOLTE ---
+    def drop(self, dpid, match, delete=False):
+        ctrl = self.ctrl
+        entry, name = self.rules[dpid].pop(match)
+        self.rates.pop((dpid, match), None)
+        self.stats.forget(lambda key: key[0] == dpid and key[2] == match)
+        ctrl.shadow.remove(dpid, [entry])
+        ctrl.table_manager.forget_rule(dpid, entry.key())
+        dp = ctrl.datapaths.get(dpid)
+        if delete and dp is not None:
+            ctrl.delete_entry(dp, entry)
+
+    def removed(self, dpid, match):
+        # Regola scaduta sullo switch (flusso finito)
+        if match in self.rules.get(dpid, {}):
+            self.drop(dpid, match)
+
+    def forget(self, dpid, delete=False):
+        # Switch disconnesso (delete=False) o tabella da risincronizzare
+        for match in list(self.rules.get(dpid, {})):
+            self.drop(dpid, match, delete)
+        if not delete:
+            self.samples.pop(dpid, None)
+
+
+def meter_flags(ofproto):
+    return ofproto.OFPMF_PKTPS | ofproto.OFPMF_BURST
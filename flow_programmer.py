@@ -0,0 +1,214 @@
+# flow_programmer.py
+# Installazione dei flussi a lotti con conferma tramite barrier.
+# I FlowMod vengono accodati per datapath e spediti insieme con una sola
+# scrittura sul canale di controllo: come burst terminato da un
+# OFPBarrierRequest oppure dentro un bundle OpenFlow 1.3 (estensione ONF)
+# atomico. La risposta alla barrier conferma che la slice è attiva e
+# fornisce la latenza di installazione per datapath.
+# Per gli aggiornamenti in due fasi il bundle si può anche solo preparare
+# (stage): lo switch lo valida senza applicarlo, e il commit lo rende attivo
+# in un colpo solo quando il controller ha le conferme di tutti gli switch.
+import time
+
+from ryu.lib import hub
+
+
+class FlowProgrammer(object):
+
+    def __init__(self, logger, use_bundle=False):
+        self.logger = logger
+        self.use_bundle = use_bundle
+
+        # dpid -> (datapath, [messaggi in coda])
+        self.pending = {}
+        # (dpid, xid della barrier) -> (istante di invio, numero di messaggi)
+        self.barriers = {}
+        # dpid -> evento segnalato quando non ci sono barrier in sospeso
+        self.idle = {}
+        # dpid -> ultima latenza di installazione (secondi)
+        self.install_latency = {}
+        # Messaggi spediti in totale (FlowMod e simili, barrier escluse)
+        self.sent_msgs = 0
+        # dpid -> id del bundle preparato e non ancora confermato
+        self.staged = {}
+        # dpid -> xid dei messaggi dell'ultimo bundle (per gli errori)
+        self.bundle_xids = {}
+
+        self._bundle_id = 0
+
+    def add(self, datapath, msg):
+        entry = self.pending.get(datapath.id)
+        if entry is None:
+            entry = self.pending[datapath.id] = (datapath, [])
+        entry[1].append(msg)
+
+    def flush(self, datapath):
+        # Spedisce la coda del datapath; restituisce l'xid della barrier
+        _, msgs = self.pending.pop(datapath.id, (datapath, []))
+        if not msgs:
+            return None
+
+        batch = self._bundle(datapath, msgs) if self.use_bundle else list(msgs)
+        return self._send(datapath, batch, len(msgs))
+
+    def stage(self, datapath):
+        # Prima fase: la coda parte in un bundle aperto e non confermato; la
+        # barrier reply dice che lo switch lo ha ricevuto e validato
+        _, msgs = self.pending.pop(datapath.id, (datapath, []))
+        if not msgs:
+            return None
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
+        bundle_id = self._next_bundle_id()
+        flags = ofproto.ONF_BF_ATOMIC | ofproto.ONF_BF_ORDERED
+        batch = [parser.ONFBundleCtrlMsg(datapath, bundle_id, ofproto.ONF_BCT_OPEN_REQUEST, flags, [])]
+        for msg in msgs:
+            batch.append(parser.ONFBundleAddMsg(datapath, bundle_id, flags, msg, []))
+        self.staged[datapath.id] = bundle_id
+        xid = self._send(datapath, batch, len(msgs))
+        self.bundle_xids[datapath.id] = {msg.xid for msg in batch}
+        return xid
+
+    def commit(self, datapath):
+        # Seconda fase: il bundle preparato diventa attivo, atomico sullo switch
+        return self._close_bundle(datapath, datapath.ofproto.ONF_BCT_COMMIT_REQUEST)
+
+    def discard(self, datapath):
+        # Transizione annullata: lo switch scarta il bundle preparato
+        return self._close_bundle(datapath, datapath.ofproto.ONF_BCT_DISCARD_REQUEST)
+
+    def _close_bundle(self, datapath, ctrl_type):
+        bundle_id = self.staged.pop(datapath.id, None)
+        if bundle_id is None:
+            return None
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
+        flags = ofproto.ONF_BF_ATOMIC | ofproto.ONF_BF_ORDERED
+        batch = [parser.ONFBundleCtrlMsg(datapath, bundle_id, ctrl_type, flags, [])]
+        xid = self._send(datapath, batch, 0)
+        self.bundle_xids.setdefault(datapath.id, set()).update(msg.xid for msg in batch)
+        return xid
+
+    def bundle_error(self, dpid, xid):
+        # True se l'errore riguarda un messaggio dell'ultimo bundle di dpid
+        return xid in self.bundle_xids.get(dpid, ())
+
+    def _send(self, datapath, batch, count):
+        # Una sola scrittura: il lotto più la barrier che lo conferma
+        parser = datapath.ofproto_parser
+        barrier = parser.OFPBarrierRequest(datapath)
+        batch.append(barrier)
+
+        buf = bytearray()
+        for msg in batch:
+            if msg.xid is None:
+                datapath.set_xid(msg)
+            msg.serialize()
+            buf += msg.buf
+
+        self.sent_msgs += count
+        self.barriers[(datapath.id, barrier.xid)] = (time.monotonic(), count)
+        self._idle_event(datapath.id).clear()
+        datapath.send(bytes(buf))
+        return barrier.xid
+
+    def flush_all(self):
+        for datapath, _ in list(self.pending.values()):
+            self.flush(datapath)
+
+    def barrier_reply_handler(self, msg):
+        dpid = msg.datapath.id
+        sent = self.barriers.pop((dpid, msg.xid), None)
+        if sent is None:
+            return None
+
+        start, count = sent
+        latency = time.monotonic() - start
+        self.install_latency[dpid] = latency
+        if count:
+            self.logger.info(f"*** s{dpid}: {count} FlowMod confermati in {latency*1e3:.1f} ms")
+
+        if not any(key[0] == dpid for key in self.barriers):
+            self._idle_event(dpid).set()
+        return latency
+
+    def wait(self, dpid, timeout=None):
+        # Attende la conferma (barrier reply) di tutti i lotti spediti al datapath
+        if not any(key[0] == dpid for key in self.barriers):
+            return True
+        return self._idle_event(dpid).wait(timeout)
+
+    def forget(self, dpid):
+        # Datapath disconnesso: scarta la coda e sblocca chi è in attesa
+        self.pending.pop(dpid, None)
+        self.staged.pop(dpid, None)
+        self.bundle_xids.pop(dpid, None)
+        for key in [key for key in self.barriers if key[0] == dpid]:
+            del self.barriers[key]
+        if dpid in self.idle:
+            self.idle.pop(dpid).set()
+
+    def _idle_event(self, dpid):
+        event = self.idle.get(dpid)
+        if event is None:
+            event = self.idle[dpid] = hub.Event()
+            event.set()
+        return event
+
+    def _bundle(self, datapath, msgs):
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
+        bundle_id = self._next_bundle_id()
+        flags = ofproto.ONF_BF_ATOMIC | ofproto.ONF_BF_ORDERED
+
+        batch = [parser.ONFBundleCtrlMsg(datapath, bundle_id, ofproto.ONF_BCT_OPEN_REQUEST, flags, [])]
+        for msg in msgs:
+            batch.append(parser.ONFBundleAddMsg(datapath, bundle_id, flags, msg, []))
+        batch.append(parser.ONFBundleCtrlMsg(datapath, bundle_id, ofproto.ONF_BCT_COMMIT_REQUEST, flags, []))
+        return batch
+
+    def _next_bundle_id(self):
+        self._bundle_id = (self._bundle_id + 1) & 0xffffffff
+        return self._bundle_id
+
+
+class ShadowFlowTable(object):
+    # Copia lato controller delle regole installate su ogni datapath:
+    # dpid -> {(tabella, priorità, match): FlowEntry}
+
+    def __init__(self):
+        self.tables = {}
+
+    def reset(self, dpid, entries=()):
+        self.tables[dpid] = {e.key(): e for e in entries}
+
+    def forget(self, dpid):
+        self.tables.pop(dpid, None)
+
+    def diff(self, dpid, entries):
+        # Restituisce (nuove, modificate): le regole assenti vanno aggiunte,
+        # quelle con azioni diverse modificate; le identiche vengono saltate
+        table = self.tables.setdefault(dpid, {})
+        added, modified = [], []
+        for entry in entries:
+            installed = table.get(entry.key())
+            if installed is None:
+                added.append(entry)
+            elif installed.action_key() != entry.action_key():
+                modified.append(entry)
+        return added, modified
+
+    def stale(self, dpid, entries):
+        # Regole installate che non compaiono in entries (da cancellare)
+        keys = {entry.key() for entry in entries}
+        return [entry for key, entry in self.tables.get(dpid, {}).items() if key not in keys]
+
+    def update(self, dpid, entries):
+        table = self.tables.setdefault(dpid, {})
+        for entry in entries:
+            table[entry.key()] = entry
+
+    def remove(self, dpid, entries):
+        table = self.tables.get(dpid, {})
+        for entry in entries:
+            table.pop(entry.key(), None)
@@ -0,0 +1,204 @@
+# flow_reconciler.py
+# Riavvio a caldo del controller dinamico, lato switch: alla connessione si
+# leggono regole, gruppi e meter installati e si spediscono solo le
+# differenze con la policy, invece di riscrivere tutta la tabella. Il
+# traffico che passa sulle regole già giuste non si accorge del riavvio.
+# La policy deve essere quella della topologia completa: con la topologia
+# ripresa dall'istantanea (controller_state.py) lo è subito, e i link
+# ripresi che LLDP non conferma entro discovery_timeout si considerano
+# caduti; senza istantanea la riconciliazione aspetta che tutte le slice
+# abbiano un percorso (al più tardi discovery_timeout), altrimenti
+# toglierebbe le regole dei link e degli host non ancora riportati.
+# Il controller dà policy, topologia scoperta, tabelle volute, shadow table
+# e programmer.
+import slice_engine
+import slice_policy
+import elephant_flows
+
+
+class FlowReconciler(object):
+
+    def __init__(self, ctrl, enabled=True, timeout=5.0, discovery_timeout=10.0):
+        self.ctrl = ctrl
+        # False: alla connessione la tabella si rispedisce per intero
+        self.enabled = enabled
+        # Secondi per leggere lo stato di uno switch
+        self.timeout = timeout
+        self.discovery_timeout = discovery_timeout
+        # dpid -> richieste di lettura ancora aperte e parti ricevute
+        self._reading = {}
+        # dpid -> (datapath, stato letto) in attesa della topologia
+        self._deferred = {}
+        self._confirm_pending = False
+
+    def connect(self, dp):
+        # Switch appena collegato
+        ctrl = self.ctrl
+        if ctrl.discovery.unconfirmed and not self._confirm_pending:
+            self._confirm_pending = True
+            ctrl.call_later(self.discovery_timeout, self._expire_links)
+        if not self.enabled:
+            ctrl._install_datapath(dp)
+            return
+        # Lo switch può avere ancora le regole di prima (riavvio del
+        # controller): prima si legge cosa c'è installato, senza filtri
+        ofproto = dp.ofproto
+        parser = dp.ofproto_parser
+        reqs = [('flows', parser.OFPFlowStatsRequest(dp, 0, ofproto.OFPTT_ALL, ofproto.OFPP_ANY, ofproto.OFPG_ANY,
+                                                     0, 0, parser.OFPMatch())),
+                ('groups', parser.OFPGroupDescStatsRequest(dp, 0)),
+                ('meters', parser.OFPMeterConfigStatsRequest(dp, 0, ofproto.OFPM_ALL))]
+        state = {'kinds': {}, 'parts': {}, 'done': set()}
+        for kind, req in reqs:
+            dp.send_msg(req)
+            state['kinds'][req.xid] = kind
+            state['parts'][kind] = []
+        self._reading[dp.id] = state
+        ctrl.call_later(self.timeout, self._read_timeout, dp, state)
+
+    def _expire_links(self):
+        ctrl = self.ctrl
+        self._confirm_pending = False
+        if ctrl.discovery.expire():
+            ctrl.logger.warning("*** Link dell'istantanea non confermati da LLDP: percorsi ricalcolati")
+        ctrl._topology_changed()
+
+    def _read_timeout(self, dp, state):
+        if self._reading.get(dp.id) is not state:
+            return
+        del self._reading[dp.id]
+        self.ctrl.logger.warning(f"*** s{dp.id}: stato installato non letto entro {self.timeout:.1f} s, "
+                                 f"tabella riscritta da zero")
+        self.ctrl._install_datapath(dp)
+
+    # --- RISPOSTE ---
+    def reply(self, msg):
+        # Risposte alle letture di connect(): True se lo era
+        state = self._reading.get(msg.datapath.id)
+        if state is None or msg.xid not in state['kinds']:
+            return False
+        self._part(msg.datapath, state, msg.xid, msg.body, bool(msg.flags & msg.datapath.ofproto.OFPMPF_REPLY_MORE))
+        return True
+
+    def error(self, msg):
+        # Lettura non supportata (per esempio i meter): come se fosse vuota
+        dpid = msg.datapath.id
+        state = self._reading.get(dpid)
+        if state is None or msg.xid not in state['kinds']:
+            return False
+        self.ctrl.logger.warning(f"*** s{dpid}: errore {msg.type}/{msg.code} leggendo {state['kinds'][msg.xid]}")
+        self._part(msg.datapath, state, msg.xid, [], False)
+        return True
+
+    def _part(self, dp, state, xid, body, more):
+        kind = state['kinds'][xid]
+        state['parts'][kind].extend(body)
+        if more:
+            return
+        state['done'].add(kind)
+        if len(state['done']) < len(state['kinds']):
+            return
+        del self._reading[dp.id]
+        if self.topology_ready():
+            self.reconcile(dp, state['parts'])
+            return
+        # Si riconcilia alla ricompilazione che dà un percorso a tutte le
+        # slice (sync), al più tardi dopo discovery_timeout
+        self._deferred[dp.id] = (dp, state['parts'])
+        self.ctrl.call_later(self.discovery_timeout, self._deferred_timeout, dp)
+
+    def topology_ready(self):
+        ctrl = self.ctrl
+        return len(ctrl.policy.spec['slices']) == len(ctrl.spec['slices'])
+
+    def _deferred_timeout(self, dp):
+        deferred = self._deferred.get(dp.id)
+        if deferred is None or deferred[0] is not dp:
+            return
+        del self._deferred[dp.id]
+        self.reconcile(*deferred)
+
+    def sync(self, dp):
+        # Policy ricompilata: True se lo switch aspettava la topologia (niente
+        # da togliere finché non c'è, poi si confronta con lo stato letto)
+        if dp.id not in self._deferred:
+            return False
+        if self.topology_ready():
+            self.reconcile(*self._deferred.pop(dp.id))
+        return True
+
+    def forget(self, dpid):
+        self._reading.pop(dpid, None)
+        self._deferred.pop(dpid, None)
+
+    # --- CONFRONTO ---
+    def reconcile(self, dp, installed):
+        # Confronta lo stato letto dallo switch con quello voluto e spedisce
+        # solo le differenze. Ordine del lotto: meter e gruppi nuovi o
+        # cambiati, poi le regole, infine i gruppi e i meter in più (nessuna
+        # regola li usa più). Niente cancellazioni totali
+        ctrl = self.ctrl
+        dpid = dp.id
+        ofproto = dp.ofproto
+        parser = dp.ofproto_parser
+        sent_before = ctrl.programmer.sent_msgs
+
+        meters = {stat.meter_id: stat for stat in installed['meters']}
+        for meter in ctrl.policy.meter_table(dpid):
+            stat = meters.pop(meter.meter_id, None)
+            if stat is None:
+                ctrl.add_meter(dp, meter, ofproto.OFPMC_ADD)
+            elif _meter_differs(stat, slice_engine.meter_flags(ofproto), meter.ofp_bands(parser)):
+                ctrl.add_meter(dp, meter, ofproto.OFPMC_MODIFY)
+        elephants = ctrl.elephants
+        if elephants.enabled(dpid):
+            stat = meters.pop(ofproto.OFPM_CONTROLLER, None)
+            if stat is None:
+                elephants.add_meter(dp, ofproto.OFPMC_ADD)
+            elif _meter_differs(stat, elephant_flows.meter_flags(ofproto), elephants.meter_bands(parser)):
+                elephants.add_meter(dp, ofproto.OFPMC_MODIFY)
+        groups = {stat.group_id: slice_policy.GroupEntry.from_stats(stat) for stat in installed['groups']}
+        for group in ctrl._datapath_groups(dpid):
+            current = groups.pop(group.group_id, None)
+            if current is None:
+                ctrl.add_group(dp, group, ofproto.OFPGC_ADD)
+            elif current != group:
+                ctrl.add_group(dp, group, ofproto.OFPGC_MODIFY)
+
+        # Le regole con priorità oltre quelle della policy non sono nostre
+        # (per esempio l'LLDP di ryu.topology): restano dove sono
+        entries = [slice_policy.FlowEntry.from_stats(stat) for stat in installed['flows']
+                   if stat.priority < slice_policy.PRIO_POLICY_MAX]
+        # Versioni delle transizioni in due fasi: si continua da quella più alta
+        ctrl.updater.observe(max([0] + [entry.cookie & slice_policy.COOKIE_VERSION_MASK for entry in entries]))
+        table = ctrl._datapath_table(dpid)
+        shadow = ctrl.shadow
+        shadow.reset(dpid, entries)
+        stale = shadow.stale(dpid, table)
+        for entry in stale:
+            ctrl.delete_entry(dp, entry)
+        shadow.remove(dpid, stale)
+        added, modified = shadow.diff(dpid, table)
+        # Un cookie diverso (classe della regola) si corregge solo con un ADD
+        current = shadow.tables[dpid]
+        changed = {entry.key() for entry in modified}
+        added += [entry for entry in table if entry.key() in current and entry.key() not in changed
+                  and current[entry.key()].cookie & ~slice_policy.COOKIE_VERSION_MASK != entry.cookie]
+        for entry in added:
+            ctrl.add_entry(dp, entry)
+        for entry in modified:
+            ctrl.add_entry(dp, entry, command=ofproto.OFPFC_MODIFY_STRICT)
+        shadow.update(dpid, added + modified)
+
+        for group_id in groups:
+            ctrl.programmer.add(dp, parser.OFPGroupMod(dp, command=ofproto.OFPGC_DELETE, group_id=group_id))
+        for meter_id in meters:
+            ctrl.programmer.add(dp, parser.OFPMeterMod(dp, command=ofproto.OFPMC_DELETE, meter_id=meter_id))
+        ctrl.programmer.flush(dp)
+        ctrl.logger.info(f"*** s{dpid}: {len(entries)} regole già installate, "
+                         f"{ctrl.programmer.sent_msgs - sent_before} messaggi per allinearlo alla policy")
+
+
+def _meter_differs(stat, flags, bands):
+    return (stat.flags != flags
+            or [(band.rate, band.burst_size) for band in stat.bands] != [(band.rate, band.burst_size) for band in bands])
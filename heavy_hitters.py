@@ -0,0 +1,59 @@
+# heavy_hitters.py
+# Flussi più pesanti (heavy hitter) da un flusso di campioni, con memoria
+# fissa: algoritmo Space-Saving (Metwally et al.). Si tengono al massimo k
+# contatori; un flusso nuovo con la tabella piena prende il posto di quello
+# con il contatore minimo e ne eredita il valore come errore massimo.
+# Ogni flusso con più di total/k byte è sicuramente tra i k contatori, e
+# count - error è un limite inferiore dei suoi byte. decay() invecchia i
+# contatori, così la classifica segue il traffico recente.
+
+
+class SpaceSaving(object):
+
+    def __init__(self, k=32):
+        self.k = k
+        # chiave -> [byte stimati, errore massimo]
+        self.counters = {}
+        self.total = 0.0
+
+    def update(self, key, weight=1):
+        self.total += weight
+        counter = self.counters.get(key)
+        if counter is not None:
+            counter[0] += weight
+            return
+        if len(self.counters) < self.k:
+            self.counters[key] = [weight, 0.0]
+            return
+        # Tabella piena: k è piccolo, la ricerca del minimo costa poco
+        victim = min(self.counters, key=lambda item: self.counters[item][0])
+        floor = self.counters.pop(victim)[0]
+        self.counters[key] = [floor + weight, floor]
+
+    def top(self, n=None):
+        # [(chiave, byte stimati, errore)] dal più pesante
+        items = sorted(((key, count, error) for key, (count, error) in self.counters.items()),
+                       key=lambda item: -item[1])
+        return items if n is None else items[:n]
+
+    def share(self, key):
+        # Quota minima garantita dei byte visti (count - error) / total
+        counter = self.counters.get(key)
+        if counter is None or self.total <= 0:
+            return 0.0
+        return (counter[0] - counter[1]) / self.total
+
+    def decay(self, factor):
+        # Contatori moltiplicati per factor; quelli ormai trascurabili escono
+        self.total *= factor
+        for key in list(self.counters):
+            counter = self.counters[key]
+            counter[0] *= factor
+            counter[1] *= factor
+            if counter[0] < 1.0:
+                del self.counters[key]
+
+    def forget(self, key):
+        counter = self.counters.pop(key, None)
+        if counter is not None:
+            self.total = max(0.0, self.total - counter[0])
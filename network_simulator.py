@@ -0,0 +1,876 @@
+# network_simulator.py
+# Simulatore a eventi discreti per il controller dinamico, senza Mininet.
+# La rete arriva da una descrizione di topology_gen.py (SliceTopo, catene
+# di diamanti, leaf-spine, fat-tree): link con banda e coda, host e slice.
+# Il traffico è "fluido": ogni flusso (video UDP 9999 o standard TCP) ha un
+# rate costante tra un evento e l'altro e i contatori sono integrali dei
+# rate, quindi il costo dipende dagli eventi e non dalla durata simulata.
+#   - video: rate fisso, l'eccesso su un collo di bottiglia riempie la coda
+#     del link e poi viene perso; un meter scarta subito l'eccesso
+#   - standard: elastico (TCP), si divide con equità max-min quello che il
+#     video lascia libero, fino alla sua domanda
+# Gli switch inoltrano con le regole che il controller ha davvero spedito
+# (copia della shadow table all'arrivo del lotto, dopo la latenza del canale
+# di controllo), gruppi FAST_FAILOVER e SELECT compresi. Le richieste di
+# statistiche ricevono risposte OpenFlow costruite dai contatori simulati e
+# il controller vero le elabora sul tempo simulato. Le regole con uscita
+# OFPP_CONTROLLER (flussi pesanti) mandano al controller pacchetti veri,
+# scelti in proporzione ai byte dei flussi e limitati al sample_rate del
+# controller; le regole con idle_timeout scadono senza traffico, quelle con
+# hard_timeout dopo quel tempo, e arriva l'OFPFlowRemoved. Con table_capacity
+# ogni tabella tiene al più quel numero di regole: le regole nuove che non ci
+# stanno sono rifiutate (come OFPFMFC_TABLE_FULL) e le risposte a
+# OFPTableStatsRequest e alle table features riportano occupazione e
+# capacità.
+#
+# Uso: python network_simulator.py [secondi] [--topology FILE.json | --kind diamond --sizes 1,10,100,1000]
+#                                  [--hosts 8] [--steering global|pair|select]
+import argparse
+import heapq
+import os
+import random
+import tempfile
+import time
+
+from ryu.controller import ofp_event
+from ryu.lib import hub
+from ryu.lib.packet import ethernet, ipv4, packet, tcp, udp
+from ryu.ofproto import ofproto_v1_3
+
+from benchmark_policy import FakeDatapath
+import slice_policy
+import topology_discovery
+from topology_gen import generate_topology
+
+# Banda dei link senza 'bw' nella descrizione (host), Mbps
+HOST_LINK_MBPS = 1000.0
+# Coda di ogni link (byte): 1000 pacchetti da 1500 byte come TCLink
+QUEUE_BYTES = 1000 * 1500
+MAX_HOPS = 4096
+# Byte/s trascurabili (errori di arrotondamento nel riempimento progressivo)
+EPSILON = 1e-6
+# Dimensione dei pacchetti copiati al controller (byte)
+PACKET_BYTES = 1500
+
+
+class Flow(object):
+
+    def __init__(self, fid, src, dst, kind, rate, dst_port=None):
+        self.fid = fid
+        self.src = src
+        self.dst = dst
+        # 'video' (UDP 9999) oppure 'tcp'
+        self.kind = kind
+        # Byte/s: rate spedito (video) o domanda massima (tcp)
+        self.rate = rate
+        # Porte UDP/TCP: una sorgente diversa per flusso; la destinazione è
+        # quella della classe di traffico (di default video o standard)
+        self.src_port = 10000 + fid
+        if dst_port is None:
+            dst_port = 9999 if kind == 'video' else 5001
+        self.dst_port = dst_port
+        # Pacchetto copiato al controller, costruito alla prima copia
+        self.packet = None
+        self.active = False
+        # Percorso: [(dpid, regola, risorse attraversate prima)], risorse
+        # (link, meter) in ordine, switch visitati e host raggiunto
+        self.rules = []
+        self.resources = []
+        self.switches = set()
+        self.delivered_to = None
+        # Contatori toccati: [(chiave, indice della risorsa, 'in'/'out'/'drop')]
+        self.counters = []
+        # Risorse sature sul percorso: [(indice, risorsa)]
+        self.tight = []
+        # Rate lungo il percorso: ((indice della risorsa, rate da lì), ...)
+        # e contributi ai contatori che ne derivano
+        self.profile = None
+        self.contrib = []
+        # Rate consegnato (byte/s) e byte consegnati fino a since
+        self.carried = 0.0
+        self.delivered = 0.0
+        self.since = 0.0
+
+
+class SimSwitch(object):
+
+    def __init__(self, dpid, ports, capacity=None):
+        self.dpid = dpid
+        # porta -> nome del vicino ('s5' o 'h3')
+        self.ports = ports
+        # Regole per tabella (None: senza limite) e chiavi rifiutate finché
+        # il controller le tiene nella sua tabella
+        self.capacity = capacity
+        self.refused = set()
+        self.rejected = 0
+        self.tables = {}
+        self.groups = {}
+        # chiave della regola -> istante di installazione
+        self.installed = {}
+        # chiave -> regola, e istante dell'ultimo pacchetto delle regole con idle_timeout
+        self.entries = {}
+        self.last_hit = {}
+
+    def install(self, entries, groups, now):
+        if self.capacity is not None:
+            # Prima le regole già installate, poi le nuove nell'ordine in cui
+            # il controller le ha spedite
+            self.refused &= {entry.key() for entry in entries}
+            kept, count = [], {}
+            for entry in sorted(entries, key=lambda e: e.key() not in self.installed):
+                if entry.key() in self.refused:
+                    continue
+                if count.get(entry.table_id, 0) >= self.capacity:
+                    self.refused.add(entry.key())
+                    self.rejected += 1
+                    continue
+                count[entry.table_id] = count.get(entry.table_id, 0) + 1
+                kept.append(entry)
+            entries = kept
+        tables = {}
+        for entry in sorted(entries, key=lambda e: -e.priority):
+            tables.setdefault(entry.table_id, []).append(entry)
+        self.installed = {entry.key(): self.installed.get(entry.key(), now) for entry in entries}
+        self.entries = {entry.key(): entry for entry in entries}
+        self.last_hit = {key: self.last_hit.get(key, now) for key, entry in self.entries.items()
+                         if entry.idle_timeout or entry.hard_timeout}
+        self.tables = tables
+        self.groups = {group.group_id: group for group in groups}
+
+    def remove(self, entry):
+        key = entry.key()
+        self.tables[entry.table_id] = [e for e in self.tables.get(entry.table_id, []) if e.key() != key]
+        for table in (self.installed, self.entries, self.last_hit):
+            table.pop(key, None)
+
+    def lookup(self, fields):
+        # Regole attraversate nella pipeline (tabella 0, poi i goto)
+        entries = []
+        table_id = 0
+        while True:
+            entry = next((e for e in self.tables.get(table_id, [])
+                          if all(fields.get(k) == v for k, v in e.match)), None)
+            if entry is None:
+                return entries
+            entries.append(entry)
+            if entry.goto is None:
+                return entries
+            if entry.write_metadata is not None:
+                fields = dict(fields, metadata=entry.write_metadata)
+            table_id = entry.goto
+
+    def output(self, entry, in_port, fid):
+        # Porta d'uscita della regola: la prima porta, oppure il gruppo
+        # (FAST_FAILOVER: il primo bucket; SELECT: un bucket per hash del flusso)
+        # (la copia al controller non è un'uscita del flusso)
+        ports = [in_port if port == ofproto_v1_3.OFPP_IN_PORT else port for port in entry.out_ports
+                 if port != ofproto_v1_3.OFPP_CONTROLLER]
+        if ports:
+            return ports[0]
+        group = self.groups.get(entry.group)
+        while group is not None:
+            buckets = [bucket for bucket in group.buckets if bucket.weight or group.group_type != 'select']
+            if not buckets:
+                return None
+            if group.group_type == 'select':
+                total = sum(bucket.weight for bucket in buckets)
+                point = hash((self.dpid, fid)) % total
+                for bucket in buckets:
+                    point -= bucket.weight
+                    if point < 0:
+                        break
+            else:
+                bucket = buckets[0]
+            if bucket.group is None:
+                return in_port if bucket.port == ofproto_v1_3.OFPP_IN_PORT else bucket.port
+            group = self.groups.get(bucket.group)
+        return None
+
+
+class SimDatapath(FakeDatapath):
+    # Datapath del simulatore: i messaggi del controller diventano eventi
+
+    def __init__(self, sim, dpid):
+        super(SimDatapath, self).__init__(dpid)
+        self.sim = sim
+
+    def send(self, buf):
+        # Un lotto del FlowProgrammer (FlowMod, meter, gruppi + barrier)
+        self.writes += 1
+        self.sent_bytes += len(buf)
+        self.sim.flushed(self)
+        return True
+
+    def send_msg(self, msg):
+        if msg.xid is None:
+            self.set_xid(msg)
+        self.sent += 1
+        self.sim.request(self, msg)
+        return True
+
+
+class NetworkSimulator(object):
+
+    def __init__(self, ctrl, desc, control_latency=0.002, queue_bytes=QUEUE_BYTES, seed=1, table_capacity=None):
+        self.ctrl = ctrl
+        self.desc = desc
+        self.control_latency = control_latency
+        self.queue_bytes = queue_bytes
+        # Copie al controller e scadenze delle regole: ogni sample_period
+        self.sample_period = 0.5
+        self.packet_ins = 0
+        self.flows_removed = 0
+        self._rnd = random.Random(seed)
+        self.now = 0.0
+        self._events = []
+        self._seq = 0
+
+        H, PORT_MAP = topology_discovery.description_tables(desc)
+        self.H = H
+        self.PORT_MAP = PORT_MAP
+        self.switches = {dpid: SimSwitch(dpid, {port: name for name, port in ports.items()}, table_capacity)
+                         for dpid, ports in PORT_MAP.items()}
+        self.host_at = {name: (host['switch'], host['port']) for name, host in desc['hosts'].items()}
+        self.ip = {name: host['ip'] for name, host in desc['hosts'].items()}
+        # (dpid, porta) -> banda in uscita (byte/s); contatore rx dall'altra parte
+        self.capacity = {}
+        self._rx = {}
+        for a, port_a, b, port_b, bw in desc['links']:
+            mbps = HOST_LINK_MBPS if bw is None else bw
+            self.capacity[(a, port_a)] = self.capacity[(b, port_b)] = mbps * 1e6 / 8
+            self._rx[(a, port_a)] = ('rx', b, port_b)
+            self._rx[(b, port_b)] = ('rx', a, port_a)
+        for dpid, port in self.host_at.values():
+            self.capacity[(dpid, port)] = HOST_LINK_MBPS * 1e6 / 8
+
+        self.flows = []
+        # Contatori di regole, porte e meter: (valore, rate, istante del valore)
+        self._counters = {}
+        # Flussi attivi e instradati per risorsa, con la loro domanda totale;
+        # flussi attivi per switch, da reinstradare quando cambia la tabella
+        self._active = set()
+        self._users = {}
+        self._demand = {}
+        self._on_switch = {}
+        self._stale = set()
+        self._capacities = {}
+        # Coda per link: (byte all'ultimo evento, variazione in byte/s)
+        self._queues = {}
+        self.max_queue_delay = 0.0
+        self._dirty = False
+
+        # Carico sul canale di controllo e decisioni del controller
+        self.to_switch = 0
+        self.to_controller = 0
+        self.actions = []
+        self.onsets = []
+        self._video_over = {}
+        self._episode = {}
+
+        self.datapaths = {dpid: SimDatapath(self, dpid) for dpid in self.switches}
+        ctrl.clock = lambda: self.now
+        ctrl.call_later = lambda delay, fn, *args: self.schedule(self.now + delay, fn, *args)
+        for name in ('apply_slice_policy', 'apply_placement', 'apply_select_weights'):
+            self._record(name)
+
+    # --- EVENTI ---
+    def schedule(self, at, fn, *args):
+        self._seq += 1
+        heapq.heappush(self._events, (at, self._seq, fn, args))
+
+    def run(self, until):
+        while self._events and self._events[0][0] <= until:
+            at, _, fn, args = heapq.heappop(self._events)
+            self._advance(at)
+            fn(*args)
+            # Un solo ricalcolo per tutti gli eventi dello stesso istante
+            if self._dirty and not (self._events and self._events[0][0] <= at):
+                self._reallocate()
+        self._advance(until)
+        for flow in self.flows:
+            flow.delivered += flow.carried * (self.now - flow.since)
+            flow.since = self.now
+
+    def start(self):
+        # Connessione degli switch, poi i round di polling del controller
+        for dpid, dp in self.datapaths.items():
+            msg = dp.ofproto_parser.OFPSwitchFeatures(dp, datapath_id=dpid, n_buffers=0, n_tables=254,
+                                                      auxiliary_id=0, capabilities=0)
+            self.ctrl.switch_features_handler(ofp_event.EventOFPSwitchFeatures(msg))
+        self.schedule(self.now, self._monitor_round)
+        self.schedule(self.now + self.sample_period, self._sample_round)
+
+    def add_flow(self, src, dst, kind, mbps, start, stop, dst_port=None):
+        flow = Flow(len(self.flows), src, dst, kind, mbps * 1e6 / 8, dst_port)
+        flow.start, flow.stop = start, stop
+        self.flows.append(flow)
+        self.schedule(start, self._set_active, flow, True)
+        self.schedule(stop, self._set_active, flow, False)
+        return flow
+
+    def _set_active(self, flow, active):
+        flow.active = active
+        if active:
+            self._active.add(flow)
+            self._stale.add(flow)
+        else:
+            self._active.discard(flow)
+            self._stale.discard(flow)
+            self._detach(flow)
+        self._dirty = True
+
+    def _record(self, name):
+        # Istante di ogni decisione del controller (tempo di reazione)
+        method = getattr(self.ctrl, name)
+
+        def wrapper(*args, **kwargs):
+            self.actions.append((self.now, name))
+            return method(*args, **kwargs)
+        setattr(self.ctrl, name, wrapper)
+
+    # --- CANALE DI CONTROLLO ---
+    def flushed(self, dp):
+        # Lo switch applica il lotto dopo la latenza, poi risponde alla barrier
+        entries = list(self.ctrl.shadow.tables.get(dp.id, {}).values())
+        groups = list(self.ctrl.policy.group_table(dp.id))
+        if self.ctrl.steering == 'select' and dp.id in self.ctrl.policy.compile_select() and self.ctrl.pairs.select_weights:
+            groups.append(self.ctrl.policy.select_group(dp.id, self.ctrl.pairs.select_weights))
+        # I FlowMod del lotto li conta già il FlowProgrammer: qui la barrier
+        self.to_switch += 1
+        barrier = dp.ofproto_parser.OFPBarrierReply(dp)
+        barrier.xid = dp.xid
+        if dp.id in self.ctrl.programmer.staged:
+            # Bundle solo preparato: la tabella cambia al commit
+            self.schedule(self.now + self.control_latency, self._confirm, barrier)
+            return
+        self.schedule(self.now + self.control_latency, self._install, dp, entries, groups, barrier)
+
+    def _install(self, dp, entries, groups, barrier):
+        self.switches[dp.id].install(entries, groups, self.now)
+        self._stale.update(self._on_switch.get(dp.id, ()))
+        self._dirty = True
+        self.to_controller += 1
+        self.ctrl._barrier_reply_handler(ofp_event.EventOFPBarrierReply(barrier))
+
+    def _confirm(self, barrier):
+        self.to_controller += 1
+        self.ctrl._barrier_reply_handler(ofp_event.EventOFPBarrierReply(barrier))
+
+    def request(self, dp, msg):
+        # Richieste di statistiche: risposta dopo un viaggio di andata e ritorno
+        self.to_switch += 1
+        self.schedule(self.now + 2 * self.control_latency, self._reply, dp, msg)
+
+    def _reply(self, dp, req):
+        parser = dp.ofproto_parser
+        kind = type(req).__name__
+        self.to_controller += 1
+        if kind == 'OFPFlowStatsRequest':
+            msg = parser.OFPFlowStatsReply(dp)
+            msg.body = [self._flow_stats(dp, entry) for entry in self._entries(dp.id, req)]
+            handler, event = self.ctrl._flow_stats_reply_handler, ofp_event.EventOFPFlowStatsReply
+        elif kind == 'OFPAggregateStatsRequest':
+            entries = self._entries(dp.id, req)
+            msg = parser.OFPAggregateStatsReply(dp)
+            msg.body = parser.OFPAggregateStats(packet_count=0, flow_count=len(entries),
+                                                byte_count=sum(int(self._count(('rule', dp.id, e.key())))
+                                                               for e in entries))
+            handler, event = self.ctrl._aggregate_stats_reply_handler, ofp_event.EventOFPAggregateStatsReply
+        elif kind == 'OFPPortStatsRequest':
+            msg = parser.OFPPortStatsReply(dp)
+            sec, nsec = int(self.now), int((self.now % 1) * 1e9)
+            msg.body = [parser.OFPPortStats(
+                port_no=port, rx_packets=0, tx_packets=0, rx_bytes=int(self._count(('rx', dp.id, port))),
+                tx_bytes=int(self._count(('tx', dp.id, port))), rx_dropped=0, tx_dropped=0, rx_errors=0,
+                tx_errors=0, rx_frame_err=0, rx_over_err=0, rx_crc_err=0, collisions=0,
+                duration_sec=sec, duration_nsec=nsec) for port in sorted(self.switches[dp.id].ports)]
+            handler, event = self.ctrl._port_stats_reply_handler, ofp_event.EventOFPPortStatsReply
+        elif kind == 'OFPMeterStatsRequest':
+            msg = parser.OFPMeterStatsReply(dp)
+            sec, nsec = int(self.now), int((self.now % 1) * 1e9)
+            msg.body = [parser.OFPMeterStats(
+                meter_id=meter.meter_id, flow_count=0, packet_in_count=0,
+                byte_in_count=int(self._count(('meter_in', dp.id, meter.meter_id))),
+                duration_sec=sec, duration_nsec=nsec,
+                band_stats=[parser.OFPMeterBandStats(
+                    packet_band_count=0, byte_band_count=int(self._count(('meter_drop', dp.id, meter.meter_id))))])
+                for meter in self.ctrl.policy.meter_table(dp.id)]
+            handler, event = self.ctrl._meter_stats_reply_handler, ofp_event.EventOFPMeterStatsReply
+        elif kind == 'OFPTableStatsRequest':
+            msg = parser.OFPTableStatsReply(dp)
+            msg.body = [parser.OFPTableStats(table_id=table_id, active_count=len(entries), lookup_count=0,
+                                             matched_count=0)
+                        for table_id, entries in sorted(self.switches[dp.id].tables.items())]
+            handler, event = self.ctrl._table_stats_reply_handler, ofp_event.EventOFPTableStatsReply
+        elif kind == 'OFPTableFeaturesStatsRequest':
+            capacity = self.switches[dp.id].capacity
+            if capacity is None:
+                return
+            msg = parser.OFPTableFeaturesStatsReply(dp)
+            msg.body = [parser.OFPTableFeaturesStats(table_id=table_id, name=f'table{table_id}', metadata_match=0,
+                                                     metadata_write=0, config=0, max_entries=capacity,
+                                                     properties=[])
+                        for table_id in (0, 1)]
+            handler, event = self.ctrl._table_features_reply_handler, ofp_event.EventOFPTableFeaturesStatsReply
+        else:
+            return
+        msg.xid = req.xid
+        msg.flags = 0
+        handler(event(msg))
+
+    def _entries(self, dpid, req):
+        mask = req.cookie_mask
+        return [entry for entries in self.switches[dpid].tables.values() for entry in entries
+                if entry.cookie & mask == req.cookie & mask]
+
+    def _flow_stats(self, dp, entry):
+        duration = self.now - self.switches[dp.id].installed.get(entry.key(), self.now)
+        return dp.ofproto_parser.OFPFlowStats(
+            table_id=entry.table_id, duration_sec=int(duration), duration_nsec=int((duration % 1) * 1e9),
+            priority=entry.priority, idle_timeout=entry.idle_timeout, hard_timeout=entry.hard_timeout, flags=0,
+            cookie=entry.cookie,
+            packet_count=0, byte_count=int(self._count(('rule', dp.id, entry.key()))),
+            match=entry.ofp_match(dp.ofproto_parser), instructions=[])
+
+    def _monitor_round(self):
+        # Come DynamicSliceController._monitor, sul tempo simulato
+        ctrl = self.ctrl
+        ctrl.collector.start_round()
+        for dp in list(ctrl.datapaths.values()):
+            if dp.id in ctrl.current_speeds:
+                ctrl._request_video_stats(dp)
+                ctrl._request_meter_stats(dp)
+            ctrl._request_port_stats(dp)
+            ctrl._request_table_stats(dp)
+        self.schedule(self.now + min(ctrl.stats_deadline, ctrl.poll_interval), ctrl._close_stats_round)
+        self.schedule(self.now + ctrl.poll_interval, self._monitor_round)
+
+    def _sample_round(self):
+        # Pacchetti copiati al controller dalle regole con uscita
+        # OFPP_CONTROLLER dello switch d'ingresso: per switch al più
+        # sample_rate al secondo, scelti in proporzione ai byte dei flussi
+        ctrl = self.ctrl
+        candidates = {}
+        for flow in sorted(self._active, key=lambda flow: flow.fid):
+            if flow.carried <= EPSILON or not flow.rules:
+                continue
+            ingress = flow.rules[0][0]
+            switch = self.switches[ingress]
+            entry = next((entry for entry in (switch.entries.get(key) for dpid, key, _ in flow.rules if dpid == ingress)
+                          if entry is not None and ofproto_v1_3.OFPP_CONTROLLER in entry.out_ports), None)
+            if entry is not None:
+                candidates.setdefault(ingress, []).append((flow, entry))
+        for dpid, items in sorted(candidates.items()):
+            dp = self.datapaths[dpid]
+            parser = dp.ofproto_parser
+            weights = [flow.carried for flow, _ in items]
+            packets = min(ctrl.elephants.sample_rate, sum(weights) / PACKET_BYTES) * self.sample_period
+            count = int(packets) + (self._rnd.random() < packets % 1)
+            for flow, entry in self._rnd.choices(items, weights, k=count):
+                msg = parser.OFPPacketIn(dp, buffer_id=ofproto_v1_3.OFP_NO_BUFFER, total_len=PACKET_BYTES,
+                                         reason=ofproto_v1_3.OFPR_ACTION, table_id=entry.table_id,
+                                         cookie=entry.cookie, match=parser.OFPMatch(in_port=self.host_at[flow.src][1]),
+                                         data=self._packet(flow))
+                self.packet_ins += 1
+                self.to_controller += 1
+                ctrl._packet_in_handler(ofp_event.EventOFPPacketIn(msg))
+
+        # Regole con idle_timeout senza flussi da abbastanza tempo o oltre il
+        # loro hard_timeout: lo switch le toglie e avvisa il controller
+        # (OFPFF_SEND_FLOW_REM)
+        used = {(dpid, key) for flow in self._active if flow.carried > EPSILON for dpid, key, _ in flow.rules}
+        for dpid, switch in self.switches.items():
+            for key, last in list(switch.last_hit.items()):
+                entry = switch.entries[key]
+                if entry.hard_timeout and self.now - switch.installed[key] >= entry.hard_timeout:
+                    self._expire(dpid, entry, ofproto_v1_3.OFPRR_HARD_TIMEOUT)
+                elif (dpid, key) in used:
+                    switch.last_hit[key] = self.now
+                elif entry.idle_timeout and self.now - last >= entry.idle_timeout:
+                    self._expire(dpid, entry, ofproto_v1_3.OFPRR_IDLE_TIMEOUT)
+        self.schedule(self.now + self.sample_period, self._sample_round)
+
+    def _expire(self, dpid, entry, reason):
+        dp = self.datapaths[dpid]
+        parser = dp.ofproto_parser
+        switch = self.switches[dpid]
+        duration = self.now - switch.installed.get(entry.key(), self.now)
+        msg = parser.OFPFlowRemoved(dp, cookie=entry.cookie, priority=entry.priority,
+                                    reason=reason, table_id=entry.table_id,
+                                    duration_sec=int(duration), duration_nsec=int((duration % 1) * 1e9),
+                                    idle_timeout=entry.idle_timeout, hard_timeout=entry.hard_timeout, packet_count=0,
+                                    byte_count=int(self._count(('rule', dpid, entry.key()))),
+                                    match=entry.ofp_match(parser))
+        switch.remove(entry)
+        self._stale.update(self._on_switch.get(dpid, ()))
+        self._dirty = True
+        self.flows_removed += 1
+        self.to_controller += 1
+        self.ctrl._flow_removed_handler(ofp_event.EventOFPFlowRemoved(msg))
+
+    def _packet(self, flow):
+        if flow.packet is None:
+            pkt = packet.Packet()
+            pkt.add_protocol(ethernet.ethernet(self.H[flow.dst], self.H[flow.src], slice_policy.ETH_TYPE_IP))
+            if flow.kind == 'video':
+                pkt.add_protocol(ipv4.ipv4(src=self.ip[flow.src], dst=self.ip[flow.dst], proto=17))
+                pkt.add_protocol(udp.udp(src_port=flow.src_port, dst_port=flow.dst_port))
+            else:
+                pkt.add_protocol(ipv4.ipv4(src=self.ip[flow.src], dst=self.ip[flow.dst], proto=6))
+                pkt.add_protocol(tcp.tcp(src_port=flow.src_port, dst_port=flow.dst_port))
+            pkt.serialize()
+            flow.packet = bytes(pkt.data)
+        return flow.packet
+
+    # --- TRAFFICO ---
+    def _count(self, key):
+        value, rate, since = self._counters.get(key, (0.0, 0.0, 0.0))
+        return value + rate * (self.now - since)
+
+    def _add_rate(self, key, delta):
+        value, rate, since = self._counters.get(key, (0.0, 0.0, self.now))
+        rate += delta
+        self._counters[key] = (value + (rate - delta) * (self.now - since), rate if abs(rate) > EPSILON else 0.0,
+                               self.now)
+
+    def _advance(self, at):
+        # Tra due eventi i rate non cambiano: si muovono solo le code
+        dt = at - self.now
+        if dt > 0:
+            for link, (backlog, growth) in self._queues.items():
+                backlog = min(self.queue_bytes, max(0.0, backlog + growth * dt))
+                self._queues[link] = (backlog, growth)
+                self.max_queue_delay = max(self.max_queue_delay, backlog / self.capacity[link])
+        self.now = at
+
+    def _route(self, flow):
+        # Percorso del flusso seguendo le regole installate negli switch
+        dpid, in_port = self.host_at[flow.src]
+        fields = {'eth_type': slice_policy.ETH_TYPE_IP, 'eth_src': self.H[flow.src], 'eth_dst': self.H[flow.dst],
+                  'ipv4_src': self.ip[flow.src], 'ipv4_dst': self.ip[flow.dst]}
+        if flow.kind == 'video':
+            fields.update(slice_policy.VIDEO_MATCH, udp_src=flow.src_port, udp_dst=flow.dst_port)
+        else:
+            fields.update(ip_proto=6, tcp_src=flow.src_port, tcp_dst=flow.dst_port)
+        flow.rules, flow.resources, flow.switches, flow.delivered_to, flow.counters = [], [], set(), None, []
+        for _ in range(MAX_HOPS):
+            switch = self.switches[dpid]
+            flow.switches.add(dpid)
+            entries = switch.lookup(dict(fields, in_port=in_port))
+            if not entries:
+                return
+            for entry in entries:
+                flow.rules.append((dpid, entry.key(), len(flow.resources)))
+                if entry.meter is not None:
+                    flow.resources.append(('meter', dpid, entry.meter))
+            out_port = switch.output(entries[-1], in_port, flow.fid)
+            if out_port not in switch.ports:
+                return
+            flow.resources.append(('link', dpid, out_port))
+            neighbor = switch.ports[out_port]
+            if not neighbor.startswith('s'):
+                flow.delivered_to = neighbor
+                break
+            nxt = int(neighbor[1:])
+            dpid, in_port = nxt, self.PORT_MAP[nxt][f"s{dpid}"]
+        # Regole: quello che entra nello switch; porte e meter: quello che
+        # esce dalla risorsa (la differenza in un meter è scartata)
+        counters = [(('rule', dpid, key), i, 'in') for dpid, key, i in flow.rules]
+        for i, (kind, dpid, key) in enumerate(flow.resources):
+            if kind == 'meter':
+                counters += [(('meter_in', dpid, key), i, 'in'), (('meter_drop', dpid, key), i, 'drop')]
+                continue
+            counters.append((('tx', dpid, key), i, 'out'))
+            rx = self._rx.get((dpid, key))
+            if rx is not None:
+                counters.append((rx, i, 'out'))
+        flow.counters = counters
+
+    def _attach(self, flow):
+        for dpid in flow.switches:
+            self._on_switch.setdefault(dpid, set()).add(flow)
+        if flow.delivered_to != flow.dst:
+            return
+        for resource in flow.resources:
+            self._users.setdefault(resource, set()).add(flow)
+            self._demand[resource] = self._demand.get(resource, 0.0) + flow.rate
+
+    def _detach(self, flow):
+        for dpid in flow.switches:
+            self._on_switch[dpid].discard(flow)
+        if flow.delivered_to == flow.dst:
+            for resource in flow.resources:
+                self._users[resource].discard(flow)
+                self._demand[resource] -= flow.rate
+        flow.switches, flow.delivered_to = set(), None
+        self._set_profile(flow, None)
+
+    def _capacity(self, resource):
+        capacity = self._capacities.get(resource)
+        if capacity is None:
+            kind, dpid, key = resource
+            if kind == 'link':
+                capacity = self.capacity[(dpid, key)]
+            else:
+                capacity = self.ctrl.policy.meter_entry(dpid, key).rate / 8
+            self._capacities[resource] = capacity
+        return capacity
+
+    def _set_profile(self, flow, profile):
+        # Nuovi rate del flusso: si aggiornano solo i contatori che tocca
+        if profile == flow.profile:
+            return
+        flow.delivered += flow.carried * (self.now - flow.since)
+        flow.since = self.now
+        for key, rate in flow.contrib:
+            self._add_rate(key, -rate)
+        flow.profile = profile
+        flow.contrib = []
+        flow.carried = 0.0
+        if profile is None:
+            return
+        if len(profile) == 1:
+            # Nessuna perdita lungo il percorso: lo stesso rate ovunque
+            rate = profile[0][1]
+            contrib = [(key, 0.0 if mode == 'drop' else rate) for key, _, mode in flow.counters]
+            flow.carried = rate
+        else:
+            sent = []
+            for (start, rate), (end, _) in zip(profile, profile[1:] + ((len(flow.resources) + 1, None),)):
+                sent += [rate] * (end - start)
+            contrib = [(key, sent[i] if mode == 'in' else sent[i + 1] if mode == 'out' else sent[i] - sent[i + 1])
+                       for key, i, mode in flow.counters]
+            flow.carried = sent[-1]
+        for key, rate in contrib:
+            self._add_rate(key, rate)
+        flow.contrib = contrib
+
+    def _reallocate(self):
+        # Nuovi rate dopo un evento: video per primo, poi max-min per il TCP.
+        # Contano solo le risorse sature (domanda oltre la capacità): sulle
+        # altre ogni flusso passa con il suo rate
+        self._dirty = False
+        for flow in self._stale:
+            self._detach(flow)
+            self._route(flow)
+            self._attach(flow)
+        self._stale = set()
+        routed = [flow for flow in self._active if flow.delivered_to == flow.dst]
+
+        # Risorse sature con gli stessi flussi (una catena di link): basta
+        # quella di capacità minima, le altre non tolgono altro
+        narrowest = {}
+        for r, demand in self._demand.items():
+            capacity = self._capacity(r)
+            if demand > capacity + EPSILON:
+                users = frozenset(self._users[r])
+                if users not in narrowest or capacity < narrowest[users][1]:
+                    narrowest[users] = (r, capacity)
+        capacity = dict(narrowest.values())
+        tight = set(capacity)
+        for flow in routed:
+            flow.tight = []
+        for users in narrowest:
+            for flow in users:
+                flow.tight = None
+        for flow in routed:
+            if flow.tight is None:
+                flow.tight = [(i, r) for i, r in enumerate(flow.resources) if r in tight]
+
+        # Video: l'eccesso su una risorsa satura si perde (dopo aver riempito
+        # la coda del link); qualche passata perché la perdita a monte
+        # riduce quello che arriva a valle
+        video = [flow for flow in routed if flow.kind == 'video' and flow.tight]
+        factor = dict.fromkeys(tight, 1.0)
+        offered = {}
+        for _ in range(4):
+            offered = dict.fromkeys(tight, 0.0)
+            for flow in video:
+                rate = flow.rate
+                for _, resource in flow.tight:
+                    offered[resource] += rate
+                    rate *= factor[resource]
+            factor = {r: min(1.0, capacity[r] / offered[r]) if offered[r] > 0 else 1.0 for r in tight}
+        remaining = dict(capacity)
+        profiles = {}
+        for flow in video:
+            rate = flow.rate
+            profile = [(0, rate)]
+            for i, resource in flow.tight:
+                if factor[resource] < 1.0:
+                    rate *= factor[resource]
+                    profile.append((i + 1, rate))
+                remaining[resource] -= rate
+            profiles[flow] = tuple(profile)
+
+        # Standard: riempimento progressivo fino al collo di bottiglia
+        tcp = [flow for flow in routed if flow.kind == 'tcp' and flow.tight]
+        rate = dict.fromkeys(tcp, 0.0)
+        unfrozen = set(tcp)
+        while unfrozen:
+            users = {}
+            for flow in unfrozen:
+                for _, resource in flow.tight:
+                    users[resource] = users.get(resource, 0) + 1
+            step = min([max(0.0, remaining[r]) / n for r, n in users.items()]
+                       + [flow.rate - rate[flow] for flow in unfrozen])
+            for flow in unfrozen:
+                rate[flow] += step
+                for _, resource in flow.tight:
+                    remaining[resource] -= step
+            unfrozen = {flow for flow in unfrozen
+                        if rate[flow] < flow.rate - EPSILON and all(remaining[r] > EPSILON for _, r in flow.tight)}
+        for flow in tcp:
+            profiles[flow] = ((0, rate[flow]),)
+
+        for flow in routed:
+            self._set_profile(flow, profiles.get(flow, ((0, flow.rate),)))
+
+        # Code: crescono con l'eccesso di video, altrimenti si svuotano
+        queues = {}
+        for (kind, dpid, key), load in offered.items():
+            if kind == 'link' and load > capacity[(kind, dpid, key)]:
+                queues[(dpid, key)] = (self._queues.get((dpid, key), (0.0, 0.0))[0],
+                                       load - capacity[(kind, dpid, key)])
+        for link, (backlog, _) in self._queues.items():
+            if link not in queues and backlog > 0:
+                queues[link] = (backlog, -self.capacity[link])
+        self._queues = queues
+
+        # Episodi video: il rate video entrante su uno switch di bordo sopra
+        # la soglia del controller, [inizio, fine]
+        speeds = {}
+        for flow in self._active:
+            if flow.kind == 'video':
+                dpid = self.host_at[flow.src][0]
+                speeds[dpid] = speeds.get(dpid, 0.0) + flow.rate
+        for dpid in set(speeds) | set(self._video_over):
+            over = speeds.get(dpid, 0.0) > self.ctrl.bandwidth_threshold
+            if over and not self._video_over.get(dpid):
+                self._episode[dpid] = len(self.onsets)
+                self.onsets.append([self.now, float('inf')])
+            elif not over and self._video_over.get(dpid):
+                self.onsets[self._episode[dpid]][1] = self.now
+            self._video_over[dpid] = over
+
+    # --- RISULTATI ---
+    def reaction_times(self):
+        # Per ogni episodio video: attesa della prima decisione del controller
+        # mentre il video è ancora sopra soglia (se non serviva, nessuna)
+        times = [at for at, _ in self.actions]
+        reactions = []
+        for onset, end in self.onsets:
+            later = [at - onset for at in times if onset <= at < end]
+            if later:
+                reactions.append(min(later))
+        return reactions
+
+
+def make_controller(desc):
+    # Il controller legge la topologia come in produzione, da $SLICE_TOPOLOGY
+    from controller_Dynamic_Slicing import DynamicSliceController
+
+    fd, path = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    previous = os.environ.get(topology_discovery.DESCRIPTION_ENV)
+    try:
+        topology_discovery.write_description(desc, path)
+        os.environ[topology_discovery.DESCRIPTION_ENV] = path
+        ctrl = DynamicSliceController()
+    finally:
+        os.unlink(path)
+        if previous is None:
+            os.environ.pop(topology_discovery.DESCRIPTION_ENV, None)
+        else:
+            os.environ[topology_discovery.DESCRIPTION_ENV] = previous
+    # I round di polling li guida il simulatore sul tempo simulato
+    hub.kill(ctrl.monitor_thread)
+    # Topologia già scoperta, come se fossero arrivati gli eventi LLDP
+    ctrl.discovery.load(*topology_discovery.description_tables(desc))
+    # La rete simulata parte con gli switch vuoti: niente da riconciliare
+    ctrl.reconciler.enabled = False
+    ctrl._compile_policy()
+    return ctrl
+
+
+def add_traffic(sim, seconds, seed=1, busy=0.5):
+    # Video a sessioni (attorno a 1.1 Mbps) da ogni host di sinistra verso
+    # quello di destra della stessa coppia; traffico standard on/off
+    # (0.2-3 Mbps) in entrambi i versi di ogni coppia
+    rnd = random.Random(seed)
+    for src, dst, _ in sim.desc['pairs']:
+        t = 0.0
+        while t < seconds:
+            length = rnd.uniform(10, 40)
+            if rnd.random() < busy:
+                sim.add_flow(src, dst, 'video', max(0.1, rnd.gauss(1.1, 0.5)), t, min(seconds, t + length))
+            t += length
+        for a, b in ((src, dst), (dst, src)):
+            t = 0.0
+            while t < seconds:
+                length = rnd.uniform(10, 60)
+                if rnd.random() < 0.6:
+                    sim.add_flow(a, b, 'tcp', rnd.uniform(0.2, 3.0), t, min(seconds, t + length))
+                t += length
+
+
+def simulate(desc, seconds, steering='global', seed=1, busy=0.5):
+    start = time.perf_counter()
+    ctrl = make_controller(desc)
+    ctrl.steering = steering
+    sim = NetworkSimulator(ctrl, desc, seed=seed)
+    setup_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    add_traffic(sim, seconds, seed, busy)
+    sim.start()
+    sim.run(seconds)
+    run_s = time.perf_counter() - start
+
+    offered = {'video': 0.0, 'tcp': 0.0}
+    delivered = {'video': 0.0, 'tcp': 0.0}
+    for flow in sim.flows:
+        offered[flow.kind] += flow.rate * (flow.stop - flow.start)
+        delivered[flow.kind] += flow.delivered
+    reactions = sim.reaction_times()
+    return {
+        'switches': len(sim.switches), 'hosts': len(sim.H), 'flows': len(sim.flows),
+        'standard_mbps': delivered['tcp'] * 8 / seconds / 1e6,
+        'standard_share': delivered['tcp'] / offered['tcp'] if offered['tcp'] else 0.0,
+        'video_mbps': delivered['video'] * 8 / seconds / 1e6,
+        'video_share': delivered['video'] / offered['video'] if offered['video'] else 0.0,
+        'onsets': len(sim.onsets), 'reactions': len(reactions),
+        'reaction_mean': sum(reactions) / len(reactions) if reactions else 0.0,
+        'reaction_max': max(reactions) if reactions else 0.0,
+        'control_msgs_s': (sim.to_switch + sim.to_controller + ctrl.programmer.sent_msgs) / seconds,
+        'queue_ms': sim.max_queue_delay * 1000,
+        'setup_s': setup_s, 'run_s': run_s,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Simulatore a eventi discreti per il controller dinamico')
+    parser.add_argument('seconds', type=float, nargs='?', default=300.0, help='tempo simulato')
+    parser.add_argument('--topology', help='descrizione JSON (topology_slicing.py --write)')
+    parser.add_argument('--kind', choices=['diamond', 'leafspine', 'fattree'], default='diamond')
+    parser.add_argument('--sizes', default='1,10,100,1000',
+                        help='diamanti, foglie o arietà k delle topologie da simulare')
+    parser.add_argument('--hosts', type=int, default=8)
+    # Di default la transizione globale: il tempo di reazione è quello del cambio di slice
+    parser.add_argument('--steering', choices=['pair', 'global', 'select'], default='global')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    if args.topology:
+        descs = [topology_discovery.load_description(args.topology)]
+    else:
+        descs = [generate_topology(args.kind, args.hosts, size=int(n)) for n in args.sizes.split(',')]
+
+    print(f"{'switch':>7}{'host':>6}{'flussi':>8}{'std Mbps':>10}{'std %':>7}{'video Mbps':>12}{'video %':>9}"
+          f"{'episodi':>9}{'reazione s':>12}{'max s':>8}{'msg/s':>9}{'coda ms':>9}{'setup s':>9}{'sim s':>8}")
+    for desc in descs:
+        r = simulate(desc, args.seconds, args.steering, args.seed)
+        print(f"{r['switches']:>7}{r['hosts']:>6}{r['flows']:>8}{r['standard_mbps']:>10.2f}"
+              f"{r['standard_share'] * 100:>7.1f}{r['video_mbps']:>12.2f}{r['video_share'] * 100:>9.1f}"
+              f"{r['reactions']:>4}/{r['onsets']:<4}{r['reaction_mean']:>12.2f}{r['reaction_max']:>8.2f}"
+              f"{r['control_msgs_s']:>9.1f}{r['queue_ms']:>9.1f}{r['setup_s']:>9.2f}{r['run_s']:>8.2f}")
@@ -0,0 +1,182 @@
+# pair_steering.py
+# Traffico standard del controller dinamico coppia per coppia di host:
+#   - 'pair': ogni coppia ha la sua regola (Priorità 260) e viene
+#     posizionata a parte in base allo spazio libero sulle slice, misurando
+#     la sua domanda dai contatori della regola
+#   - 'select': s1 e s4 dividono il traffico standard sulle slice con un
+#     gruppo SELECT pesato sulla capacità libera di ogni percorso
+# Con la tabella oltre la soglia alta si tolgono le regole dinamiche colpite
+# meno di recente: le coppie senza regola propria (tolte o scadute) restano
+# sulle regole aggregate della slice di default (aggregated) e la riavranno
+# quando il loro traffico ricompare nei campioni (sampled) e la tabella ha
+# spazio sotto la soglia bassa.
+# Il controller dà policy, rate video, meter, gestore delle tabelle e le
+# transizioni (apply_placement, apply_select_weights).
+import rate_estimator
+import slice_placement
+import slice_policy
+
+
+class PairSteering(object):
+
+    def __init__(self, ctrl, select_min_change=5, rate_samples=3, rate_alpha=0.3):
+        self.ctrl = ctrl
+        spec = ctrl.spec
+        # Preferenza: prima le slice più capienti, la slice standard fa da riserva
+        preference = sorted(spec['capacity'], key=lambda name: (name == spec['default'], -spec['capacity'][name]))
+        self.placement = slice_placement.PlacementEngine(spec['capacity'], preference)
+        # Slice di ogni coppia e domanda misurata (byte/s)
+        self.pair_slice = {}
+        # Posizionamento dell'istantanea, per le coppie non ancora scoperte
+        self.restored_pair_slice = {}
+        self.stats = rate_estimator.RateEstimator(size=rate_samples, alpha=rate_alpha)
+        self.rates = {}
+        self.aggregated = set()
+        self.sampled = set()
+        # Pesi attuali dei bucket del gruppo SELECT (slice -> peso su 100);
+        # il gruppo si aggiorna solo se un peso cambia almeno di tanto
+        self.select_weights = {}
+        self.select_min_change = select_min_change
+
+    def compile(self, policy, initial):
+        # Stato che dipende da host e switch: le coppie nuove partono dalla
+        # slice initial (quella globale), quelle sparite si dimenticano
+        pairs = policy.host_pairs()
+        self.pair_slice = {pair: self.pair_slice.get(pair, self.restored_pair_slice.get(pair, initial))
+                           for pair in pairs}
+        self.rates = {pair: self.rates.get(pair, 0.0) for pair in pairs}
+        self.aggregated &= set(pairs)
+        self.sampled &= set(pairs)
+
+    def observe(self, key, pair, duration, byte_count):
+        # Contatori della regola di una coppia (flow stats)
+        if pair in self.rates:
+            self.rates[pair] = self.stats.update(key, duration, byte_count)
+
+    def rules(self, placement):
+        # Regole per coppia con i timeout della loro classe; le coppie tolte
+        # sotto pressione restano sulle regole aggregate
+        ctrl = self.ctrl
+        placement = {pair: name for pair, name in placement.items() if pair not in self.aggregated}
+        return {dpid: [ctrl.table_manager.assign(entry) for entry in entries]
+                for dpid, entries in ctrl.policy.compile_placement(placement).items()}
+
+    # --- 'pair' ---
+    def place(self, max_video_speed, install=False):
+        # Il video ha la precedenza sulla sua slice: le coppie di host
+        # riempiono lo spazio che resta e si spostano solo quelle che devono
+        ctrl = self.ctrl
+        spec = ctrl.spec
+        reserved = {spec['video']: max_video_speed * 8}
+        # Quello che i meter scartano è domanda che non ci sta: lo spazio
+        # libero della slice si riduce di altrettanto
+        for name, capacity in spec['capacity'].items():
+            reserved[name] = reserved.get(name, 0.0) + ctrl.slice_drops(name) * 8
+            if not ctrl.slice_up(name):
+                reserved[name] = capacity
+        demands = {pair: rate * 8 for pair, rate in self.rates.items()}
+        placement = self.placement.place(demands, self.pair_slice, reserved)
+        # Le coppie senza regola propria restano sulle regole aggregate
+        placement.update((pair, spec['default']) for pair in self.aggregated)
+        moves = self.placement.moves(placement, self.pair_slice)
+        if moves:
+            ctrl.logger.info(f"*** VIDEO {max_video_speed*8/1e6:.2f} Mbps: "
+                             + ", ".join(f"{src}->{dst} su {name}" for (src, dst), name in sorted(moves.items())))
+        if moves or install:
+            ctrl.apply_placement(placement)
+
+    # --- 'select' ---
+    def spare_capacity(self, max_video_speed):
+        # Capacità libera di ogni slice (bit/s) per il traffico standard
+        ctrl = self.ctrl
+        spare = {}
+        for name, capacity in ctrl.spec['capacity'].items():
+            used = ctrl.slice_drops(name) * 8
+            if name == ctrl.spec['video']:
+                used += max_video_speed * 8
+            spare[name] = max(0.0, capacity - used) if ctrl.slice_up(name) else 0.0
+        return spare
+
+    def weights_for(self, spare):
+        # Pesi interi proporzionali alla capacità libera; se non c'è spazio
+        # da nessuna parte si usano le capacità nominali
+        total = sum(spare.values())
+        if total <= 0:
+            spare = self.ctrl.spec['capacity']
+            total = sum(spare.values())
+        return {name: int(round(100 * value / total)) for name, value in spare.items()}
+
+    def balance(self, max_video_speed):
+        weights = self.weights_for(self.spare_capacity(max_video_speed))
+        change = max(abs(weights[name] - self.select_weights.get(name, 0)) for name in weights)
+        if change < self.select_min_change:
+            return
+        self.ctrl.logger.info(f"*** VIDEO {max_video_speed*8/1e6:.2f} Mbps: pesi SELECT "
+                              + ", ".join(f"{name} {weight}" for name, weight in sorted(weights.items())))
+        self.ctrl.apply_select_weights(weights)
+
+    # --- COPPIE AGGREGATE ---
+    def sampled_pair(self, pair):
+        # Traffico di una coppia aggregata nei campioni dei flussi pesanti
+        if pair in self.aggregated:
+            self.sampled.add(pair)
+
+    def aggregate(self, entry):
+        # La coppia della regola per coppia tolta passa alle regole aggregate
+        ctrl = self.ctrl
+        match = dict(entry.match)
+        pair = (ctrl.mac_host.get(match.get('eth_src')), ctrl.mac_host.get(match.get('eth_dst')))
+        if pair not in self.pair_slice:
+            return
+        self.aggregated.add(pair)
+        self.sampled.discard(pair)
+        self.pair_slice[pair] = ctrl.spec['default']
+        self.rates[pair] = 0.0
+
+    def removed(self, dpid, entry):
+        # Regola per coppia scaduta sullo switch
+        ctrl = self.ctrl
+        ctrl.shadow.remove(dpid, [entry])
+        ctrl.table_manager.forget_rule(dpid, entry.key())
+        self.aggregate(entry)
+
+    def relieve(self, dp):
+        # Tabella oltre la soglia alta: via le regole dinamiche colpite meno
+        # di recente. I flussi pesanti tornano sulla slice di default, le
+        # coppie di host sulle regole aggregate
+        ctrl = self.ctrl
+        dpid = dp.id
+        victims = ctrl.table_manager.victims(dpid, list(ctrl.shadow.tables.get(dpid, {}).values()))
+        if not victims:
+            return
+        for entry in victims:
+            if entry.cookie & slice_policy.COOKIE_CLASS_MASK == slice_policy.COOKIE_ELEPHANT:
+                ctrl.elephants.drop(dpid, entry.match, delete=True)
+                continue
+            ctrl.delete_entry(dp, entry)
+            self.removed(dpid, entry)
+        ctrl.programmer.flush(dp)
+        ctrl.logger.warning(f"*** s{dpid}: tabella oltre il {ctrl.table_manager.high_watermark:.0%}, "
+                            f"{len(victims)} regole dinamiche tolte (coppie aggregate: {len(self.aggregated)})")
+
+    def restore(self):
+        # Una volta per round: le coppie aggregate con di nuovo traffico
+        # riavranno le loro regole, se ci stanno tutte quelle dello switch
+        # (tutte le coppie aggregate se lo switch non campiona)
+        ctrl = self.ctrl
+        restored = set()
+        for dpid in ctrl.policy.edge_switches():
+            pairs = {pair for pair in self.aggregated if ctrl.policy.host_dpid.get(pair[0]) == dpid}
+            if ctrl.elephants.enabled(dpid):
+                pairs &= self.sampled
+            if pairs and ctrl.table_manager.admit(dpid, 0, len(pairs)):
+                restored |= pairs
+        if not restored:
+            return
+        self.aggregated -= restored
+        self.sampled -= restored
+        ctrl.logger.debug(f"*** {len(restored)} coppie di nuovo con regole proprie")
+        if ctrl.steering == 'pair':
+            # Subito sulla slice scelta dal posizionamento
+            speeds = [speed for speed in ctrl.current_speeds.values() if speed is not None]
+            self.place(max(speeds, default=0.0), install=True)
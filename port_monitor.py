@@ -0,0 +1,102 @@
+# port_monitor.py
+# Monitoraggio dell'utilizzo dei link tramite OFPPortStatsRequest.
+# I contatori sono in array NumPy preallocati, indicizzati per
+# (riga del datapath, numero di porta): ad ogni round il rate e
+# l'utilizzo di tutti i link vengono calcolati in un solo passaggio
+# vettoriale, anche con centinaia di switch.
+import numpy as np
+
+# Le porte riservate (OFPP_LOCAL, OFPP_CONTROLLER, ...) non sono link
+OFPP_MAX = 0xffffff00
+
+
+class PortMonitor(object):
+
+    def __init__(self, max_switches=64, max_ports=16):
+        # dpid -> riga degli array
+        self.rows = {}
+        self.dpids = []
+        self._alloc(max_switches, max_ports)
+
+    def _alloc(self, n_rows, n_cols):
+        old = getattr(self, 'tx_cur', None)
+        arrays = {
+            # Contatori (byte) e istanti (durata della porta, secondi)
+            'tx_cur': 0.0, 'tx_prev': 0.0, 'rx_cur': 0.0, 'rx_prev': 0.0,
+            't_cur': 0.0, 't_prev': 0.0,
+            # Capacità del link (bit/s), NaN se sconosciuta
+            'capacity': np.nan,
+            # Risultati dell'ultimo round
+            'tx_rate': np.nan, 'rx_rate': np.nan, 'util': np.nan,
+        }
+        for name, fill in arrays.items():
+            new = np.full((n_rows, n_cols), fill)
+            if old is not None:
+                prev = getattr(self, name)
+                new[:prev.shape[0], :prev.shape[1]] = prev
+            setattr(self, name, new)
+
+    def _index(self, dpid, port_no):
+        row = self.rows.get(dpid)
+        if row is None:
+            row = self.rows[dpid] = len(self.dpids)
+            self.dpids.append(dpid)
+        n_rows, n_cols = self.tx_cur.shape
+        if row >= n_rows or port_no >= n_cols:
+            self._alloc(max(n_rows, 2 * row + 1), max(n_cols, 2 * port_no + 1))
+        return row, port_no
+
+    def set_capacity(self, dpid, port_no, bps):
+        row, col = self._index(dpid, port_no)
+        self.capacity[row, col] = bps
+
+    def update(self, dpid, body):
+        # Nuovi contatori da una OFPPortStatsReply, scritti riga per riga
+        stats = [stat for stat in body if stat.port_no < OFPP_MAX]
+        if not stats:
+            return
+        row, _ = self._index(dpid, max(stat.port_no for stat in stats))
+        cols = np.array([stat.port_no for stat in stats], dtype=np.intp)
+
+        self.tx_prev[row, cols] = self.tx_cur[row, cols]
+        self.rx_prev[row, cols] = self.rx_cur[row, cols]
+        self.t_prev[row, cols] = self.t_cur[row, cols]
+        self.tx_cur[row, cols] = [stat.tx_bytes for stat in stats]
+        self.rx_cur[row, cols] = [stat.rx_bytes for stat in stats]
+        self.t_cur[row, cols] = [stat.duration_sec + stat.duration_nsec / 1e9 for stat in stats]
+
+    def compute(self):
+        # Rate (bit/s) e utilizzo di tutte le porte in un solo passaggio
+        n = len(self.dpids)
+        dt = self.t_cur[:n] - self.t_prev[:n]
+        d_tx = self.tx_cur[:n] - self.tx_prev[:n]
+        d_rx = self.rx_cur[:n] - self.rx_prev[:n]
+        # Campioni non validi: primo campione, nessun aggiornamento, contatori azzerati
+        valid = (dt > 0) & (self.t_prev[:n] > 0) & (d_tx >= 0) & (d_rx >= 0)
+        safe_dt = np.where(valid, dt, 1.0)
+        self.tx_rate[:n] = np.where(valid, d_tx * 8 / safe_dt, self.tx_rate[:n])
+        self.rx_rate[:n] = np.where(valid, d_rx * 8 / safe_dt, self.rx_rate[:n])
+        self.util[:n] = self.tx_rate[:n] / self.capacity[:n]
+        return self.util[:n]
+
+    def utilization(self, dpid, port_no):
+        row = self.rows.get(dpid)
+        if row is None or port_no >= self.util.shape[1]:
+            return float('nan')
+        return float(self.util[row, port_no])
+
+    def tx_rate_of(self, dpid, port_no):
+        # Rate in uscita dalla porta nell'ultimo round (bit/s)
+        row = self.rows.get(dpid)
+        if row is None or port_no >= self.tx_rate.shape[1]:
+            return float('nan')
+        return float(self.tx_rate[row, port_no])
+
+    def link_utilization(self, port_map):
+        # (switch, vicino) -> utilizzo in uscita verso il vicino
+        links = {}
+        for dpid, ports in port_map.items():
+            for neighbor, port_no in ports.items():
+                if neighbor.startswith('s'):
+                    links[(f"s{dpid}", neighbor)] = self.utilization(dpid, port_no)
+        return links
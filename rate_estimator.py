@@ -0,0 +1,101 @@
+# rate_estimator.py
+# Stima del rate dei flussi a partire dai contatori delle flow stats.
+# Per ogni flusso si tiene un anello di campioni (istante, byte) di
+# dimensione fissa: l'istante è la durata del flusso riportata dallo switch
+# (duration_sec/duration_nsec), quindi il rate non dipende da quando arriva
+# la risposta al controller. Il rate è quello sull'intera finestra
+# dell'anello (dal campione più vecchio al più nuovo, size - 1 intervalli)
+# e viene poi smussato con una media mobile esponenziale (EWMA).
+
+
+class _Ring(object):
+    __slots__ = ('times', 'bytes', 'head', 'count', 'ewma')
+
+    def __init__(self, size):
+        self.times = [0.0] * size
+        self.bytes = [0] * size
+        self.head = 0
+        self.count = 0
+        self.ewma = None
+
+
+class RateEstimator(object):
+
+    def __init__(self, size=8, alpha=0.3):
+        self.size = size
+        # alpha=1 -> nessuno smussamento (solo l'ultimo campione)
+        self.alpha = alpha
+        self.rings = {}
+
+    def update(self, key, timestamp, byte_count, since_install=True):
+        # Aggiunge un campione e restituisce il rate smussato (byte/s).
+        # since_install: timestamp è la durata del flusso, quindi il primo
+        # campione dà già la media dall'installazione; altrimenti è un
+        # istante qualsiasi e il primo campione fa solo da riferimento (None)
+        ring = self.rings.get(key)
+        if ring is None:
+            ring = self.rings[key] = _Ring(self.size)
+
+        if ring.count:
+            last = (ring.head - 1) % self.size
+            dt = timestamp - ring.times[last]
+            delta = byte_count - ring.bytes[last]
+            if dt < 0 or delta < 0:
+                # Flusso reinstallato o contatori azzerati: si riparte
+                ring.count = 0
+                ring.ewma = None
+            elif dt == 0:
+                return ring.ewma or 0.0
+
+        first = not ring.count
+        ring.times[ring.head] = timestamp
+        ring.bytes[ring.head] = byte_count
+        ring.head = (ring.head + 1) % self.size
+        ring.count = min(ring.count + 1, self.size)
+
+        if not first:
+            # Sulla finestra: dal campione più vecchio rimasto nell'anello
+            oldest = (ring.head - ring.count) % self.size
+            rate = (byte_count - ring.bytes[oldest]) / (timestamp - ring.times[oldest])
+        elif not since_install:
+            return None
+        elif timestamp > 0:
+            # Primo campione: media dall'installazione del flusso, invece di scartarlo
+            rate = byte_count / timestamp
+        else:
+            rate = 0.0
+
+        if ring.ewma is None:
+            ring.ewma = rate
+        else:
+            ring.ewma = self.alpha * rate + (1 - self.alpha) * ring.ewma
+        return ring.ewma
+
+    def rate(self, key):
+        ring = self.rings.get(key)
+        return ring.ewma if ring is not None and ring.ewma is not None else 0.0
+
+    def export(self):
+        # [(chiave, campioni dal più vecchio, ewma)] per salvare lo stato
+        items = []
+        for key, ring in self.rings.items():
+            order = [(ring.head - ring.count + i) % self.size for i in range(ring.count)]
+            items.append((key, [(ring.times[i], ring.bytes[i]) for i in order], ring.ewma))
+        return items
+
+    def load(self, items):
+        # Anelli ripresi da export(): il prossimo campione dà subito un rate
+        # sull'intervallo vero invece della media dall'installazione
+        for key, samples, ewma in items:
+            ring = self.rings[key] = _Ring(self.size)
+            for timestamp, byte_count in samples[-self.size:]:
+                ring.times[ring.head] = timestamp
+                ring.bytes[ring.head] = byte_count
+                ring.head = (ring.head + 1) % self.size
+                ring.count += 1
+            ring.ewma = ewma
+
+    def forget(self, match):
+        # Rimuove tutte le chiavi per cui match(chiave) è vero
+        for key in [key for key in self.rings if match(key)]:
+            del self.rings[key]
@@ -0,0 +1,50 @@
+# slice_admission.py
+# Controllo di ammissione sulle slice: prima di installare le regole di un
+# tenant o di un flusso se ne prenota il rate sulla capacità che resta
+# della slice, per dominio (lo switch d'ingresso: ogni estremo della slice
+# ha i suoi link in uscita; None = la slice intera). Una richiesta che non
+# ci sta sotto headroom viene rifiutata e il suo traffico resta sulla slice
+# di default, senza garanzie. Non si liberano una per una: il compilatore
+# della policy le ricalcola a ogni compilazione (retain() lascia solo i
+# tenant ancora presenti, che tengono il posto) e i flussi pesanti usano
+# un controllo nuovo a ogni round, con il carico misurato delle slice
+# (flussi già spostati compresi) come base.
+
+
+class AdmissionControl(object):
+
+    def __init__(self, capacity, headroom=1.0):
+        # slice -> capacità (bit/s)
+        self.capacity = dict(capacity)
+        self.headroom = headroom
+        # (slice, dominio) -> {chiave: bit/s prenotati}
+        self.reserved = {}
+        # (slice, dominio) -> bit/s già misurati fuori dalle prenotazioni
+        self.measured = {}
+
+    def remaining(self, name, domain=None):
+        # bit/s ancora prenotabili sulla slice nel dominio
+        if name not in self.capacity:
+            return 0.0
+        used = self.measured.get((name, domain), 0.0) + sum(self.reserved.get((name, domain), {}).values())
+        return self.capacity[name] * self.headroom - used
+
+    def best(self, names, domain=None):
+        # La slice con più capacità libera tra names, None se non ce ne sono
+        return max(names, key=lambda name: self.remaining(name, domain), default=None)
+
+    def admit(self, name, domain, key, rate):
+        # True se key ha (o ottiene adesso) rate bit/s sulla slice
+        reserved = self.reserved.setdefault((name, domain), {})
+        if key in reserved:
+            return True
+        if rate > self.remaining(name, domain):
+            return False
+        reserved[key] = rate
+        return True
+
+    def retain(self, keep):
+        # Libera le prenotazioni per cui keep(slice, dominio, chiave) è falso
+        for (name, domain), reserved in self.reserved.items():
+            for key in [key for key in reserved if not keep(name, domain, key)]:
+                del reserved[key]
@@ -0,0 +1,356 @@
+# slice_engine.py
+# Motore di slicing comune ai controller. Una specifica delle slice
+# (slice_policy: percorsi, capacità, classificatore del traffico, bande di
+# priorità, rate garantito ai tenant) diventa la tabella dei flussi di ogni
+# switch; la topologia scoperta a runtime la tiene aggiornata spedendo solo
+# le differenze. I controller sono configurazioni del motore: il Service e
+# il Topology Slicing scelgono solo la specifica (SPEC), il controller
+# dinamico aggiunge in setup() il monitoraggio e lo spostamento del
+# traffico. Con una descrizione della rete in $SLICE_TOPOLOGY le slice sono
+# quelle della descrizione, quante che siano.
+import os
+import time
+
+from ryu.base import app_manager
+from ryu.controller import ofp_event
+from ryu.controller.handler import CONFIG_DISPATCHER, MAIN_DISPATCHER, DEAD_DISPATCHER, set_ev_cls
+from ryu.lib import hub
+from ryu.ofproto import ofproto_v1_3
+from ryu.topology import event as topo_event
+
+import arp_proxy
+import controller_metrics
+import flow_programmer
+import slice_admission
+import slice_policy
+import topology_discovery
+
+
+class SliceEngine(app_manager.RyuApp):
+    OFP_VERSIONS = [ofproto_v1_3.OFP_VERSION]
+    # Specifica delle slice della configurazione
+    SPEC = slice_policy.SERVICE_SPEC
+
+    def __init__(self, *args, **kwargs):
+        super(SliceEngine, self).__init__(*args, **kwargs)
+
+        self.datapaths = {}
+        # Metriche dei percorsi caldi (controller_metrics.ControllerMetrics),
+        # se la configurazione le raccoglie
+        self.metrics = None
+
+        # Slice, capacità e coppie: quelle di SliceTopo oppure quelle della
+        # topologia generata da topology_slicing.py (file in $SLICE_TOPOLOGY)
+        self.spec = topology_discovery.load_spec(self.SPEC, os.environ.get(topology_discovery.DESCRIPTION_ENV))
+        # Orologio del controller (sostituibile per replay e simulazioni)
+        self.clock = time.monotonic
+
+        # Topologia scoperta a runtime (LLDP e host imparati dall'ARP): da
+        # qui H (host -> MAC), PORT_MAP (dpid -> {vicino: porta}) e i
+        # percorsi delle slice attraverso i loro waypoint
+        self.discovery = topology_discovery.TopologyDiscovery(self.spec['slices'])
+        # Gli eventi arrivano a raffica (uno per verso di ogni link): la
+        # policy si ricompila una volta sola dopo questa attesa (secondi)
+        self.discovery_delay = 0.5
+        self._resync_pending = False
+
+        # Risponditore ARP: le richieste degli host non inondano più le slice
+        self.arp_proxy = arp_proxy.ArpProxy(clock=lambda: self.clock())
+
+        # Ammissione dei tenant sulle slice con 'tenant_rate': le
+        # prenotazioni passano da una compilazione della policy all'altra
+        self.admission = slice_admission.AdmissionControl(self.spec['capacity'])
+        self.policy = None
+
+        # FlowMod accodati per datapath e spediti a lotti (burst + barrier)
+        self.programmer = flow_programmer.FlowProgrammer(self.logger)
+        # Copia delle regole installate: dopo un cambio di topologia si
+        # spediscono solo le differenze
+        self.shadow = flow_programmer.ShadowFlowTable()
+
+        self.setup()
+        # Tabelle dei flussi compilate per la topologia attuale
+        self._compile_policy()
+
+    def setup(self):
+        # Stato in più della configurazione, prima della prima compilazione
+        pass
+
+    @set_ev_cls(ofp_event.EventOFPBarrierReply, [CONFIG_DISPATCHER, MAIN_DISPATCHER])
+    @controller_metrics.handler
+    def _barrier_reply_handler(self, ev):
+        self.programmer.barrier_reply_handler(ev.msg)
+
+    def add_flow(self, datapath, priority, match, actions, command=None, cookie=0, table_id=0, inst=None,
+                 idle_timeout=0, hard_timeout=0, flags=0):
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
+        if command is None:
+            command = ofproto.OFPFC_ADD
+        if inst is None:
+            inst = [parser.OFPInstructionActions(ofproto.OFPIT_APPLY_ACTIONS, actions)]
+        mod = parser.OFPFlowMod(datapath=datapath, table_id=table_id, cookie=cookie, command=command,
+                                idle_timeout=idle_timeout, hard_timeout=hard_timeout, flags=flags,
+                                priority=priority, match=match,
+                                instructions=inst)
+        # Accodato: parte con il prossimo flush insieme agli altri FlowMod
+        self.programmer.add(datapath, mod)
+
+    def add_entry(self, datapath, entry, command=None):
+        # Regola compilata: meter, azioni, metadata e goto dalla FlowEntry.
+        # Una regola temporanea avvisa il controller quando scade
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
+        self.add_flow(datapath, entry.priority, entry.ofp_match(parser), None, command=command,
+                      cookie=entry.cookie, table_id=entry.table_id,
+                      inst=entry.ofp_instructions(ofproto, parser), idle_timeout=entry.idle_timeout,
+                      hard_timeout=entry.hard_timeout,
+                      flags=ofproto.OFPFF_SEND_FLOW_REM if entry.idle_timeout or entry.hard_timeout else 0)
+
+    def delete_entry(self, datapath, entry):
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
+        self.programmer.add(datapath, parser.OFPFlowMod(datapath=datapath, table_id=entry.table_id,
+                                                        command=ofproto.OFPFC_DELETE_STRICT,
+                                                        priority=entry.priority, out_port=ofproto.OFPP_ANY,
+                                                        out_group=ofproto.OFPG_ANY,
+                                                        match=entry.ofp_match(parser)))
+
+    def add_group(self, datapath, group, command):
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
+        self.programmer.add(datapath, parser.OFPGroupMod(datapath, command=command, type_=group.ofp_type(ofproto),
+                                                         group_id=group.group_id,
+                                                         buckets=group.ofp_buckets(ofproto, parser)))
+
+    def _datapath_groups(self, dpid, policy=None):
+        # Gruppi FAST_FAILOVER dello switch, in ordine di installazione
+        # (policy: quella indicata invece di quella attuale)
+        return list((policy or self.policy).group_table(dpid))
+
+    def install_groups(self, datapath):
+        # Gruppi verso le slice, prima delle regole che li usano.
+        # Si parte da zero come per i meter
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
+        groups = self._datapath_groups(datapath.id)
+        if not groups:
+            return
+        self.programmer.add(datapath, parser.OFPGroupMod(datapath, command=ofproto.OFPGC_DELETE,
+                                                         group_id=ofproto.OFPG_ALL))
+        for group in groups:
+            self.add_group(datapath, group, ofproto.OFPGC_ADD)
+
+    def install_meters(self, datapath):
+        # Meter delle slice e dei tenant, prima delle regole che li usano.
+        # Si parte da zero: un meter già presente (riconnessione) darebbe errore
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
+        meters = self.policy.meter_table(datapath.id)
+        if not meters:
+            return
+        self.programmer.add(datapath, parser.OFPMeterMod(datapath, command=ofproto.OFPMC_DELETE,
+                                                         meter_id=ofproto.OFPM_ALL))
+        for meter in meters:
+            self.add_meter(datapath, meter, ofproto.OFPMC_ADD)
+
+    def add_meter(self, datapath, meter, command):
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
+        self.programmer.add(datapath, parser.OFPMeterMod(datapath, command=command, flags=meter_flags(ofproto),
+                                                         meter_id=meter.meter_id, bands=meter.ofp_bands(parser)))
+
+    @set_ev_cls(ofp_event.EventOFPSwitchFeatures, CONFIG_DISPATCHER)
+    @controller_metrics.handler
+    def switch_features_handler(self, ev):
+        dp = ev.msg.datapath
+        self.datapaths[dp.id] = dp
+        if self.metrics is not None:
+            self.metrics.add_datapath(dp.id)
+        self._install_datapath(dp)
+
+    def _install_datapath(self, dp):
+        dpid = dp.id
+        # Meter delle slice e gruppi di failover, poi la tabella precompilata
+        # dal compilatore di policy (cache per dpid): DROP di default,
+        # ARP (Priorità 100), slice (Priorità 200-320) e bande delle classi
+        self.install_meters(dp)
+        self.install_groups(dp)
+        table = self._datapath_table(dpid)
+        for entry in table:
+            self.add_entry(dp, entry)
+        self.shadow.reset(dpid, table)
+
+        # Un solo invio per switch, confermato dalla barrier reply
+        self.programmer.flush(dp)
+
+    def _datapath_table(self, dpid):
+        return list(self.policy.flow_table(dpid))
+
+    @set_ev_cls(ofp_event.EventOFPStateChange, [MAIN_DISPATCHER, DEAD_DISPATCHER])
+    @controller_metrics.handler
+    def _state_change_handler(self, ev):
+        datapath = ev.datapath
+        if ev.state == MAIN_DISPATCHER:
+            if datapath.id not in self.datapaths:
+                self.datapaths[datapath.id] = datapath
+        elif ev.state == DEAD_DISPATCHER:
+            if datapath.id in self.datapaths:
+                del self.datapaths[datapath.id]
+                self.forget_datapath(datapath.id)
+
+    def forget_datapath(self, dpid):
+        # Switch disconnesso: via lo stato che lo riguarda
+        self.programmer.forget(dpid)
+        self.shadow.forget(dpid)
+
+    # --- PROXY ARP ---
+    @set_ev_cls(ofp_event.EventOFPPacketIn, MAIN_DISPATCHER)
+    @controller_metrics.handler
+    def _packet_in_handler(self, ev):
+        msg = ev.msg
+        # Solo l'ARP delle porte host (Priorità 110): il resto è per ryu.topology
+        if msg.cookie != slice_policy.COOKIE_ARP:
+            return
+        dp = msg.datapath
+        out = self.arp_proxy.handle(dp, msg.match['in_port'], msg, self.policy)
+        if out is not None:
+            dp.send_msg(out)
+
+    # --- TOPOLOGIA SCOPERTA A RUNTIME ---
+    @set_ev_cls(topo_event.EventSwitchEnter)
+    @controller_metrics.handler
+    def _switch_enter_handler(self, ev):
+        self.discovery.add_switch(ev.switch.dp.id)
+        self._topology_changed()
+
+    @set_ev_cls(topo_event.EventSwitchLeave)
+    @controller_metrics.handler
+    def _switch_leave_handler(self, ev):
+        self.discovery.remove_switch(ev.switch.dp.id)
+        self._topology_changed()
+
+    @set_ev_cls(topo_event.EventLinkAdd)
+    @controller_metrics.handler
+    def _link_add_handler(self, ev):
+        src, dst = ev.link.src, ev.link.dst
+        self.discovery.add_link(src.dpid, src.port_no, dst.dpid, dst.port_no)
+        self._topology_changed()
+
+    @set_ev_cls(topo_event.EventLinkDelete)
+    @controller_metrics.handler
+    def _link_delete_handler(self, ev):
+        self.discovery.remove_link(ev.link.src.dpid, ev.link.dst.dpid)
+        self._topology_changed()
+
+    @set_ev_cls([topo_event.EventHostAdd, topo_event.EventHostMove])
+    @controller_metrics.handler
+    def _host_handler(self, ev):
+        host = ev.host if hasattr(ev, 'host') else ev.dst
+        self.discovery.add_host(host.mac, host.port.dpid, host.port.port_no)
+        self._topology_changed()
+
+    @set_ev_cls([topo_event.EventPortDelete, topo_event.EventPortModify])
+    @controller_metrics.handler
+    def _port_handler(self, ev):
+        # Porta di un host tolta o giù: il proxy ARP non risponde più per lui
+        port = ev.port
+        if isinstance(ev, topo_event.EventPortModify) and port.is_live():
+            return
+        for mac, dpid, port_no in list(self.discovery.hosts.values()):
+            if (dpid, port_no) == (port.dpid, port.port_no):
+                self.arp_proxy.forget(mac)
+
+    def _topology_changed(self):
+        if self.discovery.version == self._policy_version or self._resync_pending:
+            return
+        self._resync_pending = True
+        hub.spawn_after(self.discovery_delay, self._resync)
+
+    def _compile_policy(self):
+        # Policy per la topologia scoperta finora: le slice senza un percorso
+        # completo e le coppie con host ancora ignoti restano fuori; senza i
+        # percorsi delle slice del servizio c'è solo la regola di DROP e
+        # l'ARP verso il controller
+        version = self.discovery.version
+        H, PORT_MAP = self.discovery.host_map(), self.discovery.port_map()
+        spec = dict(self.spec, slices=self.discovery.slice_paths())
+        policy = slice_policy.SlicePolicyCompiler(H, PORT_MAP, spec, self.admission)
+        policy.compile()
+        # Tenant appena rifiutati: la loro classe resta sulla slice di default
+        rejected = policy.rejected - (self.policy.rejected if self.policy is not None else set())
+        for name, h in sorted(rejected):
+            self.logger.warning(f"*** {h} non ammesso su {name}: "
+                                f"{self.admission.remaining(name, policy.host_dpid[h]) / 1e6:.2f} Mbps liberi "
+                                f"sullo switch d'ingresso")
+        # Host spariti dalla topologia: via le loro associazioni ARP
+        if self.policy is not None:
+            for mac in set(self.H.values()) - set(H.values()):
+                self.arp_proxy.forget(mac)
+        self.H, self.PORT_MAP, self.policy = H, PORT_MAP, policy
+        self._policy_version = version
+
+    def _resync(self):
+        self._resync_pending = False
+        old = self.policy
+        try:
+            self._compile_policy()
+        except ValueError as e:
+            self._policy_version = self.discovery.version
+            self.logger.error(f"*** Topologia non compatibile con le slice: {e}")
+            return
+        for dp in list(self.datapaths.values()):
+            self.sync_datapath(dp, old)
+
+    def sync_datapath(self, datapath, old):
+        # Porta lo switch alla policy attuale toccando solo quello che cambia:
+        # meter e gruppi nuovi o cambiati (ADD o MODIFY, le regole che li
+        # usano restano installate), poi si cancellano le regole sparite e si
+        # spediscono solo quelle nuove o cambiate, infine via i meter e i
+        # gruppi che nessuna regola usa più. I primi meter e gruppi dello
+        # switch si installano da zero come alla connessione: quelli rimasti
+        # da prima non sono nella policy vecchia
+        dpid = datapath.id
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
+        meters = {meter.meter_id: meter for meter in old.meter_table(dpid)}
+        if not meters:
+            self.install_meters(datapath)
+        else:
+            for meter in self.policy.meter_table(dpid):
+                current = meters.pop(meter.meter_id, None)
+                if current is None:
+                    self.add_meter(datapath, meter, ofproto.OFPMC_ADD)
+                elif current.rate != meter.rate:
+                    self.add_meter(datapath, meter, ofproto.OFPMC_MODIFY)
+        groups = {group.group_id: group for group in self._datapath_groups(dpid, old)}
+        if not groups:
+            self.install_groups(datapath)
+        else:
+            for group in self._datapath_groups(dpid):
+                current = groups.pop(group.group_id, None)
+                if current is None:
+                    self.add_group(datapath, group, ofproto.OFPGC_ADD)
+                elif current != group:
+                    self.add_group(datapath, group, ofproto.OFPGC_MODIFY)
+
+        table = self._datapath_table(dpid)
+        for entry in self.shadow.stale(dpid, table):
+            self.delete_entry(datapath, entry)
+        added, modified = self.shadow.diff(dpid, table)
+        for entry in added:
+            self.add_entry(datapath, entry)
+        for entry in modified:
+            self.add_entry(datapath, entry, command=ofproto.OFPFC_MODIFY_STRICT)
+        self.shadow.reset(dpid, table)
+
+        for group_id in groups:
+            self.programmer.add(datapath, parser.OFPGroupMod(datapath, command=ofproto.OFPGC_DELETE,
+                                                             group_id=group_id))
+        for meter_id in meters:
+            self.programmer.add(datapath, parser.OFPMeterMod(datapath, command=ofproto.OFPMC_DELETE,
+                                                             meter_id=meter_id))
+        self.programmer.flush(datapath)
+
+def meter_flags(ofproto):
+    return ofproto.OFPMF_KBPS | ofproto.OFPMF_BURST | ofproto.OFPMF_STATS
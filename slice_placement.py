@@ -0,0 +1,72 @@
+# slice_placement.py
+# Posizionamento del traffico standard per coppia di host.
+# Invece di spostare tutto il traffico standard tra UPPER e LOWER insieme,
+# ogni coppia (sorgente, destinazione) viene assegnata a una slice:
+# le coppie riempiono a "bin packing" greedy lo spazio che il video lascia
+# libero sulla slice veloce, e si spostano solo quelle che devono.
+
+
+class PlacementEngine(object):
+
+    def __init__(self, capacity, preference, headroom=0.9, promote_margin=0.8, memory_decay=0.95):
+        # capacity: slice -> capacità (bit/s)
+        # preference: slice in ordine di preferenza; l'ultima fa da riserva
+        # e accoglie tutto quello che non entra nelle altre
+        self.capacity = capacity
+        self.preference = preference
+        # Quota della capacità utilizzabile (margine contro i picchi)
+        self.headroom = headroom
+        # Una coppia viene promossa solo se occupa al massimo questa frazione
+        # dello spazio rimasto: evita di spostarla avanti e indietro
+        self.promote_margin = promote_margin
+        # Sulla riserva una coppia è limitata dalla sua capacità e la domanda
+        # misurata sottostima quella vera: si ricorda la domanda che aveva
+        # sulla slice veloce, dimenticandola lentamente ad ogni decisione
+        self.memory_decay = memory_decay
+        self.demoted = {}
+
+    def place(self, demands, current, reserved=None):
+        # demands: coppia -> rate standard (bit/s)
+        # current: coppia -> slice attuale
+        # reserved: slice -> banda già occupata (es. il video)
+        reserved = reserved or {}
+        fallback = self.preference[-1]
+        placement = {pair: current.get(pair, fallback) for pair in demands}
+        for pair in list(self.demoted):
+            self.demoted[pair] *= self.memory_decay
+            if pair not in demands or self.demoted[pair] <= demands[pair]:
+                del self.demoted[pair]
+
+        budget = {}
+        for name in self.preference[:-1]:
+            budget[name] = self.capacity[name] * self.headroom - reserved.get(name, 0.0)
+
+        # 1. Le coppie già su una slice ci restano finché c'è spazio: se la
+        #    slice è piena si spostano prima le più grandi (meno spostamenti)
+        for name in self.preference[:-1]:
+            pairs = sorted((p for p in placement if placement[p] == name), key=lambda p: demands[p])
+            load = sum(demands[p] for p in pairs)
+            while pairs and load > budget[name]:
+                pair = pairs.pop()
+                load -= demands[pair]
+                placement[pair] = fallback
+                self.demoted[pair] = demands[pair]
+            budget[name] -= load
+
+        # 2. First-fit decreasing: le coppie sulla riserva salgono sulla prima
+        #    slice preferita con abbastanza spazio
+        demand = lambda p: max(demands[p], self.demoted.get(p, 0.0))
+        waiting = sorted((p for p in placement if placement[p] == fallback), key=lambda p: -demand(p))
+        for pair in waiting:
+            for name in self.preference[:-1]:
+                if demand(pair) <= budget[name] * self.promote_margin:
+                    placement[pair] = name
+                    budget[name] -= demand(pair)
+                    self.demoted.pop(pair, None)
+                    break
+
+        return placement
+
+    def moves(self, placement, current):
+        fallback = self.preference[-1]
+        return {pair: name for pair, name in placement.items() if current.get(pair, fallback) != name}
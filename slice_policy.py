@@ -0,0 +1,959 @@
+# slice_policy.py
+# Compilatore dichiarativo delle policy di slicing.
+# Dalla topologia (dizionari H e PORT_MAP dei controller) e da una specifica
+# delle slice genera, una volta sola, la tabella minima dei flussi di ogni
+# switch. Le tabelle restano in cache per dpid: uno switch che si riconnette
+# riceve subito la sua tabella precalcolata.
+from collections import namedtuple
+from itertools import combinations
+
+from ryu.ofproto import ofproto_v1_3
+
+import slice_admission
+
+ETH_TYPE_IP = 0x0800
+ETH_TYPE_ARP = 0x0806
+
+# Traffico video: UDP porta di destinazione 9999
+VIDEO_MATCH = {'eth_type': ETH_TYPE_IP, 'ip_proto': 17, 'udp_dst': 9999}
+
+# Priorità usate dai controller
+PRIO_DROP = 0
+PRIO_LEARN = 1
+PRIO_ARP = 100
+PRIO_ARP_PROXY = 110
+PRIO_SLICE = 200
+PRIO_LOCAL = 210
+PRIO_OVERRIDE = 250
+PRIO_PAIR = 260
+PRIO_ELEPHANT = 270
+PRIO_VIDEO = 300
+PRIO_VIDEO_LOCAL = 310
+PRIO_CRANKBACK = 320
+# Classi di traffico delle slice: bande da PRIO_CLASS_STEP priorità a
+# partire da PRIO_VIDEO (la prima classe elencata ha la banda più alta), la
+# consegna locale della classe 10 sopra la sua banda. Oltre PRIO_POLICY_MAX
+# le regole non sono della policy (per esempio l'LLDP di ryu.topology)
+PRIO_CLASS_STEP = 20
+PRIO_POLICY_MAX = 0x8000
+
+# Cookie: i 16 bit alti identificano la classe della regola, così le
+# richieste di statistiche possono filtrare con cookie/cookie_mask.
+# Il bit più alto marca le classi monitorate: una sola richiesta con
+# cookie=cookie_mask=COOKIE_MONITOR restituisce tutti i flussi misurati.
+COOKIE_CLASS_MASK = 0xffff << 48
+COOKIE_MONITOR = 0x8000 << 48
+COOKIE_VIDEO = 0x8001 << 48      # video uscente verso la slice video (Priorità 300)
+COOKIE_OVERRIDE = 0x0002 << 48   # regole dinamiche (Priorità 250)
+COOKIE_PAIR = 0x8003 << 48       # traffico standard per coppia di host (Priorità 260)
+COOKIE_SELECT = 0x0004 << 48     # traffico standard verso il gruppo SELECT (Priorità 250)
+COOKIE_ARP = 0x0005 << 48        # ARP degli host verso il proxy del controller (Priorità 110)
+COOKIE_ELEPHANT = 0x8006 << 48   # flussi pesanti spostati su un'altra slice (Priorità 270)
+COOKIE_CLASS = 0x0007 << 48      # classi di traffico diverse dal video (bande sopra 270)
+# I 32 bit bassi portano la versione della transizione che ha installato la
+# regola (aggiornamenti in due fasi), 0 per le regole della tabella di base
+COOKIE_VERSION_MASK = 0xffffffff
+
+# Gruppo SELECT degli switch di bordo: un bucket per slice
+GROUP_SELECT = 1
+# Gruppi FAST_FAILOVER: assegnati per switch a partire da questo id
+GROUP_FAILOVER_BASE = 0x100
+
+# Pipeline a due tabelle: la tabella 0 classifica il traffico in una slice
+# e ne scrive l'id nei metadata, la tabella 1 inoltra su destinazione e slice
+TABLE_CLASSIFY = 0
+TABLE_FORWARD = 1
+SLICE_METADATA_MASK = 0xff
+
+# Le due slice fisiche del progetto (percorsi di switch). Con la topologia
+# scoperta a runtime sono i waypoint: il percorso passa da questi switch.
+SLICES = {
+    'UPPER': ['s1', 's2', 's4'],  # 10 Mbps
+    'LOWER': ['s1', 's3', 's4'],  # 1 Mbps
+}
+
+# Capacità dei link di ogni slice (bit/s), come in SliceTopo
+SLICE_CAPACITY = {
+    'UPPER': 10e6,
+    'LOWER': 1e6,
+}
+
+# Topology Slicing: isolamento per coppie di host.
+# 'meters': le capacità delle slice sono imposte nel datapath con meter
+# OpenFlow sugli switch d'ingresso, non solo dallo shaping di Mininet.
+# 'pipeline': sugli switch di bordo la tabella 0 assegna la slice e la
+# tabella 1 inoltra su slice e destinazione (regole lineari negli host).
+# 'learn': l'ARP dalle porte senza host noti va al controller (scoperta host).
+# 'arp_proxy': l'ARP degli host va al controller, che risponde al posto della
+# destinazione invece di inondare la slice (solo tra host della stessa coppia).
+TOPOLOGY_SPEC = {
+    'slices': SLICES,
+    'capacity': SLICE_CAPACITY,
+    'pairs': {('h1', 'h3'): 'UPPER', ('h2', 'h4'): 'LOWER'},
+    'meters': True,
+    'pipeline': False,
+    'learn': True,
+    'arp_proxy': True,
+}
+
+# Service Slicing: video sulla slice veloce, il resto sulla lenta.
+# L'ARP viaggia solo sulla slice 'arp'.
+# 'classifier': slice -> match della sua classe di traffico (eth_type IP se
+# manca). Le slice senza classe ricevono solo il traffico spostato dal
+# controller; quella 'video' porta il cookie misurato COOKIE_VIDEO.
+# 'priority' (facoltativo): slice -> banda della classe, al posto di quella
+# calcolata dall'ordine del classificatore.
+# 'tenant_rate' (facoltativo): slice -> bit/s garantiti a ogni host locale.
+# Gli host entrano uno alla volta finché la capacità della slice basta
+# (ammissione per switch d'ingresso); gli altri restano sulla slice di
+# default. Senza, ogni host ha una quota equa della capacità.
+# 'failover': le uscite verso le slice passano da gruppi FAST_FAILOVER, così
+# un link guasto viene aggirato nel datapath senza attendere il controller.
+# 'pipeline': sugli switch di bordo classificazione e inoltro in due tabelle.
+# 'learn': l'ARP raggiunge anche il controller, che impara dove sono gli host.
+# 'arp_proxy': il controller risponde alle richieste ARP degli host.
+SERVICE_SPEC = {
+    'slices': SLICES,
+    'capacity': SLICE_CAPACITY,
+    'classifier': {'UPPER': VIDEO_MATCH},
+    'video': 'UPPER',
+    'default': 'LOWER',
+    'arp': 'LOWER',
+    'meters': True,
+    'failover': True,
+    'pipeline': False,
+    'learn': True,
+    'arp_proxy': True,
+}
+
+# Parametri del controller dinamico (tempi in secondi, rate in bit/s).
+# La descrizione della topologia può cambiarne alcuni con la sua 'tuning'.
+DYNAMIC_TUNING = {
+    # Polling delle statistiche: intervallo di base, limiti del polling
+    # adattivo (più spesso vicino alla soglia video) e scadenza di ogni
+    # round; 'flow' o 'aggregate' per le richieste dei flussi video
+    'monitor_interval': 2.0,
+    'adaptive_polling': True,
+    'min_interval': 0.5,
+    'max_interval': 6.0,
+    'stats_deadline': 1.0,
+    'stats_mode': 'flow',
+    # Soglia del video (metà per il ritorno) e dwell time per slice di
+    # destinazione: default = video rilevato, slice del video = terminato
+    'video_threshold': 1e6,
+    'dwell_time': {'default': 0.0, 'video': 6.0},
+    # Stima dei rate: campioni per flusso e smussamento EWMA
+    'rate_samples': 3,
+    'rate_alpha': 0.3,
+    # Quota della capacità scartata dai meter oltre cui la slice è congestionata
+    'congestion_threshold': 0.01,
+    # Il gruppo SELECT si aggiorna se un peso (su 100) cambia almeno di tanto
+    'select_min_change': 5,
+    # Flussi pesanti: soglia come quota della capacità della slice di
+    # default, regole per switch, campioni al secondo, posti e decadimento
+    # dello Space-Saving, stima del rate delle loro regole
+    'elephant_share': 0.2,
+    'max_elephants': 64,
+    'sample_rate': 100,
+    'sample_slots': 32,
+    'sample_decay': 0.5,
+    'elephant_rate_samples': 4,
+    'elephant_rate_alpha': 0.5,
+    # Transizioni in due fasi: attesa delle conferme e dei pacchetti in volo
+    'consistent_updates': True,
+    'stage_timeout': 2.0,
+    'drain_time': 1.0,
+    # Riavvio a caldo: istantanea dello stato, lettura dello stato degli
+    # switch e attesa della topologia
+    'state_interval': 10.0,
+    'state_max_age': 300.0,
+    'reconcile': True,
+    'reconcile_timeout': 5.0,
+    'discovery_timeout': 10.0,
+}
+
+# Controller dinamico: come il Service Slicing, più i flussi pesanti.
+# 'elephants': le regole che mandano il traffico standard sulla slice di
+# default ne copiano anche un campione al controller (limitato dai meter),
+# che sposta i flussi più pesanti su una slice con spazio libero.
+# 'tuning': i parametri qui sopra.
+DYNAMIC_SPEC = dict(SERVICE_SPEC, elephants=True, tuning=DYNAMIC_TUNING)
+
+
+class FlowEntry(namedtuple('FlowEntry', ['priority', 'match', 'out_ports', 'cookie', 'meter', 'group',
+                                         'table_id', 'write_metadata', 'goto', 'idle_timeout', 'hard_timeout'],
+                           defaults=(0, None, None, 0, None, None, 0, 0))):
+    # Regola compilata: il match è una tupla ordinata di coppie (campo, valore)
+    # così la regola è hashable e confrontabile. I timeout (secondi, 0 =
+    # permanente) non fanno parte dell'identità né delle azioni della regola.
+    __slots__ = ()
+
+    @classmethod
+    def make(cls, priority, out_ports, cookie=0, meter=None, group=None, table_id=0, write_metadata=None,
+             goto=None, idle_timeout=0, hard_timeout=0, **match):
+        return cls(priority, tuple(sorted(match.items())), tuple(out_ports), cookie, meter, group,
+                   table_id, write_metadata, goto, idle_timeout, hard_timeout)
+
+    @classmethod
+    def from_stats(cls, stat):
+        # Regola installata, da una voce delle flow stats (riconciliazione)
+        ofproto = ofproto_v1_3
+        out_ports, meter, group, write_metadata, goto = [], None, None, None, None
+        for inst in stat.instructions:
+            if inst.type == ofproto.OFPIT_METER:
+                meter = inst.meter_id
+            elif inst.type == ofproto.OFPIT_APPLY_ACTIONS:
+                for action in inst.actions:
+                    if action.type == ofproto.OFPAT_OUTPUT:
+                        out_ports.append(action.port)
+                    elif action.type == ofproto.OFPAT_GROUP:
+                        group = action.group_id
+            elif inst.type == ofproto.OFPIT_WRITE_METADATA:
+                write_metadata = inst.metadata
+            elif inst.type == ofproto.OFPIT_GOTO_TABLE:
+                goto = inst.table_id
+        return cls(stat.priority, tuple(sorted(stat.match.items())), tuple(out_ports), stat.cookie, meter, group,
+                   stat.table_id, write_metadata, goto, stat.idle_timeout, stat.hard_timeout)
+
+    def ofp_match(self, parser):
+        return parser.OFPMatch(**dict(self.match))
+
+    def ofp_actions(self, parser):
+        actions = [parser.OFPActionOutput(port) for port in self.out_ports]
+        if self.group is not None:
+            actions.append(parser.OFPActionGroup(self.group))
+        return actions
+
+    def ofp_instructions(self, ofproto, parser):
+        inst = []
+        if self.meter is not None:
+            inst.append(parser.OFPInstructionMeter(self.meter, ofproto.OFPIT_METER))
+        actions = self.ofp_actions(parser)
+        if actions or self.goto is None:
+            inst.append(parser.OFPInstructionActions(ofproto.OFPIT_APPLY_ACTIONS, actions))
+        if self.write_metadata is not None:
+            inst.append(parser.OFPInstructionWriteMetadata(self.write_metadata, SLICE_METADATA_MASK))
+        if self.goto is not None:
+            inst.append(parser.OFPInstructionGotoTable(self.goto))
+        return inst
+
+    def key(self):
+        # Identità della regola sullo switch (come per MODIFY_STRICT)
+        return (self.table_id, self.priority, self.match)
+
+    def action_key(self):
+        # Quello che una MODIFY_STRICT cambia: azioni, meter e pipeline
+        return (self.out_ports, self.meter, self.group, self.write_metadata, self.goto)
+
+
+class Bucket(namedtuple('Bucket', ['port', 'weight', 'watch_port', 'group'], defaults=(0, None, None))):
+    # Bucket di un gruppo: uscita su port oppure verso un altro gruppo
+    __slots__ = ()
+
+    def ofp_bucket(self, ofproto, parser):
+        if self.group is not None:
+            actions = [parser.OFPActionGroup(self.group)]
+        else:
+            actions = [parser.OFPActionOutput(self.port)]
+        watch_port = ofproto.OFPP_ANY if self.watch_port is None else self.watch_port
+        return parser.OFPBucket(weight=self.weight, watch_port=watch_port, actions=actions)
+
+    @classmethod
+    def from_ofp(cls, bucket):
+        port, group = None, None
+        for action in bucket.actions:
+            if action.type == ofproto_v1_3.OFPAT_GROUP:
+                group = action.group_id
+            elif action.type == ofproto_v1_3.OFPAT_OUTPUT:
+                port = action.port
+        watch_port = None if bucket.watch_port == ofproto_v1_3.OFPP_ANY else bucket.watch_port
+        return cls(port, bucket.weight, watch_port, group)
+
+
+class GroupEntry(namedtuple('GroupEntry', ['group_id', 'group_type', 'buckets'])):
+    # Gruppo compilato: group_type 'select' oppure 'ff' (FAST_FAILOVER)
+    __slots__ = ()
+
+    def ofp_type(self, ofproto):
+        return ofproto.OFPGT_SELECT if self.group_type == 'select' else ofproto.OFPGT_FF
+
+    def ofp_buckets(self, ofproto, parser):
+        return [bucket.ofp_bucket(ofproto, parser) for bucket in self.buckets]
+
+    @classmethod
+    def from_stats(cls, stat):
+        # Gruppo installato, da una voce delle group desc stats
+        group_type = 'select' if stat.type == ofproto_v1_3.OFPGT_SELECT else 'ff'
+        return cls(stat.group_id, group_type, tuple(Bucket.from_ofp(bucket) for bucket in stat.buckets))
+
+
+class MeterEntry(namedtuple('MeterEntry', ['meter_id', 'rate', 'slice', 'tenant'])):
+    # Meter compilato: rate in bit/s; tenant è None per il meter dell'intera
+    # slice, altrimenti il nome dell'host sorgente
+    __slots__ = ()
+
+    def ofp_bands(self, parser):
+        # Banda DROP in kbit/s, burst di un decimo di secondo
+        kbps = int(self.rate / 1000)
+        return [parser.OFPMeterBandDrop(rate=kbps, burst_size=max(1, kbps // 10))]
+
+
+class SlicePolicyCompiler(object):
+
+    def __init__(self, hosts, port_map, spec, admission=None):
+        self.H = hosts
+        self.PORT_MAP = port_map
+        self.spec = spec
+
+        # Percorsi delle slice come liste di dpid
+        self.slices = {}
+        for name, path in spec['slices'].items():
+            self.slices[name] = [self._dpid(sw) for sw in path]
+        # Id della slice scritto nei metadata dalla pipeline (0 = nessuna)
+        self.slice_id = {name: i + 1 for i, name in enumerate(sorted(self.slices))}
+        self.pipeline = bool(spec.get('pipeline'))
+
+        # Classi di traffico: [(slice, match, banda, cookie)] dalla più alta
+        self.classes = self._traffic_classes()
+        # Prenotazioni dei tenant: passate dal controller restano tra una
+        # compilazione e l'altra, così chi è già ammesso non perde il posto
+        if admission is None:
+            admission = slice_admission.AdmissionControl(spec.get('capacity', {}))
+        self.admission = admission
+        # (slice, host) ammessi e rifiutati sulle slice con 'tenant_rate'
+        self.admitted = set()
+        self.rejected = set()
+
+        # MAC -> nome dell'host (per il proxy ARP)
+        self.host_of = {mac: name for name, mac in hosts.items()}
+
+        # Switch a cui è collegato ogni host
+        self.host_dpid = {}
+        self.local_hosts = {dpid: [] for dpid in port_map}
+        for dpid, ports in port_map.items():
+            for name in sorted(ports):
+                if name in hosts:
+                    self.host_dpid[name] = dpid
+                    self.local_hosts[dpid].append(name)
+
+        # Cache: dpid -> lista di FlowEntry
+        self._tables = {}
+        self._overrides = {}
+        # (slice, tenant) -> meter_id, uguale su tutti gli switch
+        self._meter_ids = {}
+        # dpid -> {meter_id: MeterEntry}
+        self._meters = {}
+        # dpid -> {(porta primaria, porta di riserva): GroupEntry FAST_FAILOVER}
+        self._groups = {}
+        # dpid -> {porta host: regola ARP sostituita dal proxy}
+        self._arp_fallback = {}
+
+    # --- API ---
+    def compile(self):
+        tables = {dpid: {} for dpid in self.PORT_MAP}
+
+        # Regola di default (DROP) su ogni switch
+        for dpid in self.PORT_MAP:
+            self._add(tables, dpid, FlowEntry.make(PRIO_DROP, []))
+            if self.pipeline and self.local_hosts[dpid]:
+                self._add(tables, dpid, FlowEntry.make(PRIO_DROP, [], table_id=TABLE_FORWARD))
+            if self.spec.get('learn'):
+                # ARP da porte non ancora note: al controller
+                self._add(tables, dpid, FlowEntry.make(PRIO_LEARN, [ofproto_v1_3.OFPP_CONTROLLER],
+                                                       eth_type=ETH_TYPE_ARP))
+
+        self._groups = {}
+        self._compile_admission()
+        if self.spec.get('meters'):
+            self._compile_meters()
+        if 'pairs' in self.spec:
+            self._compile_pairs(tables)
+        roles = [self.spec.get(key) for key in ('default', 'arp')] + [name for name, _, _, _ in self.classes]
+        if 'default' in self.spec and all(name in self.slices for name in roles):
+            # Con la topologia scoperta a runtime le slice arrivano una alla volta
+            self._compile_service(tables)
+        if self.spec.get('arp_proxy'):
+            self._compile_arp_proxy(tables)
+
+        self._tables = {}
+        for dpid, entries in tables.items():
+            self._tables[dpid] = _prune_shadowed(list(entries.values()))
+        return self._tables
+
+    def flow_table(self, dpid):
+        if not self._tables:
+            self.compile()
+        if dpid not in self._tables:
+            # Switch sconosciuto: solo la regola di DROP
+            return [FlowEntry.make(PRIO_DROP, [])]
+        return self._tables[dpid]
+
+    def meter_table(self, dpid):
+        if not self._tables:
+            self.compile()
+        return sorted(self._meters.get(dpid, {}).values())
+
+    def group_table(self, dpid):
+        # Gruppi FAST_FAILOVER di dpid, in ordine di id
+        if not self._tables:
+            self.compile()
+        return sorted(self._groups.get(dpid, {}).values())
+
+    def meter_entry(self, dpid, meter_id):
+        return self._meters.get(dpid, {}).get(meter_id)
+
+    def compile_override(self, target_slice):
+        # Regole dinamiche (Priorità 250): il traffico standard verso gli host
+        # remoti viene spostato sulla slice indicata.
+        if target_slice in self._overrides:
+            return self._overrides[target_slice]
+
+        path = self.slices.get(target_slice, [])
+        overrides = {}
+        for dpid, local in self.local_hosts.items():
+            if not local or dpid not in path:
+                continue
+            if self.pipeline:
+                # Basta riclassificare il traffico standard di ogni host locale
+                overrides[dpid] = [
+                    FlowEntry.make(PRIO_OVERRIDE, self._sample(target_slice), cookie=COOKIE_OVERRIDE,
+                                   meter=self._meter(dpid, target_slice),
+                                   **self._classify(target_slice), in_port=self._port(dpid, h),
+                                   eth_type=ETH_TYPE_IP)
+                    for h in local
+                ]
+                continue
+            out_ports, group = self._slice_output(dpid, target_slice)
+            out_ports += self._sample(target_slice)
+            overrides[dpid] = [
+                FlowEntry.make(PRIO_OVERRIDE, out_ports, cookie=COOKIE_OVERRIDE, group=group,
+                               meter=self._meter(dpid, target_slice),
+                               eth_type=ETH_TYPE_IP, eth_dst=self.H[dst])
+                for dst in self._remote_hosts(dpid)
+            ]
+        self._overrides[target_slice] = overrides
+        return overrides
+
+    def host_pairs(self):
+        # Coppie (sorgente, destinazione) di traffico standard tra host remoti
+        return [(src, dst) for src, dpid in sorted(self.host_dpid.items())
+                for dst in self._remote_hosts(dpid)]
+
+    def compile_placement(self, placement):
+        # Regole per coppia di host (Priorità 260): coppia -> slice scelta dal
+        # PlacementEngine. Stanno sullo switch della sorgente e portano il
+        # cookie COOKIE_PAIR, così i loro contatori misurano la domanda.
+        overrides = {}
+        for (src, dst), name in sorted(placement.items()):
+            dpid = self.host_dpid.get(src)
+            if dpid is None or name not in self.slices:
+                continue
+            if self.pipeline:
+                out_ports, forward = [], self._classify(name)
+            else:
+                out_ports, group = self._slice_output(dpid, name)
+                forward = {'group': group}
+            overrides.setdefault(dpid, []).append(
+                FlowEntry.make(PRIO_PAIR, out_ports + self._sample(name), cookie=COOKIE_PAIR, meter=self._meter(dpid, name, src),
+                               **forward, eth_type=ETH_TYPE_IP, eth_src=self.H[src], eth_dst=self.H[dst]))
+        return overrides
+
+    def compile_elephant(self, dpid, flow, name):
+        # Regola per un singolo flusso pesante (Priorità 270) sullo switch
+        # d'ingresso: flow = (porta dell'host, IP sorgente, IP destinazione,
+        # protocollo, porta sorgente, porta destinazione) -> slice name, con
+        # il meter del tenant. None se il flusso non si può spostare lì.
+        in_port, ipv4_src, ipv4_dst, ip_proto, src_port, dst_port = flow
+        host = next((h for h in self.local_hosts.get(dpid, []) if self._port(dpid, h) == in_port), None)
+        l4 = {6: 'tcp', 17: 'udp'}.get(ip_proto)
+        path = self.slices.get(name)
+        if host is None or l4 is None or not path or dpid not in (path[0], path[-1]):
+            return None
+        if self.pipeline:
+            out_ports, forward = [], self._classify(name)
+        else:
+            out_ports, group = self._slice_output(dpid, name)
+            forward = {'group': group}
+        match = {f'{l4}_src': src_port, f'{l4}_dst': dst_port}
+        return FlowEntry.make(PRIO_ELEPHANT, out_ports, cookie=COOKIE_ELEPHANT, meter=self._meter(dpid, name, host),
+                              **forward, in_port=in_port, eth_type=ETH_TYPE_IP,
+                              ip_proto=ip_proto, ipv4_src=ipv4_src, ipv4_dst=ipv4_dst, **match)
+
+    def compile_select(self):
+        # Regole a Priorità 250 che mandano il traffico standard verso gli host
+        # remoti al gruppo SELECT dello switch: cambiano solo i pesi del gruppo
+        if 'select' in self._overrides:
+            return self._overrides['select']
+        overrides = {}
+        for dpid, local in self.local_hosts.items():
+            if local and self.select_ports(dpid):
+                overrides[dpid] = [
+                    FlowEntry.make(PRIO_OVERRIDE, [], cookie=COOKIE_SELECT, group=GROUP_SELECT,
+                                   eth_type=ETH_TYPE_IP, eth_dst=self.H[dst])
+                    for dst in self._remote_hosts(dpid)
+                ]
+        self._overrides['select'] = overrides
+        return overrides
+
+    def select_ports(self, dpid):
+        # slice -> porta di uscita, per le slice di cui dpid è un estremo
+        return {name: self._port(dpid, self._endpoint_neighbor(path, dpid))
+                for name, path in sorted(self.slices.items()) if dpid in (path[0], path[-1])}
+
+    def select_group(self, dpid, weights):
+        # weights: slice -> peso del bucket (intero). Con il failover ogni
+        # bucket punta al gruppo FAST_FAILOVER della sua slice.
+        buckets = []
+        for name, port in self.select_ports(dpid).items():
+            out_ports, group = self._slice_output(dpid, name)
+            buckets.append(Bucket(port if group is None else None, weights.get(name, 0), group=group))
+        return GroupEntry(GROUP_SELECT, 'select', tuple(buckets))
+
+    def flow_table_all(self):
+        if not self._tables:
+            self.compile()
+        return self._tables
+
+    def slice_ports(self, name):
+        # (dpid, porta) di uscita lungo i link della slice, nei due versi
+        path = self.slices[name]
+        ports = []
+        for a, b in zip(path, path[1:]):
+            ports.append((a, self._port(a, b)))
+            ports.append((b, self._port(b, a)))
+        return ports
+
+    def link_capacities(self):
+        # (dpid, porta) -> capacità (bit/s) dei link delle slice
+        capacity = self.spec.get('capacity', {})
+        links = {}
+        for name in self.slices:
+            if name in capacity:
+                for dpid, port in self.slice_ports(name):
+                    links[(dpid, port)] = capacity[name]
+        return links
+
+    def edge_switches(self):
+        # dpid degli switch con host collegati
+        return sorted(dpid for dpid, local in self.local_hosts.items() if local)
+
+    def arp_fallback(self, dpid, in_port):
+        # Regola ARP che il proxy ha sostituito sulla porta host: le richieste
+        # che il controller non sa risolvere ripartono con le sue azioni
+        if not self._tables:
+            self.compile()
+        return self._arp_fallback.get(dpid, {}).get(in_port)
+
+    def arp_allowed(self, src_mac, dst_mac):
+        # Il proxy risponde solo tra host che possono parlarsi
+        if 'pairs' not in self.spec:
+            return True
+        pair = (self.host_of.get(src_mac), self.host_of.get(dst_mac))
+        return any(self.spec['pairs'].get(p) in self.slices for p in (pair, pair[::-1]))
+
+    def rule_count(self):
+        return sum(len(entries) for entries in self.flow_table_all().values())
+
+    # --- TOPOLOGY SLICING (coppie di host) ---
+    def _compile_pairs(self, tables):
+        flood = ofproto_v1_3.OFPP_FLOOD
+        # (dpid, slice) -> porte degli host della slice su dpid: l'ARP che
+        # esce dalla slice va a tutti, non solo all'ultima coppia vista
+        # Coppie di cui si conoscono già entrambi gli host e la slice
+        pairs = {pair: name for pair, name in self.spec['pairs'].items()
+                 if name in self.slices and all(h in self.host_dpid for h in pair)}
+        slice_hosts = {}
+        for pair, name in pairs.items():
+            for h in pair:
+                slice_hosts.setdefault((self.host_dpid[h], name), set()).add(self._port(self.host_dpid[h], h))
+
+        for (a, b), name in pairs.items():
+            path = self._oriented(self.slices[name], self.host_dpid[a], self.host_dpid[b])
+            for src, dst, hops in ((a, b, path), (b, a, path[::-1])):
+                last = len(hops) - 1
+                for i, dpid in enumerate(hops):
+                    in_port = self._port(dpid, src if i == 0 else hops[i - 1])
+                    out_port = self._port(dpid, dst if i == last else hops[i + 1])
+
+                    if i == 0 or i == last:
+                        arp_ports = [out_port] if i == 0 else sorted(slice_hosts[(dpid, name)])
+                        arp = FlowEntry.make(PRIO_ARP, arp_ports, in_port=in_port, eth_type=ETH_TYPE_ARP)
+                    if self.pipeline and (i == 0 or i == last):
+                        self._add(tables, dpid, arp)
+                        self._compile_pairs_edge(tables, dpid, name, dst, in_port, out_port, i == 0)
+                        continue
+                    if i == 0 or i == last:
+                        # Switch di bordo: isolamento su MAC Src/Dst; il meter
+                        # della slice solo all'ingresso
+                        meter = self._meter(dpid, name) if i == 0 else None
+                        data = FlowEntry.make(PRIO_SLICE, [out_port], meter=meter,
+                                              eth_src=self.H[src], eth_dst=self.H[dst])
+                    elif self._slice_count(dpid) > 1:
+                        # Transito condiviso tra più slice: serve la porta d'ingresso
+                        data = FlowEntry.make(PRIO_SLICE, [out_port],
+                                              in_port=in_port, eth_dst=self.H[dst])
+                        arp = FlowEntry.make(PRIO_ARP, [out_port],
+                                             in_port=in_port, eth_type=ETH_TYPE_ARP)
+                    else:
+                        # Transito dedicato: basta la destinazione (tunnel)
+                        data = FlowEntry.make(PRIO_SLICE, [out_port], eth_dst=self.H[dst])
+                        arp = FlowEntry.make(PRIO_ARP, [flood], eth_type=ETH_TYPE_ARP)
+
+                    self._add(tables, dpid, arp)
+                    self._add(tables, dpid, data)
+
+    def _compile_pairs_edge(self, tables, dpid, name, host, in_port, out_port, ingress):
+        # Pipeline: all'ingresso la tabella 0 assegna la slice dalla porta
+        # dell'host e la tabella 1 inoltra su slice e destinazione; all'uscita
+        # la consegna locale dipende solo dalla destinazione
+        if ingress:
+            self._add(tables, dpid, FlowEntry.make(PRIO_SLICE, [], meter=self._meter(dpid, name),
+                                                   **self._classify(name), in_port=in_port, eth_type=ETH_TYPE_IP))
+            self._add(tables, dpid, FlowEntry.make(PRIO_SLICE, [out_port], table_id=TABLE_FORWARD,
+                                                   metadata=self.slice_id[name], eth_dst=self.H[host]))
+        else:
+            self._add(tables, dpid, FlowEntry.make(PRIO_SLICE, [], goto=TABLE_FORWARD,
+                                                   in_port=in_port, eth_type=ETH_TYPE_IP))
+            self._add(tables, dpid, FlowEntry.make(PRIO_LOCAL, [out_port], table_id=TABLE_FORWARD,
+                                                   eth_dst=self.H[host]))
+
+    # --- PROXY ARP ---
+    def _compile_arp_proxy(self, tables):
+        # Sulle porte host l'ARP va solo al controller; la regola che c'era
+        # prima resta come percorso per le richieste non risolte
+        controller = ofproto_v1_3.OFPP_CONTROLLER
+        self._arp_fallback = {}
+        for dpid, local in self.local_hosts.items():
+            rules = _arp_rules(tables[dpid].values())
+            for h in local:
+                port = self._port(dpid, h)
+                prev = _arp_rule(rules, port)
+                if prev is not None:
+                    prev = prev._replace(out_ports=tuple(p for p in prev.out_ports if p != controller))
+                    if prev.out_ports or prev.group is not None:
+                        self._arp_fallback.setdefault(dpid, {})[port] = prev
+                self._add(tables, dpid, FlowEntry.make(PRIO_ARP_PROXY, [controller], cookie=COOKIE_ARP,
+                                                       in_port=port, eth_type=ETH_TYPE_ARP))
+
+    # --- SERVICE SLICING (classi di traffico / standard) ---
+    def _compile_service(self, tables):
+        arp_path = self.slices[self.spec['arp']]
+        # Nel transito ogni slice inoltra alla banda della sua classe
+        prio_of = {name: PRIO_SLICE for name in self.slices}
+        prio_of.update((name, band) for name, _, band, _ in self.classes)
+
+        for dpid in self.PORT_MAP:
+            local = self.local_hosts[dpid]
+            if local:
+                self._compile_service_edge(tables, dpid, local, arp_path)
+                continue
+
+            # Switch di transito: inoltro per porta d'ingresso lungo la slice
+            for name, path in self.slices.items():
+                if dpid not in path[1:-1]:
+                    continue
+                prev_hop, next_hop = self._transit_neighbors(path, dpid)
+                fwd, back = self._port(dpid, prev_hop), self._port(dpid, next_hop)
+                for in_port, out_port in ((fwd, back), (back, fwd)):
+                    if self.spec.get('failover'):
+                        # Link successivo guasto: si torna indietro dalla porta
+                        # d'ingresso, lo switch di bordo rimanda sull'altra slice
+                        out_ports = []
+                        group = self._ff_group(dpid, out_port, in_port, backup_out=ofproto_v1_3.OFPP_IN_PORT)
+                    else:
+                        out_ports, group = [out_port], None
+                    self._add(tables, dpid, FlowEntry.make(prio_of[name], out_ports, group=group,
+                                                           in_port=in_port, eth_type=ETH_TYPE_IP))
+
+            if dpid in arp_path[1:-1]:
+                if self._slice_count(dpid) > 1:
+                    prev_hop, next_hop = self._transit_neighbors(arp_path, dpid)
+                    fwd, back = self._port(dpid, prev_hop), self._port(dpid, next_hop)
+                    for in_port, out_port in ((fwd, back), (back, fwd)):
+                        self._add(tables, dpid, FlowEntry.make(PRIO_ARP, [out_port],
+                                                               in_port=in_port, eth_type=ETH_TYPE_ARP))
+                else:
+                    self._add(tables, dpid, FlowEntry.make(PRIO_ARP, [ofproto_v1_3.OFPP_FLOOD],
+                                                           eth_type=ETH_TYPE_ARP))
+            elif self.spec.get('failover') and self._slice_count(dpid) == 1:
+                # Con il failover l'ARP può essere deviato su un'altra slice
+                self._add(tables, dpid, FlowEntry.make(PRIO_ARP, [ofproto_v1_3.OFPP_FLOOD], eth_type=ETH_TYPE_ARP))
+
+    def _compile_service_edge(self, tables, dpid, local, arp_path):
+        host_ports = [self._port(dpid, h) for h in local]
+
+        default_name = self.spec['default']
+
+        # ARP: "flood controllato" sugli host locali e sulla slice ARP
+        if dpid in arp_path:
+            arp_ports, group = self._slice_output(dpid, self.spec['arp'])
+            if self.spec.get('learn'):
+                arp_ports = arp_ports + [ofproto_v1_3.OFPP_CONTROLLER]
+            self._add(tables, dpid, FlowEntry.make(PRIO_ARP, host_ports + arp_ports, group=group,
+                                                   eth_type=ETH_TYPE_ARP))
+
+        if self.pipeline:
+            self._compile_service_pipeline(tables, dpid, local, host_ports)
+            return
+
+        outputs = {name: self._slice_output(dpid, name) for name, _, _, _ in self.classes}
+        default_ports, default_group = self._slice_output(dpid, default_name)
+
+        for h, port in zip(local, host_ports):
+            for name, match, band, cookie in self.classes:
+                # Classe uscente dagli host locali ammessi -> sua slice, col
+                # meter del tenant
+                if self._admitted(name, h):
+                    out_ports, group = outputs[name]
+                    self._add(tables, dpid, FlowEntry.make(band, out_ports, cookie=cookie, group=group,
+                                                           meter=self._meter(dpid, name, h), in_port=port, **match))
+                # Classe verso gli host locali (copre anche il traffico di ritorno)
+                self._add(tables, dpid, FlowEntry.make(band + PRIO_VIDEO_LOCAL - PRIO_VIDEO, [port],
+                                                       eth_dst=self.H[h], **match))
+            # Standard verso gli host locali
+            self._add(tables, dpid, FlowEntry.make(PRIO_LOCAL, [port], eth_type=ETH_TYPE_IP, eth_dst=self.H[h]))
+
+        # Tutto il resto del traffico IP verso host remoti -> slice standard
+        for dst in self._remote_hosts(dpid):
+            self._add(tables, dpid, FlowEntry.make(PRIO_SLICE, default_ports + self._sample(default_name),
+                                                   group=default_group,
+                                                   meter=self._meter(dpid, default_name),
+                                                   eth_type=ETH_TYPE_IP, eth_dst=self.H[dst]))
+
+        if self.spec.get('failover'):
+            # Traffico rimandato indietro da un transito con il link guasto:
+            # riparte dalla stessa porta verso un'altra slice
+            ports = self.select_ports(dpid)
+            for name, in_port in ports.items():
+                backup = self._backup_port(dpid, name)
+                if backup is None:
+                    continue
+                for dst in self._remote_hosts(dpid):
+                    self._add(tables, dpid, FlowEntry.make(PRIO_CRANKBACK, [backup], in_port=in_port,
+                                                           eth_type=ETH_TYPE_IP, eth_dst=self.H[dst]))
+
+    def _compile_service_pipeline(self, tables, dpid, local, host_ports):
+        default_name = self.spec['default']
+
+        for h, port in zip(local, host_ports):
+            # Tabella 0: classi e standard di ogni host locale -> id della slice
+            for name, match, band, cookie in self.classes:
+                if self._admitted(name, h):
+                    self._add(tables, dpid, FlowEntry.make(band, [], cookie=cookie, meter=self._meter(dpid, name, h),
+                                                           **self._classify(name), in_port=port, **match))
+            self._add(tables, dpid, FlowEntry.make(PRIO_SLICE, self._sample(default_name),
+                                                   meter=self._meter(dpid, default_name),
+                                                   **self._classify(default_name), in_port=port,
+                                                   eth_type=ETH_TYPE_IP))
+            # Tabella 1: consegna locale, qualunque sia la slice
+            self._add(tables, dpid, FlowEntry.make(PRIO_LOCAL, [port], table_id=TABLE_FORWARD,
+                                                   eth_type=ETH_TYPE_IP, eth_dst=self.H[h]))
+
+        for name, port in self.select_ports(dpid).items():
+            # Tabella 0: traffico in arrivo dalla slice. Con il failover quello
+            # per host remoti (rimandato da un transito) riparte sull'altra slice.
+            backup = self._backup_slice(dpid, name) if self.spec.get('failover') else None
+            classify = self._classify(backup) if backup else {'goto': TABLE_FORWARD}
+            self._add(tables, dpid, FlowEntry.make(PRIO_SLICE, [], **classify, in_port=port, eth_type=ETH_TYPE_IP))
+            # Tabella 1: una regola per slice verso gli host remoti
+            out_ports, group = self._slice_output(dpid, name)
+            self._add(tables, dpid, FlowEntry.make(PRIO_SLICE, out_ports, group=group, table_id=TABLE_FORWARD,
+                                                   metadata=self.slice_id[name], eth_type=ETH_TYPE_IP))
+
+    def _traffic_classes(self):
+        # Dal classificatore della specifica (di default il solo video sulla
+        # slice 'video'): la prima classe elencata ha la precedenza
+        classifier = self.spec.get('classifier')
+        if classifier is None:
+            classifier = {self.spec['video']: VIDEO_MATCH} if 'video' in self.spec else {}
+        bands = self.spec.get('priority', {})
+        classes = []
+        for i, (name, match) in enumerate(classifier.items()):
+            band = bands.get(name, PRIO_VIDEO + PRIO_CLASS_STEP * (len(classifier) - 1 - i))
+            cookie = COOKIE_VIDEO if name == self.spec.get('video') else COOKIE_CLASS
+            classes.append((name, dict({'eth_type': ETH_TYPE_IP}, **match), band, cookie))
+        # Ogni banda sopra i flussi pesanti, con la sua consegna locale, senza
+        # sovrapporsi alle altre
+        used = [priority for _, _, band, _ in classes for priority in (band, band + PRIO_VIDEO_LOCAL - PRIO_VIDEO)]
+        if len(set(used)) != len(used) or any(not PRIO_ELEPHANT < p < PRIO_POLICY_MAX for p in used):
+            raise ValueError(f"Bande di priorità delle classi non valide: {sorted(used)}")
+        return classes
+
+    def _admitted(self, name, host):
+        # Senza 'tenant_rate' sulla slice ogni host locale ci può stare
+        return name not in self.spec.get('tenant_rate', {}) or (name, host) in self.admitted
+
+    def _classify(self, name):
+        # Istruzioni della tabella 0: id della slice nei metadata, poi tabella 1
+        return {'write_metadata': self.slice_id[name], 'goto': TABLE_FORWARD}
+
+    def _sample(self, name):
+        # Con 'elephants' il traffico standard verso la slice di default ne
+        # esce anche verso il controller: il meter della regola, applicato
+        # prima delle azioni, limita anche le copie
+        if self.spec.get('elephants') and name == self.spec.get('default'):
+            return [ofproto_v1_3.OFPP_CONTROLLER]
+        return []
+
+    # --- FAILOVER ---
+    def _slice_output(self, dpid, name):
+        # (porte, gruppo) per uscire da dpid verso la slice: con il failover
+        # un gruppo FAST_FAILOVER con la porta di un'altra slice come riserva
+        port = self._port(dpid, self._endpoint_neighbor(self.slices[name], dpid))
+        backup = self._backup_port(dpid, name)
+        if not self.spec.get('failover') or backup is None:
+            return [port], None
+        return [], self._ff_group(dpid, port, backup)
+
+    def _backup_slice(self, dpid, name):
+        for other in self.select_ports(dpid):
+            if other != name:
+                return other
+        return None
+
+    def _backup_port(self, dpid, name):
+        backup = self._backup_slice(dpid, name)
+        return None if backup is None else self.select_ports(dpid)[backup]
+
+    def _ff_group(self, dpid, primary, watch_backup, backup_out=None):
+        # Gruppo FAST_FAILOVER: primary finché è attiva, poi la riserva
+        # (backup_out, di default la porta osservata watch_backup)
+        groups = self._groups.setdefault(dpid, {})
+        key = (primary, watch_backup, backup_out)
+        if key not in groups:
+            out = watch_backup if backup_out is None else backup_out
+            buckets = (Bucket(primary, watch_port=primary), Bucket(out, watch_port=watch_backup))
+            groups[key] = GroupEntry(GROUP_FAILOVER_BASE + len(groups), 'ff', buckets)
+        return groups[key].group_id
+
+    # --- AMMISSIONE DEI TENANT ---
+    def _compile_admission(self):
+        # Sulle slice con 'tenant_rate' ogni host locale prenota il suo rate
+        # sullo switch d'ingresso; chi era già ammesso tiene il posto, gli
+        # host spariti lo liberano
+        rates = self.spec.get('tenant_rate', {})
+        admission = self.admission
+        admission.capacity = dict(self.spec.get('capacity', {}))
+        admission.retain(lambda name, dpid, h: name in rates and h in self.local_hosts.get(dpid, []))
+        self.admitted, self.rejected = set(), set()
+        for dpid, local in sorted(self.local_hosts.items()):
+            for name, path in sorted(self.slices.items()):
+                if name not in rates or not local or dpid not in (path[0], path[-1]):
+                    continue
+                for h in local:
+                    admitted = admission.admit(name, dpid, h, rates[name])
+                    (self.admitted if admitted else self.rejected).add((name, h))
+
+    # --- METER ---
+    def _compile_meters(self):
+        # Sugli switch d'ingresso di ogni slice: un meter per la slice intera
+        # (regole aggregate a Priorità 200/250) e uno per ogni host locale
+        # (regole per host a Priorità 260/300), con una quota equa della capacità
+        capacity = self.spec.get('capacity', {})
+        self._meters = {}
+        for dpid, local in self.local_hosts.items():
+            for name, path in sorted(self.slices.items()):
+                if not local or name not in capacity or dpid not in (path[0], path[-1]):
+                    continue
+                meters = self._meters.setdefault(dpid, {})
+                # Nel Topology Slicing ogni slice è già di una sola coppia;
+                # con 'tenant_rate' solo gli host ammessi, al rate garantito
+                tenants = [] if 'pairs' in self.spec else [h for h in local if self._admitted(name, h)]
+                rates = self.spec.get('tenant_rate', {})
+                for tenant in [None] + tenants:
+                    if tenant is None:
+                        rate = capacity[name]
+                    else:
+                        rate = rates.get(name, capacity[name] / len(local))
+                    meter_id = self._meter_ids.setdefault((name, tenant), len(self._meter_ids) + 1)
+                    meters[meter_id] = MeterEntry(meter_id, rate, name, tenant)
+
+    def _meter(self, dpid, name, tenant=None):
+        # meter_id da usare su dpid, None se i meter sono disattivati
+        meter_id = self._meter_ids.get((name, tenant))
+        if meter_id is None or meter_id not in self._meters.get(dpid, {}):
+            return None
+        return meter_id
+
+    # --- UTILITY ---
+    def _add(self, tables, dpid, entry):
+        key = entry.key()
+        prev = tables[dpid].get(key)
+        if prev is not None and prev.action_key() != entry.action_key():
+            raise ValueError(f"Conflitto di policy su s{dpid}: {entry} / {prev}")
+        tables[dpid][key] = entry
+
+    def _dpid(self, name):
+        return int(name[1:])
+
+    def _port(self, dpid, neighbor):
+        if isinstance(neighbor, int):
+            neighbor = f"s{neighbor}"
+        return self.PORT_MAP[dpid][neighbor]
+
+    def _remote_hosts(self, dpid):
+        return sorted(h for h, d in self.host_dpid.items() if d != dpid)
+
+    def _slice_count(self, dpid):
+        return sum(1 for path in self.slices.values() if dpid in path)
+
+    def _oriented(self, path, src_dpid, dst_dpid):
+        if path[0] == src_dpid and path[-1] == dst_dpid:
+            return path
+        if path[-1] == src_dpid and path[0] == dst_dpid:
+            return path[::-1]
+        raise ValueError(f"Gli host su s{src_dpid}/s{dst_dpid} non sono agli estremi della slice {path}")
+
+    def _endpoint_neighbor(self, path, dpid):
+        # Gli host sono collegati agli estremi della slice
+        if path[0] == dpid:
+            return path[1]
+        if path[-1] == dpid:
+            return path[-2]
+        raise ValueError(f"s{dpid} non è un estremo della slice {path}")
+
+    def _transit_neighbors(self, path, dpid):
+        i = path.index(dpid)
+        return path[i - 1], path[i + 1]
+
+
+def _arp_rules(entries):
+    # Regole della tabella 0 che l'ARP può usare, per porta d'ingresso
+    # (None: valide su tutte le porte); a parità si tiene la priorità maggiore
+    rules = {}
+    for entry in entries:
+        match = dict(entry.match)
+        if entry.table_id != 0 or not set(match) <= {'in_port', 'eth_type'}:
+            continue
+        if match.get('eth_type', ETH_TYPE_ARP) != ETH_TYPE_ARP:
+            continue
+        port = match.get('in_port')
+        if port not in rules or entry.priority > rules[port].priority:
+            rules[port] = entry
+    return rules
+
+
+def _arp_rule(rules, in_port):
+    # La regola che un pacchetto ARP da in_port userebbe
+    candidates = [rule for rule in (rules.get(in_port), rules.get(None)) if rule is not None]
+    return max(candidates, key=lambda rule: rule.priority) if candidates else None
+
+
+def _prune_shadowed(entries):
+    # Elimina le regole che non possono mai essere usate: una regola è coperta
+    # se un'altra a priorità maggiore ha un match più generico (sottoinsieme).
+    # I match hanno pochi campi: si cercano i loro sottoinsiemi tra quelli
+    # delle regole già tenute invece di confrontare ogni coppia di regole.
+    entries = sorted(entries, key=lambda e: -e.priority)
+    kept = []
+    higher, same, priority = set(), [], None
+    for entry in entries:
+        if entry.priority != priority:
+            higher.update(same)
+            same, priority = [], entry.priority
+        if any((entry.table_id, sub) in higher
+               for n in range(len(entry.match) + 1) for sub in combinations(entry.match, n)):
+            continue
+        kept.append(entry)
+        same.append((entry.table_id, entry.match))
+    return kept
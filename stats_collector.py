@@ -0,0 +1,88 @@
+# stats_collector.py
+# Raccolta delle statistiche a "round" con scadenza.
+# Ogni richiesta è tracciata per (dpid, xid): alla risposta si misura la
+# latenza richiesta -> risposta; allo scadere del round i datapath che non
+# hanno risposto vengono marcati esplicitamente come 'missing', e le
+# risposte che arrivano dopo la scadenza come 'late'.
+from collections import deque
+
+STATUS_OK = 'ok'
+STATUS_LATE = 'late'
+STATUS_MISSING = 'missing'
+
+
+class StatsCollector(object):
+
+    def __init__(self, clock, history=32, keep_rounds=4, observe=None):
+        self.clock = clock
+        # observe(dpid, latenza) per ogni risposta attesa (metriche)
+        self.observe = observe
+        self.history = history
+        # Richieste più vecchie di keep_rounds round vengono dimenticate
+        self.keep_rounds = keep_rounds
+
+        self.round = 0
+        # (dpid, xid) -> (istante di invio, round, scaduta)
+        self.outstanding = {}
+        # dpid -> ultime latenze (secondi)
+        self.latency = {}
+        # dpid -> stato dell'ultima richiesta
+        self.status = {}
+        # dpid -> scadenze mancate in totale
+        self.missed = {}
+
+    def start_round(self):
+        self.round += 1
+        for key in [key for key, (_, rnd, _) in self.outstanding.items()
+                    if rnd <= self.round - self.keep_rounds]:
+            del self.outstanding[key]
+        return self.round
+
+    def sent(self, dpid, xid):
+        self.outstanding[(dpid, xid)] = (self.clock(), self.round, False)
+
+    def received(self, dpid, xid):
+        # Restituisce lo stato della risposta, None se non era stata richiesta
+        sent = self.outstanding.pop((dpid, xid), None)
+        if sent is None:
+            return None
+
+        start, _, expired = sent
+        latencies = self.latency.get(dpid)
+        if latencies is None:
+            latencies = self.latency[dpid] = deque(maxlen=self.history)
+        latency = self.clock() - start
+        latencies.append(latency)
+        if self.observe is not None:
+            self.observe(dpid, latency)
+
+        status = STATUS_LATE if expired else STATUS_OK
+        self.status[dpid] = status
+        return status
+
+    def close_round(self):
+        # Scadenza del round: restituisce i dpid senza risposta
+        missing = set()
+        for key, (start, rnd, expired) in self.outstanding.items():
+            if not expired:
+                self.outstanding[key] = (start, rnd, True)
+                missing.add(key[0])
+        missing = sorted(missing)
+        for dpid in missing:
+            self.status[dpid] = STATUS_MISSING
+            self.missed[dpid] = self.missed.get(dpid, 0) + 1
+        return missing
+
+    def forget(self, dpid):
+        for key in [key for key in self.outstanding if key[0] == dpid]:
+            del self.outstanding[key]
+        self.latency.pop(dpid, None)
+        self.status.pop(dpid, None)
+
+    def latency_summary(self):
+        # dpid -> (ultima, media, massima) latenza in secondi
+        summary = {}
+        for dpid, latencies in self.latency.items():
+            if latencies:
+                summary[dpid] = (latencies[-1], sum(latencies) / len(latencies), max(latencies))
+        return summary
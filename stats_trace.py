@@ -0,0 +1,282 @@
+# stats_trace.py
+# Registrazione e riproduzione delle risposte alle statistiche del
+# controller dinamico. Con $SLICE_STATS_TRACE il controller scrive ogni
+# risposta (flow stats, aggregate e meter stats) in coda a un file binario:
+# dpid, istante di arrivo, cookie, tabella e priorità, match e contatori.
+# I match sono scritti
+# una volta sola e poi indicati con un numero, ogni risposta è un record a
+# sé aggiunto in fondo al file (un crash lascia al più l'ultimo a metà).
+# Il riproduttore legge il file un record alla volta e lo passa agli handler
+# del controller vero sul tempo registrato, senza attese: ore di traffico
+# si rivedono in pochi secondi con soglie e isteresi diverse, e si stampa
+# la sequenza delle transizioni di slice.
+#
+# Uso: ryu-manager ... con SLICE_STATS_TRACE=stats.trace per registrare
+#      python stats_trace.py stats.trace [--topology FILE.json] [--steering global]
+#                                        [--threshold 1.0] [--dwell-default 0] [--dwell-video 6]
+#                                        [--alpha 0.3]
+import argparse
+import json
+import os
+import struct
+import time
+from collections import namedtuple
+
+TRACE_ENV = 'SLICE_STATS_TRACE'
+MAGIC = b'NCIT\x02'
+# Formato precedente, senza tabella e priorità delle flow stats: si legge
+# ancora, con tabella e priorità a 0
+MAGIC_V1 = b'NCIT\x01'
+
+KIND_MATCH = 0
+KIND_FLOW = 1
+KIND_AGGREGATE = 2
+KIND_METER = 3
+
+_KIND = struct.Struct('<B')
+# Definizione di un match: id, lunghezza del JSON
+_MATCH = struct.Struct('<IH')
+# Intestazione di una risposta: dpid, istante, numero di voci
+_REPLY = struct.Struct('<QdI')
+# Voci: cookie, id del match, tabella, priorità, durata, pacchetti, byte
+_FLOW = struct.Struct('<QIBHIIQQ')
+_FLOW_V1 = struct.Struct('<QIIIQQ')
+# pacchetti, byte, flussi
+_AGGREGATE = struct.Struct('<QQI')
+# meter_id, durata, pacchetti e byte in ingresso, pacchetti e byte scartati
+_METER = struct.Struct('<IIIQQQQ')
+
+# Voci ricostruite, con gli attributi che leggono gli handler del controller
+FlowStat = namedtuple('FlowStat', ['cookie', 'match', 'table_id', 'priority', 'duration_sec', 'duration_nsec',
+                                   'packet_count', 'byte_count'])
+AggregateStat = namedtuple('AggregateStat', ['packet_count', 'byte_count', 'flow_count'])
+MeterStat = namedtuple('MeterStat', ['meter_id', 'duration_sec', 'duration_nsec', 'packet_in_count',
+                                     'byte_in_count', 'band_stats'])
+BandStat = namedtuple('BandStat', ['packet_band_count', 'byte_band_count'])
+
+
+class TraceWriter(object):
+
+    def __init__(self, path):
+        self.path = path
+        # match (tupla di coppie) -> id, anche quelli già nel file
+        self.matches = {}
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            # Si aggiunge in coda solo a una traccia dello stesso formato
+            with open(path, 'rb') as f:
+                if f.read(len(MAGIC)) != MAGIC:
+                    raise ValueError(f"{path}: traccia di un altro formato, registrare su un file nuovo")
+            known = {}
+            for _ in read_trace(path, known):
+                pass
+            self.matches = {tuple(match.items()): match_id for match_id, match in known.items()}
+        self.file = open(path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+        self.replies = 0
+
+    def flow_reply(self, dpid, timestamp, body):
+        buf = bytearray()
+        entries = [_FLOW.pack(stat.cookie, self._match_id(buf, stat.match), stat.table_id, stat.priority,
+                              stat.duration_sec, stat.duration_nsec, stat.packet_count, stat.byte_count)
+                   for stat in body]
+        buf += _KIND.pack(KIND_FLOW) + _REPLY.pack(dpid, timestamp, len(entries))
+        buf += b''.join(entries)
+        self._write(buf)
+
+    def aggregate_reply(self, dpid, timestamp, stat):
+        self._write(_KIND.pack(KIND_AGGREGATE) + _REPLY.pack(dpid, timestamp, 1)
+                    + _AGGREGATE.pack(stat.packet_count, stat.byte_count, stat.flow_count))
+
+    def meter_reply(self, dpid, timestamp, body):
+        buf = bytearray(_KIND.pack(KIND_METER) + _REPLY.pack(dpid, timestamp, len(body)))
+        for stat in body:
+            # Le bande si sommano, come fa il controller
+            buf += _METER.pack(stat.meter_id, stat.duration_sec, stat.duration_nsec, stat.packet_in_count,
+                               stat.byte_in_count, sum(band.packet_band_count for band in stat.band_stats),
+                               sum(band.byte_band_count for band in stat.band_stats))
+        self._write(buf)
+
+    def close(self):
+        self.file.close()
+
+    def _match_id(self, buf, match):
+        # Un match nuovo va definito prima della risposta che lo usa
+        key = tuple(match.items())
+        match_id = self.matches.get(key)
+        if match_id is None:
+            match_id = self.matches[key] = len(self.matches)
+            data = json.dumps(key).encode()
+            buf += _KIND.pack(KIND_MATCH) + _MATCH.pack(match_id, len(data)) + data
+        return match_id
+
+    def _write(self, buf):
+        # Un record per volta e subito su disco: il file resta leggibile
+        # anche mentre il controller è in esecuzione
+        self.file.write(buf)
+        self.file.flush()
+        self.replies += 1
+
+
+def open_trace(path):
+    # Writer per il file in path, None se la registrazione è spenta
+    return TraceWriter(path) if path else None
+
+
+def read_trace(path, matches=None):
+    # Genera (tipo, dpid, istante, voci) leggendo un record alla volta.
+    # Un record finale troncato (registrazione interrotta) viene ignorato
+    matches = {} if matches is None else matches
+    with open(path, 'rb') as f:
+        magic = f.read(len(MAGIC))
+        if magic not in (MAGIC, MAGIC_V1):
+            raise ValueError(f"{path}: non è una traccia di statistiche")
+        flow = _FLOW if magic == MAGIC else _FLOW_V1
+        while True:
+            head = f.read(_KIND.size)
+            if not head:
+                return
+            kind = head[0]
+            if kind == KIND_MATCH:
+                data = f.read(_MATCH.size)
+                if len(data) < _MATCH.size:
+                    return
+                match_id, length = _MATCH.unpack(data)
+                data = f.read(length)
+                if len(data) < length:
+                    return
+                matches[match_id] = {field: tuple(value) if isinstance(value, list) else value
+                                     for field, value in json.loads(data)}
+                continue
+
+            data = f.read(_REPLY.size)
+            if len(data) < _REPLY.size:
+                return
+            dpid, timestamp, count = _REPLY.unpack(data)
+            entry = {KIND_FLOW: flow, KIND_AGGREGATE: _AGGREGATE, KIND_METER: _METER}.get(kind)
+            if entry is None:
+                raise ValueError(f"{path}: record sconosciuto {kind} a {f.tell() - 1}")
+            data = f.read(entry.size * count)
+            if len(data) < entry.size * count:
+                return
+            values = entry.iter_unpack(data)
+            if kind == KIND_FLOW and flow is _FLOW_V1:
+                body = [FlowStat(cookie, matches[match_id], 0, 0, sec, nsec, packets, byte_count)
+                        for cookie, match_id, sec, nsec, packets, byte_count in values]
+            elif kind == KIND_FLOW:
+                body = [FlowStat(cookie, matches[match_id], *value) for cookie, match_id, *value in values]
+            elif kind == KIND_AGGREGATE:
+                body = [AggregateStat(*value) for value in values]
+            else:
+                body = [MeterStat(meter_id, sec, nsec, packets, byte_count, [BandStat(band_packets, band_bytes)])
+                        for meter_id, sec, nsec, packets, byte_count, band_packets, band_bytes in values]
+            yield kind, dpid, timestamp, body
+
+
+class _Datapath(object):
+    # Quanto serve agli handler: l'id e le costanti OpenFlow
+    def __init__(self, dpid, ofproto):
+        self.id = dpid
+        self.ofproto = ofproto
+
+
+class _Reply(object):
+    def __init__(self, datapath, body):
+        self.datapath = datapath
+        self.body = body
+        self.flags = 0
+        self.xid = 0
+
+
+class _Event(object):
+    def __init__(self, msg):
+        self.msg = msg
+
+
+def replay(path, ctrl):
+    # Passa la traccia agli handler di ctrl (senza datapath collegati, quindi
+    # nessun FlowMod parte davvero) e restituisce le decisioni prese:
+    # [(istante, tipo, dettaglio)], più record e durata della traccia
+    from ryu.ofproto import ofproto_v1_3
+
+    now = [0.0]
+    ctrl.clock = lambda: now[0]
+    timeline = []
+
+    def record(name, describe):
+        method = getattr(ctrl, name)
+
+        def wrapper(arg):
+            timeline.append((now[0], name, describe(arg)))
+            return method(arg)
+        setattr(ctrl, name, wrapper)
+
+    record('apply_slice_policy', lambda target: f"traffico standard -> {target}")
+    record('apply_placement', lambda placement: ", ".join(
+        f"{src}->{dst} su {name}" for (src, dst), name in sorted(placement.items())
+        if ctrl.pairs.pair_slice.get((src, dst)) != name))
+    record('apply_select_weights', lambda weights: "pesi " + ", ".join(
+        f"{name} {weight}" for name, weight in sorted(weights.items())))
+
+    handlers = {KIND_FLOW: ctrl._flow_stats_reply_handler,
+                KIND_AGGREGATE: ctrl._aggregate_stats_reply_handler,
+                KIND_METER: ctrl._meter_stats_reply_handler}
+    datapaths = {}
+    records = 0
+    first = None
+    for kind, dpid, timestamp, body in read_trace(path):
+        if first is None:
+            first = timestamp
+        now[0] = timestamp
+        dp = datapaths.get(dpid)
+        if dp is None:
+            dp = datapaths[dpid] = _Datapath(dpid, ofproto_v1_3)
+        # L'aggregate ha una sola voce, che è il corpo della risposta
+        handlers[kind](_Event(_Reply(dp, body[0] if kind == KIND_AGGREGATE else body)))
+        records += 1
+    start = first or 0.0
+    return [(at - start, name, detail) for at, name, detail in timeline], records, now[0] - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Riproduce una traccia di statistiche nel controller dinamico')
+    parser.add_argument('trace')
+    parser.add_argument('--topology', help='descrizione JSON della rete registrata (default SliceTopo)')
+    parser.add_argument('--steering', choices=['pair', 'global', 'select'], default='global')
+    parser.add_argument('--threshold', type=float, help='soglia video (Mbps)')
+    parser.add_argument('--dwell-default', type=float, help='dwell time verso la slice di default (s)')
+    parser.add_argument('--dwell-video', type=float, help='dwell time verso la slice del video (s)')
+    parser.add_argument('--alpha', type=float, help='smussamento EWMA del rate video')
+    args = parser.parse_args()
+
+    from ryu.lib import hub
+
+    # La riproduzione non deve registrare a sua volta
+    os.environ.pop(TRACE_ENV, None)
+    if args.topology:
+        import topology_discovery
+        from network_simulator import make_controller
+        ctrl = make_controller(topology_discovery.load_description(args.topology))
+    else:
+        from benchmark_policy import dynamic_controller
+        ctrl = dynamic_controller()
+        # Il polling vero resta fermo: i round sono quelli registrati
+        hub.kill(ctrl.monitor_thread)
+    ctrl.steering = args.steering
+    if args.threshold is not None:
+        ctrl.bandwidth_threshold = args.threshold * 1e6 / 8
+    if args.dwell_default is not None:
+        ctrl.dwell_time[ctrl.spec['default']] = args.dwell_default
+    if args.dwell_video is not None:
+        ctrl.dwell_time[ctrl.spec['video']] = args.dwell_video
+    if args.alpha is not None:
+        ctrl.video_stats.alpha = args.alpha
+
+    start = time.perf_counter()
+    timeline, records, duration = replay(args.trace, ctrl)
+    wall = time.perf_counter() - start
+
+    for at, name, detail in timeline:
+        print(f"{at:>10.2f} s  {name:<22}{detail}")
+    print(f"{records} risposte, {duration:.1f} s di traffico riprodotti in {wall:.2f} s "
+          f"({duration / wall if wall else 0.0:.0f}x), {len(timeline)} transizioni")
@@ -0,0 +1,127 @@
+# table_manager.py
+# Occupazione delle tabelle dei flussi degli switch.
+# Le regole dinamiche ricevono un timeout secondo la loro classe (cookie):
+# le regole per coppia di host e quelle dei flussi pesanti scadono se non
+# passa traffico, quelle di base e delle transizioni globali restano.
+# Il controller legge le regole attive con OFPTableStatsRequest ogni
+# interval secondi; la capacità di ogni tabella viene dalle table features
+# (max_entries) o, se lo switch non le dà, da default_capacity. Oltre
+# high_watermark si tolgono le regole dinamiche colpite meno di recente
+# (l'ultimo aumento dei loro byte nelle flow stats) fino a low_watermark:
+# il loro traffico torna sulle regole aggregate della tabella di base.
+import slice_policy
+
+# Classe della regola -> (idle_timeout, hard_timeout) in secondi
+TIMEOUTS = {
+    slice_policy.COOKIE_PAIR: (300, 0),
+    slice_policy.COOKIE_ELEPHANT: (10, 0),
+}
+# Classi che si possono togliere sotto pressione
+EVICTABLE = (slice_policy.COOKIE_ELEPHANT, slice_policy.COOKIE_PAIR)
+
+
+class TableManager(object):
+
+    def __init__(self, clock, timeouts=TIMEOUTS, default_capacity=4096, high_watermark=0.9, low_watermark=0.75,
+                 interval=10.0):
+        self.clock = clock
+        self.timeouts = dict(timeouts)
+        self.default_capacity = default_capacity
+        self.high_watermark = high_watermark
+        self.low_watermark = low_watermark
+        self.interval = interval
+        # (dpid, table_id) -> max_entries dalle table features e regole attive
+        self.capacity = {}
+        self.active = {}
+        # dpid -> istante dell'ultima lettura
+        self.polled = {}
+        # (dpid, chiave della regola) -> (byte, istante dell'ultimo aumento)
+        self.hits = {}
+        self.evictions = 0
+
+    def assign(self, entry):
+        # La regola con i timeout della sua classe
+        idle, hard = self.timeouts.get(entry.cookie & slice_policy.COOKIE_CLASS_MASK, (0, 0))
+        if (entry.idle_timeout, entry.hard_timeout) == (idle, hard):
+            return entry
+        return entry._replace(idle_timeout=idle, hard_timeout=hard)
+
+    def due(self, dpid):
+        # True se è ora di rileggere l'occupazione di dpid
+        now = self.clock()
+        last = self.polled.get(dpid)
+        if last is not None and now - last < self.interval:
+            return False
+        self.polled[dpid] = now
+        return True
+
+    def set_features(self, dpid, body):
+        for feature in body:
+            if feature.max_entries:
+                self.capacity[(dpid, feature.table_id)] = feature.max_entries
+
+    def update(self, dpid, body):
+        # Solo le tabelle usate: OVS ne riporta 254
+        for stat in body:
+            if stat.active_count or (dpid, stat.table_id) in self.active:
+                self.active[(dpid, stat.table_id)] = stat.active_count
+
+    def occupancy(self, dpid):
+        # table_id -> regole attive / capacità
+        return {table_id: count / self.capacity.get((d, table_id), self.default_capacity)
+                for (d, table_id), count in self.active.items() if d == dpid}
+
+    def pressured(self, dpid):
+        return any(value >= self.high_watermark for value in self.occupancy(dpid).values())
+
+    def crowded(self, dpid):
+        # Sopra low_watermark non si aggiungono regole dinamiche nuove
+        return any(value >= self.low_watermark for value in self.occupancy(dpid).values())
+
+    def admit(self, dpid, table_id, count):
+        # True se count regole in più lasciano la tabella sotto low_watermark;
+        # fino alla prossima lettura contano già tra quelle attive
+        capacity = self.capacity.get((dpid, table_id), self.default_capacity)
+        if self.active.get((dpid, table_id), 0) + count >= self.low_watermark * capacity:
+            return False
+        if (dpid, table_id) in self.active:
+            self.active[(dpid, table_id)] += count
+        return True
+
+    def installed(self, dpid, entry):
+        # Una regola nuova conta come colpita adesso
+        self.hits.setdefault((dpid, entry.key()), (0, self.clock()))
+
+    def hit(self, dpid, key, byte_count):
+        last = self.hits.get((dpid, key))
+        if last is None or byte_count != last[0]:
+            self.hits[(dpid, key)] = (byte_count, self.clock())
+
+    def victims(self, dpid, entries):
+        # Regole dinamiche da togliere per riportare sotto low_watermark le
+        # tabelle oltre high_watermark, dalla colpita meno di recente
+        victims = []
+        for table_id, value in sorted(self.occupancy(dpid).items()):
+            if value < self.high_watermark:
+                continue
+            capacity = self.capacity.get((dpid, table_id), self.default_capacity)
+            excess = self.active[(dpid, table_id)] - int(self.low_watermark * capacity)
+            candidates = [entry for entry in entries if entry.table_id == table_id
+                          and entry.cookie & slice_policy.COOKIE_CLASS_MASK in EVICTABLE]
+            candidates.sort(key=lambda entry: self.hits.get((dpid, entry.key()), (0, 0.0))[1])
+            victims += candidates[:excess]
+            # Fino alla prossima lettura: le regole attive senza quelle tolte
+            self.active[(dpid, table_id)] -= len(candidates[:excess])
+        self.evictions += len(victims)
+        return victims
+
+    def forget_rule(self, dpid, key):
+        self.hits.pop((dpid, key), None)
+
+    def forget(self, dpid):
+        self.polled.pop(dpid, None)
+        for table in (self.capacity, self.active):
+            for key in [key for key in table if key[0] == dpid]:
+                del table[key]
+        for key in [key for key in self.hits if key[0] == dpid]:
+            del self.hits[key]
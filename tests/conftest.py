@@ -0,0 +1,7 @@
+# conftest.py
+# I moduli del progetto stanno nella radice del repository, come gli script:
+# la si aggiunge al path così i test li importano direttamente.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
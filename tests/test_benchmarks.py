@@ -0,0 +1,78 @@
+# test_benchmarks.py
+# Gli stessi benchmark di benchmark_controllers.py come suite pytest-benchmark:
+# switch_features_handler, _flow_stats_reply_handler e apply_slice_policy con
+# tabelle da 10 e 1000 voci (le dimensioni grandi restano allo script).
+# Ogni round riparte dallo stato preparato da setup, fuori dal tempo misurato.
+#
+# Uso: python -m pytest tests/test_benchmarks.py [--benchmark-autosave | --benchmark-compare]
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+pytest.importorskip('ryu')
+
+import benchmark_controllers as bc  # noqa: E402
+import slice_policy  # noqa: E402
+
+SIZES = [10, 1000]
+
+
+def rounds(benchmark, fn, setup):
+    # setup prepara l'argomento di ogni round: pedantic lo chiama prima della
+    # misura, come i round di bc.measure
+    return benchmark.pedantic(fn, setup=lambda: ((setup(),), {}), rounds=20, iterations=1)
+
+
+@pytest.mark.parametrize('size', SIZES)
+def test_switch_features_handler(benchmark, size):
+    ctrl = bc.controller(size)
+    dp = ctrl.datapaths[1]
+    entries = len(ctrl._datapath_table(1))
+
+    def setup():
+        dp.clear()
+        ctrl.programmer.barriers.clear()
+        return bc.features_event(dp)
+
+    rounds(benchmark, ctrl.switch_features_handler, setup)
+    benchmark.extra_info['entries'] = entries
+    assert entries and dp.writes_bytes
+
+
+@pytest.mark.parametrize('size', SIZES)
+def test_flow_stats_reply_handler(benchmark, size):
+    ctrl = bc.controller(size)
+    dp = ctrl.datapaths[1]
+    parser = dp.ofproto_parser
+    flows = [(entry, entry.ofp_match(parser)) for entry in ctrl._datapath_table(1)
+             if entry.cookie & slice_policy.COOKIE_MONITOR]
+    duration = [0.0]
+
+    def setup():
+        dp.clear()
+        ctrl.programmer.barriers.clear()
+        duration[0] += 2.0
+        return bc.flow_stats_event(dp, flows, duration[0], 1000.0)
+
+    rounds(benchmark, ctrl._flow_stats_reply_handler, setup)
+    benchmark.extra_info['entries'] = len(flows)
+    assert flows
+
+
+@pytest.mark.parametrize('size', SIZES)
+def test_apply_slice_policy(benchmark, size):
+    ctrl = bc.controller(size)
+    ctrl.steering = 'global'
+    for dpid in ctrl.datapaths:
+        ctrl.shadow.reset(dpid, ctrl.policy.flow_table(dpid))
+    targets = ['UPPER', 'LOWER']
+
+    def setup():
+        for dp in ctrl.datapaths.values():
+            dp.clear()
+        ctrl.programmer.barriers.clear()
+        targets.reverse()
+        return targets[0]
+
+    rounds(benchmark, ctrl.apply_slice_policy, setup)
+    benchmark.extra_info['entries'] = sum(len(rules) for rules in ctrl.policy.compile_override('UPPER').values())
+    assert ctrl.global_slice_state == targets[0]
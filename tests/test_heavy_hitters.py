@@ -0,0 +1,48 @@
+# test_heavy_hitters.py
+# Space-Saving: i flussi sopra total/k restano sempre nei contatori e
+# count - error non supera mai i byte veri.
+import random
+
+import heavy_hitters
+
+
+def test_replaces_minimum_and_inherits_error():
+    sketch = heavy_hitters.SpaceSaving(2)
+    sketch.update('a', 10)
+    sketch.update('b', 5)
+    sketch.update('c', 1)
+    assert sketch.counters == {'a': [10, 0.0], 'c': [6, 5]}
+    assert [key for key, _, _ in sketch.top()] == ['a', 'c']
+    assert sketch.share('a') == 10 / 16
+    assert sketch.share('c') == 1 / 16
+    assert sketch.share('b') == 0.0
+
+
+def test_heavy_flows_are_kept():
+    rng = random.Random(1)
+    sketch = heavy_hitters.SpaceSaving(8)
+    true = {}
+    for _ in range(5000):
+        # Due flussi pesanti e una coda lunga di flussi piccoli
+        key = rng.choice(['big', 'big', 'big', 'mid', 'mid']) if rng.random() < 0.5 else rng.randrange(500)
+        weight = rng.randrange(64, 1500)
+        true[key] = true.get(key, 0) + weight
+        sketch.update(key, weight)
+    total = sum(true.values())
+    for key, count in true.items():
+        if count > total / sketch.k:
+            assert key in sketch.counters
+    for key, (count, error) in sketch.counters.items():
+        assert count - error <= true[key] <= count
+    assert [key for key, _, _ in sketch.top(2)] == ['big', 'mid']
+
+
+def test_decay_and_forget():
+    sketch = heavy_hitters.SpaceSaving(4)
+    sketch.update('a', 100)
+    sketch.update('b', 1)
+    sketch.decay(0.5)
+    assert sketch.counters == {'a': [50.0, 0.0]} and sketch.total == 50.5
+    sketch.forget('a')
+    assert sketch.counters == {} and sketch.total == 0.5
+    assert sketch.share('a') == 0.0
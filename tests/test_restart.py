@@ -0,0 +1,105 @@
+# test_restart.py
+# Riavvio e cambi di topologia del controller dinamico sugli switch con
+# stato di benchmark_restart.py: la riconciliazione con una topologia
+# ancora vuota non cancella le regole installate, quella ripresa
+# dall'istantanea non spedisce nulla, e un host nuovo tocca solo le regole
+# che lo riguardano.
+import pytest
+
+pytest.importorskip('ryu')
+
+from benchmark_restart import RestartHarness, restart  # noqa: E402
+import controller_state  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def no_state(monkeypatch):
+    # Nessuna istantanea dall'ambiente di chi lancia i test
+    monkeypatch.delenv(controller_state.STATE_ENV, raising=False)
+
+
+def counts(harness, name):
+    return sum(dp.stats[name] for dp in harness.switches.values())
+
+
+def test_reconcile_waits_for_discovery():
+    harness = RestartHarness(2)
+    first = harness.controller(reconcile=False)
+    harness.connect(first)
+    installed = {dpid: dict(dp.flows) for dpid, dp in harness.switches.items()}
+
+    # Il secondo controller legge lo stato prima che ryu.topology abbia
+    # riportato link e host: la policy vuota non deve togliere nulla
+    second = harness.controller(reconcile=True, discovered=False)
+    sent = second.programmer.sent_msgs
+    harness.connect(second)
+    assert second.programmer.sent_msgs == sent
+    assert {dpid: set(dp.flows) for dpid, dp in harness.switches.items()} == \
+        {dpid: set(flows) for dpid, flows in installed.items()}
+
+    # Con la topologia completa le tabelle sono già giuste
+    harness.discover(second)
+    assert second.programmer.sent_msgs == sent
+    assert counts(harness, 'tolte') == 0 and counts(harness, 'riscritte') == 0
+    assert all(dp.mismatch(second.shadow.tables[dpid]) == 0 for dpid, dp in harness.switches.items())
+
+
+def test_reconcile_after_discovery_timeout():
+    # Se la topologia non arriva mai si riconcilia comunque, dopo
+    # discovery_timeout: le regole sullo switch e la shadow table coincidono
+    harness = RestartHarness(2)
+    first = harness.controller(reconcile=False)
+    harness.connect(first)
+    second = harness.controller(reconcile=True, discovered=False)
+    harness.connect(second)
+    assert set(second.reconciler._deferred) == set(harness.switches)
+    harness.advance(harness.now + second.reconciler.discovery_timeout)
+    assert second.reconciler._deferred == {}
+    assert all(dp.mismatch(second.shadow.tables[dpid]) == 0 for dpid, dp in harness.switches.items())
+
+
+def test_warm_restart_from_snapshot():
+    result = restart(reconcile=True, snapshot=True, downtime=3.0)
+    assert result['after'] == result['before']
+    assert result['messages'] == 0 and result['tolte'] == 0 and result['mismatch'] == 0
+    assert result['back'] == 0.0
+
+
+def test_warm_restart_fixes_tampered_rules():
+    # Su ogni switch di bordo una regola video tolta e una regola di slice
+    # cambiata a mano mentre il controller è giù: si correggono solo quelle
+    result = restart(reconcile=True, snapshot=True, downtime=3.0, tamper=True)
+    assert result['tolte'] == 0 and result['mismatch'] == 0
+    assert result['nuove'] == 2 and result['modificate'] == 2 and result['riscritte'] == 0
+
+
+def test_new_host_sync_is_minimal():
+    harness = RestartHarness(2)
+    ctrl = harness.controller(reconcile=False)
+    harness.connect(ctrl)
+    for dp in harness.switches.values():
+        dp.reset_counts()
+    before = {dpid: len(dp.flows) for dpid, dp in harness.switches.items()}
+
+    assert ctrl.discovery.add_host('00:00:00:00:00:05', 1, 5)
+    ctrl._resync()
+    # Niente tolto né riscritto: meter e gruppi cambiati in posto, regole
+    # nuove solo sugli switch di bordo
+    assert counts(harness, 'tolte') == 0 and counts(harness, 'riscritte') == 0
+    assert counts(harness, 'assenza') == 0
+    for dpid in (2, 3):
+        assert harness.switches[dpid].stats['nuove'] == harness.switches[dpid].stats['modificate'] == 0
+    assert len(harness.switches[1].flows) > before[1]
+    assert all(dp.mismatch(ctrl.shadow.tables[dpid]) == 0 for dpid, dp in harness.switches.items())
+
+
+def test_link_without_alternative_keeps_rules():
+    # Un link caduto senza percorso alternativo: la slice tiene il percorso
+    # di prima e nessuna regola cambia
+    harness = RestartHarness(2)
+    ctrl = harness.controller(reconcile=False)
+    harness.connect(ctrl)
+    sent = ctrl.programmer.sent_msgs
+    ctrl.discovery.remove_link(1, 2)
+    ctrl._resync()
+    assert ctrl.programmer.sent_msgs == sent
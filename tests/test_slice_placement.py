@@ -0,0 +1,49 @@
+# test_slice_placement.py
+# Posizionamento per coppia di host: bin packing sulla slice veloce con il
+# video che ha la precedenza, spostamenti minimi e memoria della domanda
+# delle coppie retrocesse.
+import slice_placement
+
+CAPACITY = {'UPPER': 10e6, 'LOWER': 1e6}
+
+
+def engine():
+    return slice_placement.PlacementEngine(CAPACITY, ['UPPER', 'LOWER'])
+
+
+def test_pairs_fill_fast_slice():
+    placement = engine().place({'a': 2e6, 'b': 3e6}, {})
+    assert placement == {'a': 'UPPER', 'b': 'UPPER'}
+
+
+def test_promotion_keeps_margin():
+    # Spazio sotto l'headroom (9 Mbps): una coppia sale solo se ne occupa al
+    # massimo l'80%
+    placement = engine().place({'a': 7.5e6, 'b': 7e6}, {})
+    assert placement == {'a': 'LOWER', 'b': 'UPPER'}
+
+
+def test_video_pushes_down_largest_pair_only():
+    placement_engine = engine()
+    current = placement_engine.place({'a': 2e6, 'b': 3e6}, {})
+    placement = placement_engine.place({'a': 2e6, 'b': 3e6}, current, {'UPPER': 5e6})
+    assert placement == {'a': 'UPPER', 'b': 'LOWER'}
+    assert placement_engine.moves(placement, current) == {'b': 'LOWER'}
+
+
+def test_demoted_pair_returns_with_remembered_demand():
+    # Sulla riserva b misura solo 1 Mbps (il limite della slice lenta), ma
+    # si ricorda che ne chiedeva 3: torna su quando c'è spazio per 3
+    placement_engine = engine()
+    current = placement_engine.place({'a': 2e6, 'b': 3e6}, {})
+    current = placement_engine.place({'a': 2e6, 'b': 3e6}, current, {'UPPER': 5e6})
+    assert placement_engine.place({'a': 2e6, 'b': 1e6}, current, {'UPPER': 4.5e6})['b'] == 'LOWER'
+    assert placement_engine.place({'a': 2e6, 'b': 1e6}, current)['b'] == 'UPPER'
+    assert placement_engine.demoted == {}
+
+
+def test_no_moves_when_stable():
+    placement_engine = engine()
+    current = placement_engine.place({'a': 2e6, 'b': 3e6, 'c': 1e6}, {})
+    again = placement_engine.place({'a': 2e6, 'b': 3e6, 'c': 1e6}, current, {'UPPER': 1e6})
+    assert placement_engine.moves(again, current) == {}
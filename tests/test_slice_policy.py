@@ -0,0 +1,172 @@
+# test_slice_policy.py
+# Tabelle compilate per SliceTopo (Topology e Service Slicing) e differenze
+# minime quando la topologia cambia: la shadow table deve spedire solo le
+# regole toccate dal cambiamento.
+import copy
+
+import pytest
+
+pytest.importorskip('ryu')
+
+from ryu.ofproto import ofproto_v1_3  # noqa: E402
+
+from benchmark_policy import diamond_chain  # noqa: E402
+import flow_programmer  # noqa: E402
+import slice_policy  # noqa: E402
+
+H, PORT_MAP, _, _ = diamond_chain(1)
+MAC = H
+
+
+def compiled(spec, hosts=H, port_map=PORT_MAP):
+    policy = slice_policy.SlicePolicyCompiler(hosts, port_map, spec)
+    policy.compile()
+    return policy
+
+
+def rules(policy, dpid, priority):
+    return {entry.match: entry for entry in policy.flow_table(dpid) if entry.priority == priority}
+
+
+def match(**fields):
+    return tuple(sorted(fields.items()))
+
+
+def test_topology_slicing_tables():
+    policy = compiled(slice_policy.TOPOLOGY_SPEC)
+    assert {dpid: len(policy.flow_table(dpid)) for dpid in PORT_MAP} == {1: 10, 2: 4, 3: 4, 4: 10}
+
+    # s1: ogni coppia sulla sua slice (porta 3 verso s2, 4 verso s3), con il
+    # meter della slice in uscita; niente tra host di coppie diverse
+    pairs = rules(policy, 1, slice_policy.PRIO_SLICE)
+    assert set(pairs) == {match(eth_src=MAC['h1'], eth_dst=MAC['h3']), match(eth_src=MAC['h3'], eth_dst=MAC['h1']),
+                          match(eth_src=MAC['h2'], eth_dst=MAC['h4']), match(eth_src=MAC['h4'], eth_dst=MAC['h2'])}
+    upper = pairs[match(eth_src=MAC['h1'], eth_dst=MAC['h3'])]
+    lower = pairs[match(eth_src=MAC['h2'], eth_dst=MAC['h4'])]
+    assert upper.out_ports == (3,) and policy.meter_entry(1, upper.meter).slice == 'UPPER'
+    assert lower.out_ports == (4,) and policy.meter_entry(1, lower.meter).slice == 'LOWER'
+    assert pairs[match(eth_src=MAC['h3'], eth_dst=MAC['h1'])].out_ports == (1,)
+
+    # Gli switch di mezzo portano solo la coppia della loro slice
+    assert set(rules(policy, 2, slice_policy.PRIO_SLICE)) == {match(eth_dst=MAC['h3']), match(eth_dst=MAC['h1'])}
+    assert set(rules(policy, 3, slice_policy.PRIO_SLICE)) == {match(eth_dst=MAC['h4']), match(eth_dst=MAC['h2'])}
+
+    # Meter delle slice alla loro capacità, solo sugli switch d'ingresso
+    assert {(meter.slice, meter.rate) for meter in policy.meter_table(1)} == {('UPPER', 10e6), ('LOWER', 1e6)}
+    assert policy.meter_table(2) == [] and policy.group_table(1) == []
+
+    # ARP degli host al proxy, DROP di default
+    arp = rules(policy, 1, slice_policy.PRIO_ARP_PROXY)
+    assert {entry.cookie for entry in arp.values()} == {slice_policy.COOKIE_ARP}
+    assert {dict(key)['in_port'] for key in arp} == {1, 2}
+    assert rules(policy, 1, slice_policy.PRIO_DROP)[()].out_ports == ()
+
+
+def test_service_slicing_tables():
+    policy = compiled(slice_policy.SERVICE_SPEC)
+    assert {dpid: len(policy.flow_table(dpid)) for dpid in PORT_MAP} == {1: 16, 2: 4, 3: 4, 4: 16}
+
+    # Gruppi FAST_FAILOVER di s1: uno per slice, la porta della slice prima
+    # e l'altra di riserva
+    groups = {group.group_id: [bucket.port for bucket in group.buckets] for group in policy.group_table(1)}
+    assert sorted(groups.values()) == [[3, 4], [4, 3]]
+    assert {group.group_type for group in policy.group_table(1)} == {'ff'}
+
+    # Video degli host locali verso UPPER, misurato e con il meter del tenant
+    video = rules(policy, 1, slice_policy.PRIO_VIDEO)
+    assert set(video) == {match(eth_type=slice_policy.ETH_TYPE_IP, in_port=port, ip_proto=17, udp_dst=9999)
+                          for port in (1, 2)}
+    for entry in video.values():
+        assert entry.cookie == slice_policy.COOKIE_VIDEO
+        assert groups[entry.group] == [3, 4]
+        meter = policy.meter_entry(1, entry.meter)
+        assert meter.slice == 'UPPER' and meter.tenant is not None
+
+    # Traffico standard verso gli host remoti sulla slice di default
+    standard = rules(policy, 1, slice_policy.PRIO_SLICE)
+    assert set(standard) == {match(eth_type=slice_policy.ETH_TYPE_IP, eth_dst=MAC[h]) for h in ('h3', 'h4')}
+    for entry in standard.values():
+        assert groups[entry.group] == [4, 3]
+        assert policy.meter_entry(1, entry.meter) == slice_policy.MeterEntry(entry.meter, 1e6, 'LOWER', None)
+
+    # Consegna locale e ARP: verso gli host, inondazione solo dalla slice 'arp'
+    local = rules(policy, 1, slice_policy.PRIO_LOCAL)
+    assert {entry.out_ports for entry in local.values()} == {(1,), (2,)}
+    flood = rules(policy, 1, slice_policy.PRIO_ARP)[match(eth_type=slice_policy.ETH_TYPE_ARP)]
+    assert ofproto_v1_3.OFPP_CONTROLLER in flood.out_ports and groups[flood.group] == [4, 3]
+
+    # Meter: slice alla capacità, tenant a metà (due host per switch)
+    assert {(meter.slice, meter.tenant, meter.rate) for meter in policy.meter_table(1)} == {
+        ('LOWER', None, 1e6), ('LOWER', 'h1', 5e5), ('LOWER', 'h2', 5e5),
+        ('UPPER', None, 10e6), ('UPPER', 'h1', 5e6), ('UPPER', 'h2', 5e6)}
+
+    # s2 inoltra per porta d'ingresso, sempre con il failover
+    transit = rules(policy, 2, slice_policy.PRIO_VIDEO)
+    assert {dict(key)['in_port'] for key in transit} == {1, 2}
+    assert all(entry.out_ports == () and entry.group is not None for entry in transit.values())
+
+
+def test_override_tables():
+    # La transizione del controller dinamico: solo gli switch di bordo, il
+    # traffico standard sul gruppo e sul meter della slice indicata
+    policy = compiled(slice_policy.SERVICE_SPEC)
+    overrides = policy.compile_override('UPPER')
+    assert set(overrides) == {1, 4}
+    groups = {group.group_id: [bucket.port for bucket in group.buckets] for group in policy.group_table(1)}
+    assert {entry.match for entry in overrides[1]} == {match(eth_type=slice_policy.ETH_TYPE_IP, eth_dst=MAC[h])
+                                                        for h in ('h3', 'h4')}
+    for entry in overrides[1]:
+        assert entry.priority == slice_policy.PRIO_OVERRIDE and entry.cookie == slice_policy.COOKIE_OVERRIDE
+        assert groups[entry.group] == [3, 4]
+        assert policy.meter_entry(1, entry.meter).slice == 'UPPER'
+    # In cache: la stessa transizione non si ricompila
+    assert policy.compile_override('UPPER') is overrides
+
+
+def test_new_host_diff_is_minimal():
+    # Un host nuovo su s4: nessuna regola da cancellare, s2 e s3 intatti,
+    # su s1 solo le regole verso il suo MAC
+    before = compiled(slice_policy.SERVICE_SPEC)
+    hosts = dict(H, h5='00:00:00:00:00:05')
+    port_map = copy.deepcopy(PORT_MAP)
+    port_map[4]['h5'] = 5
+    after = compiled(slice_policy.SERVICE_SPEC, hosts, port_map)
+
+    shadow = flow_programmer.ShadowFlowTable()
+    changes = {}
+    for dpid in PORT_MAP:
+        shadow.reset(dpid, before.flow_table(dpid))
+        assert shadow.stale(dpid, after.flow_table(dpid)) == []
+        changes[dpid] = shadow.diff(dpid, after.flow_table(dpid))
+
+    assert changes[2] == ([], []) and changes[3] == ([], [])
+    added, modified = changes[1]
+    assert modified == [] and len(added) == 3
+    assert all(dict(entry.match)['eth_dst'] == hosts['h5'] for entry in added)
+
+    # Su s4 le regole dell'host nuovo; cambiano solo l'inondazione ARP (una
+    # porta in più) e i video dei vecchi host, con la quota del tenant ridotta
+    added, modified = changes[4]
+    assert all(hosts['h5'] in dict(entry.match).values() or dict(entry.match).get('in_port') == 5
+               for entry in added)
+    for entry in modified:
+        if entry.priority == slice_policy.PRIO_ARP:
+            assert 5 in entry.out_ports
+        else:
+            assert entry.cookie == slice_policy.COOKIE_VIDEO
+            meter = after.meter_entry(4, entry.meter)
+            assert meter.tenant in ('h3', 'h4') and meter.rate < 5e6
+
+
+def test_shadow_diff_skips_identical_rules():
+    policy = compiled(slice_policy.SERVICE_SPEC)
+    table = policy.flow_table(1)
+    shadow = flow_programmer.ShadowFlowTable()
+    shadow.reset(1, table)
+    assert shadow.diff(1, table) == ([], [])
+
+    # Stessa chiave con un'altra uscita: MODIFY, non ADD
+    changed = table[0]._replace(out_ports=(99,))
+    extra = slice_policy.FlowEntry.make(slice_policy.PRIO_OVERRIDE, [3], eth_dst=MAC['h3'])
+    assert shadow.diff(1, [changed, extra]) == ([extra], [changed])
+    assert shadow.stale(1, table[1:]) == [table[0]]
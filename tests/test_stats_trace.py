@@ -0,0 +1,77 @@
+# test_stats_trace.py
+# Traccia binaria delle statistiche: quello che scrive TraceWriter si rilegge
+# uguale, anche aggiungendo in coda con un writer nuovo, e un record finale
+# troncato viene ignorato.
+import os
+
+import pytest
+
+import stats_trace
+
+MATCH_A = {'eth_type': 2048, 'in_port': 1, 'ip_proto': 17, 'udp_dst': 9999}
+MATCH_B = {'eth_dst': '00:00:00:00:00:03', 'eth_type': 2048}
+
+
+def flows(byte_count):
+    return [stats_trace.FlowStat(0x8001 << 48, MATCH_A, 0, 300, 12, 500, 10, byte_count),
+            stats_trace.FlowStat(0x8003 << 48 | 7, MATCH_B, 1, 260, 3, 0, 2, 1500)]
+
+
+def meters():
+    return [stats_trace.MeterStat(1, 4, 250, 100, 150000, [stats_trace.BandStat(2, 3000),
+                                                            stats_trace.BandStat(1, 1000)])]
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'stats.trace')
+    writer = stats_trace.open_trace(path)
+    writer.flow_reply(1, 10.0, flows(1000))
+    writer.aggregate_reply(4, 10.5, stats_trace.AggregateStat(20, 3000, 2))
+    writer.meter_reply(1, 11.0, meters())
+    writer.close()
+    assert writer.replies == 3
+
+    records = list(stats_trace.read_trace(path))
+    assert [(kind, dpid, timestamp) for kind, dpid, timestamp, _ in records] == [
+        (stats_trace.KIND_FLOW, 1, 10.0), (stats_trace.KIND_AGGREGATE, 4, 10.5), (stats_trace.KIND_METER, 1, 11.0)]
+    assert records[0][3] == flows(1000)
+    assert records[1][3] == [stats_trace.AggregateStat(20, 3000, 2)]
+    # Le bande dei meter si sommano
+    assert records[2][3] == [stats_trace.MeterStat(1, 4, 250, 100, 150000, [stats_trace.BandStat(3, 4000)])]
+
+
+def test_append_reuses_matches(tmp_path):
+    path = str(tmp_path / 'stats.trace')
+    writer = stats_trace.TraceWriter(path)
+    writer.flow_reply(1, 1.0, flows(1000))
+    writer.close()
+    size = os.path.getsize(path)
+
+    # Un writer nuovo sullo stesso file non ridefinisce i match già scritti
+    writer = stats_trace.TraceWriter(path)
+    assert len(writer.matches) == 2
+    writer.flow_reply(1, 2.0, flows(2000))
+    writer.close()
+    record = os.path.getsize(path) - size
+    assert record < size
+    assert [body for _, _, _, body in stats_trace.read_trace(path)] == [flows(1000), flows(2000)]
+
+
+def test_truncated_record_is_ignored(tmp_path):
+    path = str(tmp_path / 'stats.trace')
+    writer = stats_trace.TraceWriter(path)
+    writer.flow_reply(1, 1.0, flows(1000))
+    writer.flow_reply(1, 2.0, flows(2000))
+    writer.close()
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 5)
+    assert [timestamp for _, _, timestamp, _ in stats_trace.read_trace(path)] == [1.0]
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / 'other.trace'
+    path.write_bytes(b'not a trace')
+    with pytest.raises(ValueError):
+        list(stats_trace.read_trace(str(path)))
+    with pytest.raises(ValueError):
+        stats_trace.TraceWriter(str(path))
@@ -0,0 +1,304 @@
+# topology_discovery.py
+# Topologia costruita a runtime: link tra switch dagli eventi LLDP di
+# ryu.topology e host imparati dai packet-in. Da qui nascono le tabelle H
+# (host -> MAC) e PORT_MAP (dpid -> {vicino: porta}) che i controller
+# prima copiavano a mano da SliceTopo.
+# Il percorso di ogni slice passa per i suoi switch "waypoint" (quelli del
+# vecchio percorso fisso) con il cammino minimo tra uno e l'altro, evitando
+# i waypoint delle altre slice. I segmenti tra due waypoint restano in
+# cache: all'aggiunta o rimozione di un link si ricalcolano solo i segmenti
+# che ne sono toccati (e quelli che li seguono nella stessa slice).
+# Una slice rimasta senza alternative tiene il suo percorso: i gruppi
+# FAST_FAILOVER nel datapath la coprono finché il link non torna.
+# Le topologie generate da topology_slicing.py arrivano con una descrizione
+# JSON (switch, host, link con porte e banda, slice): i controller ne
+# prendono slice, capacità e coppie al posto di quelle di SliceTopo.
+import json
+from collections import deque
+
+# Variabile d'ambiente con il file della topologia generata
+DESCRIPTION_ENV = 'SLICE_TOPOLOGY'
+# Chiavi facoltative della descrizione che passano alla specifica delle slice
+SPEC_KEYS = ('classifier', 'priority', 'tenant_rate', 'video', 'default', 'arp')
+
+
+def host_name(mac):
+    # Nome stabile dal MAC: 00:00:00:00:00:03 -> h3, come in SliceTopo
+    return 'h%d' % int(mac.replace(':', ''), 16)
+
+
+def write_description(desc, path):
+    with open(path, 'w') as f:
+        json.dump(desc, f, indent=1, sort_keys=True)
+
+
+def load_description(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def load_spec(spec, path):
+    # Specifica delle slice per la topologia descritta in path (None: quella
+    # di SliceTopo): percorsi, capacità e coppie di host vengono dal file
+    if not path:
+        return spec
+    desc = load_description(path)
+    spec = dict(spec, slices=desc['slices'], capacity=desc['capacity'])
+    if 'pairs' in spec:
+        spec['pairs'] = {(a, b): name for a, b, name in desc['pairs']}
+    # Classi di traffico, bande, rate dei tenant e ruoli delle slice, se la
+    # descrizione li dà (altrimenti quelli della specifica)
+    for key in SPEC_KEYS:
+        if key in desc:
+            spec[key] = desc[key]
+    # Parametri del controller: solo quelli dati, gli altri restano
+    if 'tuning' in desc and 'tuning' in spec:
+        spec['tuning'] = dict(spec['tuning'], **desc['tuning'])
+    return spec
+
+
+def description_tables(desc):
+    # H (host -> MAC) e PORT_MAP (dpid -> {vicino: porta}) della descrizione,
+    # come li ricostruirebbe la scoperta a runtime
+    H = {name: host['mac'] for name, host in desc['hosts'].items()}
+    PORT_MAP = {dpid: {} for dpid in desc['switches']}
+    for a, port_a, b, port_b, _ in desc['links']:
+        PORT_MAP[a][f"s{b}"] = port_a
+        PORT_MAP[b][f"s{a}"] = port_b
+    for name, host in desc['hosts'].items():
+        PORT_MAP[host['switch']][name] = host['port']
+    return H, PORT_MAP
+
+
+class TopologyDiscovery(object):
+
+    def __init__(self, waypoints):
+        # slice -> dpid da attraversare in ordine
+        self.waypoints = {name: [int(sw[1:]) for sw in path] for name, path in waypoints.items()}
+        # dpid -> {dpid vicino: porta locale}
+        self.links = {}
+        # (dpid, dpid vicino) -> porta, anche per i link caduti
+        self._ports = {}
+        # nome dell'host -> (MAC, dpid, porta)
+        self.hosts = {}
+        # slice -> percorso (lista di dpid), None se non ancora raggiungibile
+        self._paths = {}
+        # slice -> [(segmento o None, distanze BFS dal suo waypoint)]
+        self._segments = {name: [] for name in self.waypoints}
+        # dpid -> {(slice, indice del segmento)} la cui BFS ha raggiunto lo switch
+        self._reached = {}
+        # Cresce a ogni cambiamento: i controller ricompilano la policy
+        # solo se è diversa da quella dell'ultima compilazione
+        self.version = 0
+        # Segmenti calcolati dall'avvio (per i benchmark)
+        self.recomputed = 0
+        # Link ripresi da un'istantanea e non ancora riportati da LLDP
+        self.unconfirmed = set()
+
+        for name in self.waypoints:
+            self._recompute(name, 0)
+
+    # --- EVENTI ---
+    def add_switch(self, dpid):
+        if dpid in self.links:
+            return False
+        self.links[dpid] = {}
+        self.version += 1
+        return True
+
+    # add_link, remove_link e remove_switch restituiscono le slice il cui
+    # percorso è stato ricalcolato
+    def remove_switch(self, dpid):
+        if dpid not in self.links:
+            return set()
+        for neighbor in self.links.pop(dpid):
+            self.links.get(neighbor, {}).pop(dpid, None)
+        for name in [name for name, (_, host_dpid, _) in self.hosts.items() if host_dpid == dpid]:
+            del self.hosts[name]
+        self.version += 1
+        return self._invalidate(lambda seg: dpid in seg)
+
+    def add_link(self, src, src_port, dst, dst_port):
+        self.unconfirmed.discard(frozenset((src, dst)))
+        # LLDP riporta ogni verso a parte: il secondo evento non cambia nulla
+        if self.links.get(src, {}).get(dst) == src_port and self.links.get(dst, {}).get(src) == dst_port:
+            return set()
+        self.links.setdefault(src, {})[dst] = src_port
+        self.links.setdefault(dst, {})[src] = dst_port
+        self._ports[(src, dst)], self._ports[(dst, src)] = src_port, dst_port
+        # Una porta scambiata per quella di un host è in realtà un link
+        for name, (_, dpid, port) in list(self.hosts.items()):
+            if (dpid, port) in ((src, src_port), (dst, dst_port)):
+                del self.hosts[name]
+        self.version += 1
+
+        # Solo i segmenti la cui BFS ha raggiunto uno dei due estremi
+        first = {}
+        for name, i in self._reached.get(src, set()) | self._reached.get(dst, set()):
+            seg, dist = self._segments[name][i]
+            if i < first.get(name, i + 1) and self._improves(seg, dist, src, dst, self.waypoints[name][i + 1]):
+                first[name] = i
+        for name, i in first.items():
+            self._recompute(name, i)
+        return set(first)
+
+    def remove_link(self, src, dst):
+        if dst not in self.links.get(src, {}):
+            return set()
+        del self.links[src][dst]
+        self.links.get(dst, {}).pop(src, None)
+        self.version += 1
+        return self._invalidate(lambda seg: any({a, b} == {src, dst} for a, b in zip(seg, seg[1:])))
+
+    def add_host(self, mac, dpid, port):
+        # Restituisce True per un host nuovo o spostato
+        if dpid not in self.links or port in self.links[dpid].values():
+            return False
+        name = host_name(mac)
+        if self.hosts.get(name) == (mac, dpid, port):
+            return False
+        self.hosts[name] = (mac, dpid, port)
+        self.version += 1
+        return True
+
+    def load(self, hosts, port_map):
+        # Topologia nota in anticipo (benchmark, simulazioni): gli stessi
+        # eventi che arriverebbero da LLDP e dai packet-in
+        for dpid in port_map:
+            self.add_switch(dpid)
+        for dpid, ports in sorted(port_map.items()):
+            for name, port in ports.items():
+                if name.startswith('s'):
+                    neighbor = int(name[1:])
+                    self.add_link(dpid, port, neighbor, port_map[neighbor][f"s{dpid}"])
+        for dpid, ports in sorted(port_map.items()):
+            for name, port in ports.items():
+                if name in hosts:
+                    self.add_host(hosts[name], dpid, port)
+
+    def export(self):
+        # Switch, link (un verso per coppia) e host scoperti, per l'istantanea
+        # del controller (controller_state.py)
+        return {'switches': sorted(self.links),
+                'links': [[a, port, b, self.links[b][a]] for a, neighbors in sorted(self.links.items())
+                          for b, port in sorted(neighbors.items()) if a < b],
+                'hosts': [list(host) for host in sorted(self.hosts.values())]}
+
+    def restore(self, topology):
+        # Topologia di export() dopo un riavvio: le slice hanno subito i loro
+        # percorsi, i link restano da confermare finché LLDP non li riporta
+        for dpid in topology['switches']:
+            self.add_switch(dpid)
+        for src, src_port, dst, dst_port in topology['links']:
+            self.add_link(src, src_port, dst, dst_port)
+            self.unconfirmed.add(frozenset((src, dst)))
+        for mac, dpid, port in topology['hosts']:
+            self.add_host(mac, dpid, port)
+
+    def expire(self):
+        # Link dell'istantanea mai confermati: caduti mentre il controller
+        # era fermo. Restituisce le slice ricalcolate
+        affected = set()
+        for src, dst in [tuple(link) for link in self.unconfirmed]:
+            affected |= self.remove_link(src, dst)
+        self.unconfirmed.clear()
+        return affected
+
+    # --- TABELLE PER IL COMPILATORE ---
+    def host_map(self):
+        return {name: mac for name, (mac, _, _) in sorted(self.hosts.items())}
+
+    def port_map(self):
+        port_map = {dpid: {f"s{neighbor}": port for neighbor, port in neighbors.items()}
+                    for dpid, neighbors in self.links.items()}
+        for name, (_, dpid, port) in self.hosts.items():
+            port_map[dpid][name] = port
+        # I percorsi tenuti dopo un guasto usano ancora le porte dei link caduti
+        for path in self._paths.values():
+            for a, b in zip(path or [], (path or [])[1:]):
+                port_map.setdefault(a, {}).setdefault(f"s{b}", self._ports[(a, b)])
+                port_map.setdefault(b, {}).setdefault(f"s{a}", self._ports[(b, a)])
+        return port_map
+
+    def slice_paths(self):
+        # Slice con un percorso completo, come liste di nomi di switch
+        return {name: [f"s{dpid}" for dpid in path] for name, path in sorted(self._paths.items()) if path}
+
+    def path(self, name):
+        return self._paths.get(name)
+
+    # --- PERCORSI ---
+    def _invalidate(self, broken):
+        # Ricalcolo dal primo segmento interrotto; se non c'è alternativa la
+        # slice tiene il percorso di prima
+        affected = set()
+        for name, segments in self._segments.items():
+            i = next((i for i, (seg, _) in enumerate(segments) if seg and broken(seg)), None)
+            if i is not None:
+                self._recompute(name, i, keep=True)
+                affected.add(name)
+        return affected
+
+    def _recompute(self, name, start, keep=False):
+        waypoints = self.waypoints[name]
+        segments = self._segments[name]
+        old = segments[start:]
+        for i, (_, dist) in enumerate(old, start):
+            for dpid in dist:
+                self._reached[dpid].discard((name, i))
+        del segments[start:]
+
+        # Vincolo: niente switch riservati alle altre slice né già usati dalla slice
+        avoid = {dpid for other, path in self.waypoints.items() if other != name for dpid in path}
+        avoid -= set(waypoints)
+        path = waypoints[:1]
+        for seg, _ in segments:
+            path += seg[1:]
+
+        for i in range(start, len(waypoints) - 1):
+            src, dst = waypoints[i], waypoints[i + 1]
+            dist, parent = self._bfs(src, dst, avoid | set(path[:-1]))
+            seg = None
+            if dst in dist:
+                seg = [dst]
+                while seg[-1] != src:
+                    seg.append(parent[seg[-1]])
+                seg.reverse()
+            self.recomputed += 1
+            # Segmento uguale a prima: i successivi hanno gli stessi vincoli
+            reuse = old[i - start + 1:] if seg is not None and i - start < len(old) and old[i - start][0] == seg else []
+            for j, (seg_j, dist_j) in enumerate([(seg, dist)] + reuse, i):
+                segments.append((seg_j, dist_j))
+                for dpid in dist_j:
+                    self._reached.setdefault(dpid, set()).add((name, j))
+                path = None if path is None or seg_j is None else path + seg_j[1:]
+            if reuse or path is None:
+                break
+
+        if path is not None or not keep:
+            self._paths[name] = path
+
+    def _bfs(self, src, dst, avoid):
+        # Cammino minimo: ci si ferma appena si raggiunge dst
+        dist, parent = {src: 0}, {}
+        queue = deque([src])
+        while queue and dst not in dist:
+            node = queue.popleft()
+            for neighbor in sorted(self.links.get(node, {})):
+                if neighbor in dist or neighbor in avoid:
+                    continue
+                dist[neighbor] = dist[node] + 1
+                parent[neighbor] = node
+                queue.append(neighbor)
+        return dist, parent
+
+    def _improves(self, seg, dist, a, b, dst):
+        if seg is None:
+            # Segmento interrotto: il link allarga la parte raggiungibile
+            return (a in dist) != (b in dist)
+        # Scorciatoia: tutti gli switch più vicini di dst sono in dist, quindi
+        # uno assente è lontano almeno quanto dst
+        for x, y in ((a, b), (b, a)):
+            if x in dist and dist[x] + 1 < dist[dst] and dist.get(y, dist[dst]) > dist[x] + 1:
+                return True
+        return False
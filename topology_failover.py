@@ -0,0 +1,98 @@
+# topology_failover.py
+# Test di failover su SliceTopo: un ping fitto (ogni 10 ms) attraversa la
+# rete mentre un link tra switch viene spento e poi riacceso. Dai numeri di
+# sequenza mancanti si ricavano i pacchetti persi e il tempo di failover
+# (il buco più lungo nella sequenza).
+#
+# Uso (come root, con il controller già avviato):
+#   ryu-manager controller_Dynamic_Slicing.py
+#   python topology_failover.py [s1-s2 s1-s3 ...]
+import os
+import re
+import sys
+import tempfile
+import time
+
+from mininet.net import Mininet
+from mininet.link import TCLink
+from mininet.node import RemoteController, OVSSwitch
+from mininet.log import setLogLevel, info
+
+from topology_slicing import SliceTopo
+
+PING_INTERVAL = 0.01
+LINK_DOWN_AT = 2.0
+LINK_UP_AT = 6.0
+DURATION = 10.0
+
+
+def ping_sequence(output):
+    return sorted(int(seq) for seq in re.findall(r'icmp_seq=(\d+)', output))
+
+
+def failover_stats(seqs, sent):
+    # Persi = sequenze mancanti; failover = buco più lungo (in secondi)
+    received = set(seqs)
+    lost = sum(1 for seq in range(1, sent + 1) if seq not in received)
+    longest = gap = 0
+    for seq in range(1, sent + 1):
+        gap = gap + 1 if seq not in received else 0
+        longest = max(longest, gap)
+    return lost, longest * PING_INTERVAL
+
+
+def run_link(net, src, dst, link):
+    a, b = link.split('-')
+    count = int(DURATION / PING_INTERVAL)
+    # Ping in background, l'output finisce in un file temporaneo (gli host
+    # di Mininet vedono lo stesso filesystem)
+    fd, path = tempfile.mkstemp(prefix='failover_ping_', suffix='.txt')
+    os.close(fd)
+    try:
+        src.cmd(f'ping -i {PING_INTERVAL} -c {count} -W 1 {dst.IP()} > {path} 2>&1 &')
+        time.sleep(LINK_DOWN_AT)
+        info(f'*** Link {link} giù\n')
+        net.configLinkStatus(a, b, 'down')
+        time.sleep(LINK_UP_AT - LINK_DOWN_AT)
+        info(f'*** Link {link} su\n')
+        net.configLinkStatus(a, b, 'up')
+        time.sleep(DURATION - LINK_UP_AT + 2)
+        src.cmd('wait')
+        with open(path) as f:
+            return failover_stats(ping_sequence(f.read()), count)
+    finally:
+        os.unlink(path)
+
+
+def run(links):
+    net = Mininet(
+        topo=SliceTopo(),
+        controller=lambda name: RemoteController(name, ip='127.0.0.1', port=6653),
+        switch=OVSSwitch,
+        link=TCLink,
+        autoSetMacs=False
+    )
+
+    info('*** Avvio rete\n')
+    net.start()
+    net.pingAll()
+
+    h1, h3 = net.get('h1', 'h3')
+    results = []
+    for link in links:
+        lost, failover = run_link(net, h1, h3, link)
+        results.append((link, lost, failover))
+        # La rete torna stabile prima del prossimo link
+        time.sleep(2)
+
+    info('*** Arresto rete\n')
+    net.stop()
+
+    print(f"{'link':<8}{'persi':>8}{'failover ms':>14}")
+    for link, lost, failover in results:
+        print(f"{link:<8}{lost:>8}{failover * 1000:>14.0f}")
+
+
+if __name__ == '__main__':
+    setLogLevel('info')
+    run(sys.argv[1:] or ['s1-s2', 's1-s3', 's2-s4', 's3-s4'])
@@ -0,0 +1,115 @@
+# topology_gen.py
+# Generatore delle topologie per gli esperimenti di scala, senza Mininet:
+# N host e K percorsi paralleli (uno per slice) di banda configurabile.
+#   diamond   - catena di diamanti, ogni stadio con K switch in parallelo
+#   leafspine - foglie collegate a K spine, una slice per spine
+#   fattree   - fat-tree k-ario, una slice per gruppo di aggregation
+# Gli host stanno sui due switch agli estremi delle slice (metà per parte),
+# come in SliceTopo. La descrizione è un dizionario serializzabile in JSON:
+# la usano topology_slicing.py (rete Mininet), il simulatore di rete e i
+# benchmark.
+
+# Nomi delle slice: i primi due come in SliceTopo
+SLICE_NAMES = ['UPPER', 'LOWER']
+
+
+def generate_topology(kind='diamond', n_hosts=4, k_paths=2, bandwidth=(10, 1), size=1):
+    # Descrizione serializzabile in JSON. size: numero di diamanti, di foglie
+    # (leafspine) o arietà k (fattree). Con i valori di default si ottiene
+    # esattamente SliceTopo, porte comprese.
+    names = [SLICE_NAMES[i] if i < len(SLICE_NAMES) else f"SLICE{i + 1}" for i in range(k_paths)]
+    bw = [bandwidth[min(i, len(bandwidth) - 1)] for i in range(k_paths)]
+    desc = {'kind': kind, 'switches': [], 'hosts': {}, 'links': [], 'pairs': [],
+            'slices': {name: [] for name in names},
+            'capacity': {name: mbps * 1e6 for name, mbps in zip(names, bw)}}
+    ports = {}
+
+    def switch():
+        dpid = len(desc['switches']) + 1
+        desc['switches'].append(dpid)
+        ports[dpid] = 0
+        return dpid
+
+    def link(a, b, mbps):
+        ports[a] += 1
+        ports[b] += 1
+        desc['links'].append([a, ports[a], b, ports[b], mbps])
+
+    def hosts(dpid, count):
+        added = []
+        for _ in range(count):
+            i = len(desc['hosts']) + 1
+            ports[dpid] += 1
+            name = f"h{i}"
+            desc['hosts'][name] = {'mac': ':'.join('%02x' % b for b in i.to_bytes(6, 'big')),
+                                   'ip': '10.%d.%d.%d' % tuple(i.to_bytes(3, 'big')),
+                                   'switch': dpid, 'port': ports[dpid]}
+            added.append(name)
+        return added
+
+    if kind == 'diamond':
+        left = switch()
+        left_hosts = hosts(left, n_hosts // 2)
+        junction = left
+        for name in names:
+            desc['slices'][name].append(f"s{left}")
+        for _ in range(size):
+            mids = [switch() for _ in names]
+            nxt = switch()
+            for mid, mbps in zip(mids, bw):
+                link(junction, mid, mbps)
+            for mid, mbps in zip(mids, bw):
+                link(mid, nxt, mbps)
+            for name, mid in zip(names, mids):
+                desc['slices'][name] += [f"s{mid}", f"s{nxt}"]
+            junction = nxt
+        right = junction
+
+    elif kind == 'leafspine':
+        if size < 2:
+            raise ValueError("leafspine: servono almeno due foglie")
+        leaves = [switch()]
+        spines = [switch() for _ in names]
+        leaves += [switch() for _ in range(size - 1)]
+        left, right = leaves[0], leaves[-1]
+        left_hosts = hosts(left, n_hosts // 2)
+        for leaf in leaves:
+            for spine, mbps in zip(spines, bw):
+                link(leaf, spine, mbps)
+        for name, spine in zip(names, spines):
+            desc['slices'][name] = [f"s{left}", f"s{spine}", f"s{right}"]
+
+    elif kind == 'fattree':
+        k = size
+        if k % 2 or k < 2 * len(names):
+            raise ValueError(f"fattree: k deve essere pari e almeno {2 * len(names)}")
+        half = k // 2
+        # Le slice sono disgiunte: la slice i usa l'aggregation i di ogni pod
+        # e il primo core del suo gruppo; i gruppi oltre K prendono la banda
+        # dell'ultima slice
+        group_bw = [bw[min(g, len(bw) - 1)] for g in range(half)]
+        edges, aggs = [], []
+        for pod in range(k):
+            edges.append([switch() for _ in range(half)])
+            aggs.append([switch() for _ in range(half)])
+        cores = [[switch() for _ in range(half)] for _ in range(half)]
+        left, right = edges[0][0], edges[-1][0]
+        left_hosts = hosts(left, n_hosts // 2)
+        for pod in range(k):
+            for g, agg in enumerate(aggs[pod]):
+                for edge in edges[pod]:
+                    link(edge, agg, group_bw[g])
+                for core in cores[g]:
+                    link(agg, core, group_bw[g])
+        for i, name in enumerate(names):
+            desc['slices'][name] = [f"s{left}", f"s{aggs[0][i]}", f"s{cores[i][0]}",
+                                    f"s{aggs[-1][i]}", f"s{right}"]
+
+    else:
+        raise ValueError(f"Topologia sconosciuta: {kind}")
+
+    right_hosts = hosts(right, n_hosts - n_hosts // 2)
+    # Coppie per Topology Slicing: a turno sulle slice
+    for i, (a, b) in enumerate(zip(left_hosts, right_hosts)):
+        desc['pairs'].append([a, b, names[i % len(names)]])
+    return desc
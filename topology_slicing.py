@@ -1,3 +1,25 @@
+# topology_slicing.py
+# SliceTopo è il diamante del progetto (4 switch, 4 host). Per gli
+# esperimenti di scala il generatore di topology_gen.py costruisce reti più
+# grandi con N host e K percorsi paralleli (uno per slice) di banda
+# configurabile, che qui diventano reti Mininet:
+#   diamond   - catena di diamanti, ogni stadio con K switch in parallelo
+#   leafspine - foglie collegate a K spine, una slice per spine
+#   fattree   - fat-tree k-ario, una slice per gruppo di aggregation
+# Gli host stanno sui due switch agli estremi delle slice (metà per parte),
+# come in SliceTopo. La descrizione della rete va in un file JSON che i
+# controller leggono da $SLICE_TOPOLOGY (slice, capacità e coppie).
+#
+# Uso (come root, con il controller già avviato):
+#   python topology_slicing.py
+#   python topology_slicing.py --kind fattree --size 8 --hosts 64 --paths 4 --bw 10,5,2,1 \
+#       --write topo.json
+#   python topology_slicing.py --kind diamond --hosts 64 --write topo.json --no-run   (senza root)
+#   python topology_slicing.py --kind leafspine --size 8 --measure 4,16,64,256
+import argparse
+import resource
+import time
+
 from mininet.topo import Topo
 from mininet.net import Mininet
 from mininet.link import TCLink
@@ -5,6 +27,9 @@ from mininet.node import RemoteController, OVSSwitch
 from mininet.cli import CLI
 from mininet.log import setLogLevel, info
 
+import topology_discovery
+from topology_gen import generate_topology
+
 class SliceTopo(Topo):
     def build(self):
         info('*** Creazione switch\n')
@@ -30,9 +55,35 @@ class SliceTopo(Topo):
         self.addLink(h4, s4)
 
 
-def run():
-    topo = SliceTopo()
-    net = Mininet(
+class ScaleTopo(Topo):
+    # Rete costruita da una descrizione di generate_topology: porte e dpid
+    # sono quelli della descrizione, così coincidono con quelli scoperti
+    def build(self, desc):
+        info(f"*** Creazione di {len(desc['switches'])} switch\n")
+        for dpid in desc['switches']:
+            self.addSwitch(f"s{dpid}", dpid='%016x' % dpid)
+
+        info(f"*** Creazione di {len(desc['hosts'])} host\n")
+        for name, host in desc['hosts'].items():
+            self.addHost(name, ip=host['ip'] + '/8', mac=host['mac'])
+            self.addLink(name, f"s{host['switch']}", port2=host['port'])
+
+        info(f"*** Creazione di {len(desc['links'])} link\n")
+        for a, port_a, b, port_b, bw in desc['links']:
+            self.addLink(f"s{a}", f"s{b}", port1=port_a, port2=port_b, bw=bw)
+
+
+def mem_available():
+    # Memoria libera del sistema (KiB): conta anche OVS e le shell degli host
+    with open('/proc/meminfo') as f:
+        for line in f:
+            if line.startswith('MemAvailable:'):
+                return int(line.split()[1])
+    return 0
+
+
+def make_net(topo):
+    return Mininet(
         topo=topo,
         controller=lambda name: RemoteController(name, ip='127.0.0.1', port=6653),
         switch=OVSSwitch,
@@ -40,6 +91,35 @@ def run():
         autoSetMacs=False
     )
 
+
+def measure(kind, sizes, k_paths, bandwidth, size):
+    # Tempo di avvio e memoria al crescere del numero di host
+    print(f"{'host':>6}{'switch':>8}{'link':>7}{'genera ms':>11}{'build s':>9}{'start s':>9}"
+          f"{'stop s':>8}{'memoria MiB':>13}{'RSS MiB':>9}")
+    for n_hosts in sizes:
+        start = time.perf_counter()
+        desc = generate_topology(kind, n_hosts, k_paths, bandwidth, size)
+        generate_ms = (time.perf_counter() - start) * 1000
+
+        free = mem_available()
+        start = time.perf_counter()
+        net = make_net(ScaleTopo(desc=desc))
+        build_s = time.perf_counter() - start
+        start = time.perf_counter()
+        net.start()
+        start_s = time.perf_counter() - start
+        used_mib = (free - mem_available()) / 1024
+        rss_mib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        start = time.perf_counter()
+        net.stop()
+        stop_s = time.perf_counter() - start
+        print(f"{n_hosts:>6}{len(desc['switches']):>8}{len(desc['links']):>7}{generate_ms:>11.1f}"
+              f"{build_s:>9.2f}{start_s:>9.2f}{stop_s:>8.2f}{used_mib:>13.1f}{rss_mib:>9.1f}")
+
+
+def run(topo=None):
+    net = make_net(topo or SliceTopo())
+
     info('*** Avvio rete\n')
     net.start()
 
@@ -54,5 +134,30 @@ def run():
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='SliceTopo o topologie generate per esperimenti di scala')
+    parser.add_argument('--kind', choices=['slicetopo', 'diamond', 'leafspine', 'fattree'], default='slicetopo')
+    parser.add_argument('--hosts', type=int, default=4)
+    parser.add_argument('--paths', type=int, default=2, help='percorsi paralleli, uno per slice')
+    parser.add_argument('--bw', default='10,1', help='banda (Mbps) dei percorsi, separata da virgole')
+    parser.add_argument('--size', type=int, default=None,
+                        help='diamanti (diamond), foglie (leafspine) o arietà k (fattree)')
+    parser.add_argument('--write', help='file JSON della descrizione, da passare ai controller in $SLICE_TOPOLOGY')
+    parser.add_argument('--no-run', action='store_true', help='con --write: scrive la descrizione e basta')
+    parser.add_argument('--measure', help='numeri di host separati da virgole: solo tempi di avvio e memoria')
+    args = parser.parse_args()
+
     setLogLevel('info')
-    run()
+    if args.kind == 'slicetopo':
+        run()
+    else:
+        bandwidth = [float(mbps) for mbps in args.bw.split(',')]
+        size = args.size or {'diamond': 1, 'leafspine': 2, 'fattree': max(4, 2 * args.paths)}[args.kind]
+        if args.measure:
+            setLogLevel('warning')
+            measure(args.kind, [int(n) for n in args.measure.split(',')], args.paths, bandwidth, size)
+        else:
+            desc = generate_topology(args.kind, args.hosts, args.paths, bandwidth, size)
+            if args.write:
+                topology_discovery.write_description(desc, args.write)
+            if not args.no_run:
+                run(ScaleTopo(desc=desc))